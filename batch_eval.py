@@ -0,0 +1,144 @@
+"""Headless batch evaluation, no Qt involved.
+
+    python batch_eval.py tasks.jsonl results.jsonl --url http://10.xx.xx.xx --port 9500 --concurrency 8
+
+Each input line is a JSON object with "task" (planning, captioning, embodied_qa, grounding, ...)
+and "text", optionally an "id" (the line number is used otherwise). Results are appended to the
+output file as they finish; rerunning with the same output skips tasks that already succeeded.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, Set
+
+import numpy as np
+
+from server.api import Server
+from server.transport import TransportArgument
+
+
+def read_tasks(path: str) -> Iterator[dict]:
+    with open(path) as f:
+        for line_no, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item.setdefault("id", line_no)
+            yield item
+
+
+def completed_ids(path: str) -> Set[str]:
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # a line cut short by an interruption
+                continue
+            if result.get("ok"):
+                done.add(str(result["id"]))
+    return done
+
+
+def run_task(server: Server, item: dict) -> dict:
+    start = time.perf_counter()
+    data = server.send_text(item.get("text"), item["task"])
+    latency = time.perf_counter() - start
+    result = {"id": item["id"], "task": item["task"], "text": item.get("text"), "latency": latency}
+    if data is None:
+        result.update(ok=False, error="no response")
+    else:
+        result.update(ok=True, response=data.get("response"))
+    return result
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL task file against an Optimus-3 server")
+    parser.add_argument("tasks", help="input JSONL, one {task, text} object per line")
+    parser.add_argument("output", help="output JSONL, appended to and used for resuming")
+    parser.add_argument("--url", default="http://10.xx.xx.xx")
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--concurrency", type=positive_int, default=4)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    ns = parser.parse_args(argv)
+
+    server = Server(
+        url=ns.url,
+        port=ns.port,
+        transport_args=TransportArgument(pool_size=ns.concurrency),
+        verbose=ns.verbose,
+    )
+    done = completed_ids(ns.output)
+    if done:
+        print(f"Resuming, {len(done)} tasks already completed")
+
+    pending = (item for item in read_tasks(ns.tasks) if str(item["id"]) not in done)
+    latencies = []
+    failures = 0
+    # progress is printed every 50 tasks, several can finish in one wait()
+    reported = 0
+    start = time.perf_counter()
+    with open(ns.output, "a") as out, ThreadPoolExecutor(max_workers=ns.concurrency) as executor:
+
+        def record(futures):
+            nonlocal failures
+            for future in futures:
+                result = future.result()
+                out.write(json.dumps(result) + "\n")
+                if result["ok"]:
+                    latencies.append(result["latency"])
+                else:
+                    failures += 1
+            out.flush()
+
+        in_flight = set()
+        exhausted = False
+        try:
+            while in_flight or not exhausted:
+                # keep a bounded number of tasks submitted so huge task files don't sit in memory
+                while not exhausted and len(in_flight) < 2 * ns.concurrency:
+                    item = next(pending, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        in_flight.add(executor.submit(run_task, server, item))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                record(finished)
+                count = len(latencies) + failures
+                if count // 50 > reported:
+                    reported = count // 50
+                    print(f"{count} done, {count / (time.perf_counter() - start):.2f} tasks/s", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Interrupted, finishing in-flight tasks; rerun to resume", file=sys.stderr)
+            # tasks not started yet are dropped, the running ones are waited for and written out
+            running = {future for future in in_flight if not future.cancel()}
+            record(wait(running).done)
+
+    elapsed = time.perf_counter() - start
+    total = len(latencies) + failures
+    print(f"Completed {total} tasks in {elapsed:.1f} s ({total / elapsed if elapsed else 0:.2f} tasks/s), {failures} failed")
+    if latencies:
+        p50, p90, p99 = np.percentile(np.asarray(latencies) * 1000, (50, 90, 99))
+        print(f"Latency ms: p50 {p50:.0f}  p90 {p90:.0f}  p99 {p99:.0f}  max {max(latencies) * 1000:.0f}")
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
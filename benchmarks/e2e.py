@@ -0,0 +1,214 @@
+"""End-to-end client benchmark against the local stand-in server, headless.
+
+    python -m benchmarks.e2e --fps 60 --size 1280x720 --encoding jpeg --duration 10 --json bench.json
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import uvicorn
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+from gui.main_window import MainWindow
+from server.api import Server
+from server.standin import ENCODINGS, StandinArgument, create_app
+from server.stepper import StepperArgument
+
+
+class TimedApplication(QApplication):
+    """Accumulates the time the GUI thread spends dispatching events."""
+
+    def __init__(self, argv):
+        super().__init__(argv)
+        self.busy = 0.0
+        self._depth = 0
+
+    def notify(self, receiver, event):
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return super().notify(receiver, event)
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.busy += time.perf_counter() - start
+
+
+class BenchWindow(MainWindow):
+    def __init__(self, *args, **kwargs):
+        self.latencies = []
+        self.displayed = 0
+        self.received = 0
+        self.received_bytes = 0
+        self.first_seq = None
+        self.recording = False
+        super().__init__(*args, **kwargs)
+
+    def _on_frame(self, frame):
+        if self.recording:
+            self.received += 1
+            self.received_bytes += len(frame.payload)
+            if self.first_seq is None and frame.seq is not None:
+                self.first_seq = frame.seq
+        super()._on_frame(frame)
+
+    def _show_frame(self, frame, pixmap):
+        super()._show_frame(frame, pixmap)
+        if self.recording:
+            self.displayed += 1
+            if frame.timestamp is not None:
+                self.latencies.append(time.time() - frame.timestamp)
+
+
+def start_standin(args: StandinArgument) -> uvicorn.Server:
+    config = uvicorn.Config(create_app(args), host=args.host, port=args.port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("stand-in server did not start")
+        time.sleep(0.05)
+    return server
+
+
+def percentiles(values, points=(50, 90, 99)) -> dict:
+    if not values:
+        return {f"p{p}": None for p in points}
+    result = np.percentile(np.asarray(values) * 1000, points)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(points, result)}
+
+
+def run(ns) -> dict:
+    width, height = (int(v) for v in ns.size.lower().split("x"))
+    standin_args = StandinArgument(
+        port=ns.port,
+        width=width,
+        height=height,
+        fps=ns.fps,
+        encoding=ns.encoding,
+        latency=ns.latency,
+        inference_latency=ns.inference_latency,
+        hold=ns.hold,
+    )
+    standin = start_standin(standin_args)
+
+    app = TimedApplication([])
+    server = Server(url=f"http://{standin_args.host}", port=standin_args.port, verbose=False)
+    window = BenchWindow(
+        server,
+        binary_frames=not ns.base64,
+        raw_frames=ns.encoding.startswith("raw"),
+        delta_frames=ns.delta,
+        quality=ns.quality,
+        max_fps=ns.max_fps,
+        target_latency=ns.target_latency,
+        stepper_args=StepperArgument(target_rate=ns.action_rate, max_in_flight=ns.action_window),
+        record_path=ns.record,
+        control_channel=ns.ws_control,
+    )
+    if ns.window:
+        window.resize(*(int(v) for v in ns.window.lower().split("x")))
+    window.show()
+
+    result = {}
+
+    def begin():
+        window.recording = True
+        app.busy = 0.0
+        result["start"] = time.perf_counter()
+        if not ns.no_action:
+            window.selected_task = "action"
+            window._start_action_loop()
+
+    def finish():
+        window.recording = False
+        result["wall"] = time.perf_counter() - result["start"]
+        result["busy"] = app.busy
+        window.stepper.stop()
+        app.quit()
+
+    QTimer.singleShot(int(ns.warmup * 1000), begin)
+    QTimer.singleShot(int((ns.warmup + ns.duration) * 1000), finish)
+    app.exec()
+
+    wall = result["wall"]
+    last_seq = window.last_frame_seq
+    expected = (last_seq - window.first_seq + 1) if window.first_seq is not None and last_seq is not None else window.received
+    step_stats = window.stepper.stats()
+    report = {
+        "config": {
+            "size": ns.size,
+            "fps": ns.fps,
+            "encoding": ns.encoding,
+            "transport": "base64" if ns.base64 else "binary",
+            "delta": ns.delta,
+            "control": "websocket" if ns.ws_control else "http",
+            "window": ns.window,
+            "latency_s": ns.latency,
+            "recording": bool(ns.record),
+            "duration_s": round(wall, 2),
+        },
+        "frame_latency_ms": percentiles(window.latencies),
+        "displayed_fps": round(window.displayed / wall, 2),
+        "frames_received": window.received,
+        "received_kbit_per_sec": round(window.received_bytes * 8 / 1000 / wall, 1),
+        "frame_decode_ms": round(window.decoder.decode_time.mean * 1000, 3),
+        "frame_assemble_ms": round(window.assembler.assemble_time.mean * 1000, 3) if ns.delta else None,
+        "frames_lost_in_transit": max(0, expected - window.received),
+        "frames_duplicate": int(window.frames_duplicate.value),
+        "duplicate_kbytes": round(window.duplicate_bytes.value / 1000, 1),
+        "frames_dropped_decode": window.decoder.dropped,
+        "frames_skipped_playout": window.image_buffer.skipped,
+        "action_steps_per_sec": round(step_stats["steps"] / wall, 2) if not ns.no_action else None,
+        "action_step_latency_ms": round(step_stats["mean_latency_ms"], 2) if not ns.no_action else None,
+        "gui_busy_pct": round(100 * result["busy"] / wall, 2),
+        "http": server.request_stats(),
+    }
+    window.close()
+    standin.should_exit = True
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end OptimusGUI benchmark")
+    parser.add_argument("--port", type=int, default=9611)
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--encoding", choices=sorted(ENCODINGS), default="jpeg")
+    parser.add_argument("--hold", type=int, default=1, help="repeat each stand-in frame this many times")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated one-way network delay, seconds")
+    parser.add_argument("--inference-latency", type=float, default=0.02)
+    parser.add_argument("--base64", action="store_true", help="use legacy base64 text frames")
+    parser.add_argument("--delta", action="store_true", help="keyframes plus changed tiles")
+    parser.add_argument("--ws-control", action="store_true", help="send action steps over the observation WebSocket")
+    parser.add_argument("--window", help="window size, WIDTHxHEIGHT; frames are negotiated down to the image area")
+    parser.add_argument("--quality", type=int)
+    parser.add_argument("--max-fps", type=float)
+    parser.add_argument("--target-latency", type=float, default=0.15)
+    parser.add_argument("--no-action", action="store_true", help="don't run the action loop during the benchmark")
+    parser.add_argument("--action-rate", type=float, default=0.0)
+    parser.add_argument("--action-window", type=int, default=2)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--record", help="record the session to this file while benchmarking")
+    parser.add_argument("--json", help="also write the report to this file")
+    ns = parser.parse_args(argv)
+
+    report = run(ns)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if ns.json:
+        with open(ns.json, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
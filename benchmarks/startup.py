@@ -0,0 +1,110 @@
+"""Cold-start benchmark: time to first paint and first frame of a fresh client process, headless.
+
+    python -m benchmarks.startup --runs 5 --startup-latency 1.0 --json startup.json
+
+Each run starts a new interpreter so imports are paid in full; times are measured from the spawn.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# modules the window should not need before its first paint
+DEFERRED_MODULES = ("numpy", "PIL", "rich")
+
+
+def run_child(ns):
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from gui.main_window import STARTUP_STEPS, MainWindow
+    from server.api import Server
+
+    stamps = {"import": time.time() - ns.spawned}
+    loaded_at_paint = []
+    app = QApplication([])
+
+    class StartupWindow(MainWindow):
+        def _startup_step_done(self, step: str):
+            if step not in self.startup_times:
+                stamps[step] = time.time() - ns.spawned
+                if step == "paint":
+                    loaded_at_paint.extend(m for m in DEFERRED_MODULES if m in sys.modules)
+            super()._startup_step_done(step)
+            if all(s in stamps for s in STARTUP_STEPS + ("paint",)):
+                app.quit()
+
+    window = StartupWindow(Server(url=f"http://{ns.host}", port=ns.port, verbose=False, check_status=False))
+    stamps["window"] = time.time() - ns.spawned
+    window.show()
+    QTimer.singleShot(int(ns.timeout * 1000), app.quit)
+    app.exec()
+    print(json.dumps({"stamps": stamps, "loaded_at_paint": loaded_at_paint}), flush=True)
+    # skip the teardown, it isn't part of the startup
+    os._exit(0)
+
+
+def summarize(runs: list) -> dict:
+    keys = ["import", "window", "paint", "status", "initial_text", "connection", "frame"]
+    summary = {}
+    for key in keys:
+        values = [r["stamps"][key] * 1000 for r in runs if key in r["stamps"]]
+        if values:
+            summary[key] = {"median": round(statistics.median(values), 1), "max": round(max(values), 1)}
+        else:
+            summary[key] = None
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OptimusGUI cold-start benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9612)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--startup-latency", type=float, default=0.5, help="delay of /status and /initial_text, seconds")
+    parser.add_argument("--timeout", type=float, default=15.0, help="give up on a run after this many seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned", type=float, help=argparse.SUPPRESS)
+    ns = parser.parse_args(argv)
+    if ns.child:
+        run_child(ns)
+        return
+
+    from benchmarks.e2e import start_standin
+    from server.standin import StandinArgument
+
+    standin = start_standin(StandinArgument(host=ns.host, port=ns.port, startup_latency=ns.startup_latency))
+    runs = []
+    for _ in range(ns.runs):
+        args = [sys.executable, "-m", "benchmarks.startup", "--child", "--host", ns.host, "--port", str(ns.port)]
+        args += ["--timeout", str(ns.timeout), "--spawned", repr(time.time())]
+        out = subprocess.run(args, capture_output=True, text=True, timeout=ns.timeout + 30)
+        lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            print(f"Run failed: {out.stderr.strip()}", file=sys.stderr)
+            continue
+        runs.append(json.loads(lines[-1]))
+    standin.should_exit = True
+
+    report = {
+        "config": {"runs": len(runs), "startup_latency_s": ns.startup_latency},
+        # milliseconds from process spawn
+        "ms_since_spawn": summarize(runs),
+        "loaded_at_first_paint": sorted({m for r in runs for m in r["loaded_at_paint"]}),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if ns.json:
+        with open(ns.json, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import itertools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Optional
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtWebSockets import QWebSocket
+
+from gui.protocol import rpc_message
+from server.api import ControlError, ControlTimeout, ControlUnavailable
+
+
+class ControlChannel(QObject):
+    """Control calls multiplexed over the observation WebSocket, matched to replies by request id.
+
+    `call` blocks the calling thread until the reply arrives, so it is meant for the worker threads
+    the GUI already runs server calls on. From the GUI thread itself it raises ControlUnavailable,
+    the reply could never be delivered while that thread waits for it.
+    """
+
+    _outgoing = pyqtSignal(int, str)  # request id, message
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.ws: Optional[QWebSocket] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        # emitted from worker threads, delivered (queued) on the GUI thread that owns the socket
+        self._outgoing.connect(self._send)
+
+    @property
+    def ready(self) -> bool:
+        return self.ws is not None
+
+    def attach(self, ws: QWebSocket):
+        """Start routing calls over `ws`, once the server has acked control in its hello_ack."""
+        self.ws = ws
+
+    def detach(self):
+        """The socket is gone; calls waiting for a reply fail and new ones go over HTTP."""
+        self.ws = None
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ControlTimeout("control channel disconnected"))
+
+    def call(self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        if self.ws is None:
+            raise ControlUnavailable("control channel not connected")
+        if QThread.currentThread() is self.thread():
+            raise ControlUnavailable("control calls can't wait on the GUI thread")
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+        self._outgoing.emit(request_id, rpc_message(request_id, method, params))
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise ControlTimeout(f"no reply to {method} within {timeout} s") from None
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def handle(self, message: dict) -> bool:
+        """Resolve the call a reply belongs to; False if `message` is not a reply."""
+        kind = message.get("type")
+        if kind not in ("rpc_result", "rpc_error"):
+            return False
+        with self._lock:
+            future = self._pending.pop(message.get("id"), None)
+        # a reply for a call that already timed out is dropped
+        if future is not None:
+            if kind == "rpc_result":
+                future.set_result(message.get("result") or {})
+            else:
+                future.set_exception(ControlError(message.get("error") or "unknown error"))
+        return True
+
+    def _send(self, request_id: int, text: str):
+        if self.ws is not None and self.ws.isValid():
+            self.ws.sendTextMessage(text)
+            return
+        # never went out, so the caller can safely repeat it over HTTP
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+        if future is not None:
+            future.set_exception(ControlUnavailable("control channel closed before the call was sent"))
@@ -0,0 +1,250 @@
+import math
+import os
+import threading
+import time
+from typing import List, Optional
+
+from PyQt6.QtCore import QSize, Qt, QThreadPool, QTimer, QUrl, pyqtSignal
+from PyQt6.QtGui import QFont, QImage, QPixmap
+from PyQt6.QtWebSockets import QWebSocket
+from PyQt6.QtWidgets import (
+    QFrame,
+    QGridLayout,
+    QHBoxLayout,
+    QLabel,
+    QMainWindow,
+    QPushButton,
+    QScrollArea,
+    QSizePolicy,
+    QVBoxLayout,
+    QWidget,
+)
+
+from gui.decoder import FrameDecoder
+from gui.protocol import Frame, ProtocolError, config_message, frame_from_base64, hello_message, parse_frame
+from server.api import Server
+from server.log import log
+from server.metrics import metrics
+from server.stepper import ActionStepper
+
+
+class ServerTile(QFrame):
+    """One server in the dashboard: its own observation stream and controls, decoding on a shared pool."""
+
+    # result of the background /status check
+    status_signal = pyqtSignal(bool)
+
+    def __init__(self, server: Server, pool: QThreadPool, max_fps: float = 15.0, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.server = server
+        self.max_fps = max_fps
+        self.paused = False
+        # None until the status check comes back
+        self.reachable: Optional[bool] = None
+        self.frames_received = 0
+        self.frames_shown = 0
+        self._stashed: Optional[Frame] = None
+        self._last_submit = 0.0
+        self._last_counts = (0, 0)
+        self._sent_size: Optional[tuple] = None
+
+        # one frame decoding and one waiting per tile, anything older is stale
+        self.decoder = FrameDecoder(
+            pool=pool, max_in_flight=1, max_pending=1, target_size=None, parent=self, labels={"server": server.base}
+        )
+        self.decoder.frame_decoded.connect(self._on_frame_decoded)
+        self.stepper = ActionStepper(server)
+
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.setStyleSheet("background-color: #2E2E2E;")
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.setSpacing(4)
+
+        self.title = QLabel(server.base)
+        self.title.setStyleSheet("color: #E0E0E0;")
+        layout.addWidget(self.title)
+
+        self.image_label = QLabel("Waiting for server...")
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.image_label.setStyleSheet("color: #FFFFFF;")
+        self.image_label.setMinimumSize(320, 180)
+        self.image_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        layout.addWidget(self.image_label, stretch=1)
+
+        btn_style = "color: #FFFFFF; background-color: #555555;"
+        btn_layout = QHBoxLayout()
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.handle_pause)
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.clicked.connect(self.handle_reset)
+        self.action_button = QPushButton("Run Action")
+        self.action_button.clicked.connect(self.handle_action)
+        for btn in (self.pause_button, self.reset_button, self.action_button):
+            btn.setFont(QFont("Arial", 10, QFont.Weight.Bold))
+            btn.setStyleSheet(btn_style)
+            btn_layout.addWidget(btn)
+        layout.addLayout(btn_layout)
+
+        self.ws = QWebSocket()
+        self.ws.connected.connect(self._on_ws_connected)
+        self.ws.errorOccurred.connect(lambda e: self.title.setText(f"{server.base}  WebSocket error: {e}"))
+        self.ws.textMessageReceived.connect(self._on_ws_message)
+        self.ws.binaryMessageReceived.connect(self._on_ws_binary_message)
+        host = QUrl(server.url).host()
+        self.ws.open(QUrl(f"ws://{host}:{server.port}/ws/obs"))
+
+        # servers are created with check_status=False, an unreachable one must not hold up the grid
+        self.status_signal.connect(self._on_status)
+        threading.Thread(target=self._check_status, daemon=True).start()
+
+    def _check_status(self):
+        try:
+            ok = bool(self.server.check())
+        except Exception:
+            ok = False
+        self.status_signal.emit(ok)
+
+    def _on_status(self, ok: bool):
+        self.reachable = ok
+        if not ok:
+            self.image_label.setText("Server is not reachable.")
+
+    def _display_size(self) -> tuple:
+        # 16:9 inside the label
+        size = self.image_label.size()
+        width = min(size.width(), size.height() * 16 // 9)
+        return (max(width, 16), max(width * 9 // 16, 9))
+
+    def _on_ws_connected(self):
+        # tiles are small, there is no point in the server sending full-size frames at full rate
+        self._sent_size = self._display_size()
+        self.ws.sendTextMessage(hello_message(True, max_size=self._sent_size, max_fps=self.max_fps))
+
+    def is_on_screen(self) -> bool:
+        return self.isVisible() and not self.window().isMinimized() and not self.visibleRegion().isEmpty()
+
+    def _on_ws_message(self, b64_str: str):
+        if b64_str and not b64_str.startswith("{"):
+            self._on_frame(frame_from_base64(b64_str))
+
+    def _on_ws_binary_message(self, data):
+        try:
+            self._on_frame(parse_frame(data.data()))
+        except ProtocolError as e:
+            metrics.counter("frames_bad_total", {"server": self.server.base}).inc()
+            log(f"{self.server.base}: bad binary frame: {e}")
+
+    def _on_frame(self, frame: Frame):
+        self.frames_received += 1
+        # hidden or over the rate cap: keep only the newest compressed frame, decode nothing
+        if not self.is_on_screen() or time.monotonic() - self._last_submit < 1.0 / self.max_fps:
+            self._stashed = frame
+            return
+        self._submit(frame)
+
+    def refresh(self):
+        if self._stashed is None or time.monotonic() - self._last_submit < 1.0 / self.max_fps:
+            return
+        if self.is_on_screen():
+            self._submit(self._stashed)
+
+    def _submit(self, frame: Frame):
+        self._stashed = None
+        self._last_submit = time.monotonic()
+        # decode straight to the displayed size
+        size = self._display_size()
+        self.decoder.target_size = QSize(*size)
+        if size != self._sent_size and self.ws.isValid():
+            self._sent_size = size
+            self.ws.sendTextMessage(config_message(size, max_fps=self.max_fps))
+        self.decoder.submit(frame)
+
+    def _on_frame_decoded(self, frame: Frame, qimg: QImage):
+        self.image_label.setPixmap(QPixmap.fromImage(qimg))
+        self.frames_shown += 1
+
+    def update_title(self, interval: float):
+        received, shown = self.frames_received, self.frames_shown
+        rx = (received - self._last_counts[0]) / interval
+        fps = (shown - self._last_counts[1]) / interval
+        self._last_counts = (received, shown)
+        if self.reachable is False:
+            state = "unreachable"
+        else:
+            state = "paused" if self.paused else ("action" if self.stepper.running else "idle")
+        self.title.setText(f"{self.server.base}  {state}  {fps:.0f}/{rx:.0f} fps")
+
+    def handle_pause(self):
+        self.paused = not self.paused
+        self.pause_button.setText("Resume" if self.paused else "Pause")
+        if self.paused:
+            self.stepper.stop()
+            threading.Thread(target=self.server.pause, daemon=True).start()
+        else:
+            threading.Thread(target=self.server.resume, daemon=True).start()
+
+    def handle_reset(self):
+        self.stepper.stop()
+        self.decoder.clear()
+        self._stashed = None
+        threading.Thread(target=self.server.reset, daemon=True).start()
+
+    def handle_action(self):
+        if self.stepper.running:
+            self.stepper.stop()
+            self.action_button.setText("Run Action")
+        elif not self.paused:
+            self.stepper.start("action")
+            self.action_button.setText("Stop Action")
+
+    def shutdown(self):
+        self.stepper.shutdown()
+        self.ws.close()
+
+
+class DashboardWindow(QMainWindow):
+    """Grid of server tiles sharing one decode pool; CPU follows the visible tiles, not their number."""
+
+    def __init__(self, servers: List[Server], max_fps: float = 15.0, decode_threads: Optional[int] = None):
+        super().__init__()
+        self.setWindowTitle(f"Optimus-3 Dashboard — {len(servers)} servers")
+        self.setGeometry(100, 100, 1600, 900)
+        self.setStyleSheet("background-color: #2E2E2E;")
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(decode_threads or max(2, (os.cpu_count() or 4) - 1))
+
+        container = QWidget()
+        grid = QGridLayout(container)
+        grid.setSpacing(6)
+        columns = max(1, math.ceil(math.sqrt(len(servers))))
+        self.tiles = []
+        for i, server in enumerate(servers):
+            tile = ServerTile(server, self.pool, max_fps=max_fps)
+            grid.addWidget(tile, i // columns, i % columns)
+            self.tiles.append(tile)
+
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(container)
+        self.setCentralWidget(scroll)
+
+        # picks up stashed frames of tiles that became visible or are under their rate cap
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self._refresh)
+        self.refresh_timer.start(max(1, int(1000 / max_fps)))
+        self.title_timer = QTimer(self)
+        self.title_timer.timeout.connect(lambda: [tile.update_title(1.0) for tile in self.tiles])
+        self.title_timer.start(1000)
+
+    def _refresh(self):
+        if self.isMinimized():
+            return
+        for tile in self.tiles:
+            tile.refresh()
+
+    def closeEvent(self, event):
+        for tile in self.tiles:
+            tile.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,297 @@
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from gui.protocol import Frame, FrameEncoding, ProtocolError, parse_tiles
+from server.log import log
+from server.metrics import metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy (through gui.utils and gui.delta) is imported on the worker threads that first need it,
+# JPEG/PNG/WebP frames and the window itself don't
+
+
+# live decoders, summed per label set by the drop gauge (the registry keeps the first callback it is given)
+_decoders: "weakref.WeakSet[FrameDecoder]" = weakref.WeakSet()
+
+
+def decode_frame(frame: Frame) -> QImage:
+    if frame.is_raw:
+        from gui.utils import numpy_to_qimage, raw_to_numpy
+
+        # no decode at all, the QImage is a view over the received bytes
+        frame.array = raw_to_numpy(frame.data(), frame.width, frame.height)
+        return numpy_to_qimage(frame.array, bgr=frame.encoding == FrameEncoding.RAW_BGR)
+    # QImage (unlike QPixmap) is safe to build off the GUI thread, and PyQt drops the GIL in fromData/scaled
+    return QImage.fromData(frame.data())
+
+
+def scale_image(
+    image: QImage, size: Optional[QSize], mode: Qt.AspectRatioMode = Qt.AspectRatioMode.IgnoreAspectRatio
+) -> QImage:
+    if image.isNull() or size is None or size.isEmpty():
+        return image
+    if image.size() == image.size().scaled(size, mode):
+        return image
+    return image.scaled(size, mode, Qt.TransformationMode.SmoothTransformation)
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, decoder: "FrameDecoder", frame: Frame, index: int, generation: int):
+        super().__init__()
+        self.decoder = decoder
+        self.frame = frame
+        self.index = index
+        self.generation = generation
+
+    def run(self):
+        image = None
+        frame = self.frame
+        start = time.perf_counter()
+        try:
+            image = decode_frame(frame)
+            if not frame.width and not image.isNull():
+                # native size before scaling, e.g. for base64 frames that don't carry one
+                frame.width, frame.height = image.width(), image.height()
+            if self.decoder.array_hooks and not image.isNull():
+                if frame.array is None:
+                    from gui.utils import qimage_to_numpy
+
+                    frame.array = qimage_to_numpy(image)
+                self.decoder._run_hooks(frame)
+            if self.decoder.image_hooks and not image.isNull():
+                self.decoder._run_image_hooks(frame, image)
+            image = scale_image(image, self.decoder.target_size, self.decoder.aspect_mode)
+        except Exception as e:
+            log(f"Frame decode failed: {e}")
+        self.decoder.decode_time.observe(time.perf_counter() - start)
+        self.decoder._task_done(self.frame, image, self.index, self.generation)
+
+
+class FrameDecoder(QObject):
+    """Decodes frames on a thread pool and delivers finished QImages to the GUI thread."""
+
+    frame_decoded = pyqtSignal(object, object)  # Frame, QImage
+
+    def __init__(
+        self,
+        pool: Optional[QThreadPool] = None,
+        max_in_flight: int = 2,
+        max_pending: int = 4,
+        target_size: Optional[QSize] = QSize(640, 360),
+        parent: Optional[QObject] = None,
+        labels: Optional[dict] = None,
+        aspect_mode: Qt.AspectRatioMode = Qt.AspectRatioMode.IgnoreAspectRatio,
+    ):
+        super().__init__(parent)
+        # the target can be changed at any time, e.g. when the display is resized
+        self.target_size = target_size
+        self.aspect_mode = aspect_mode
+        self.decode_time = metrics.histogram("frame_decode_seconds", labels)
+        self.labels = labels
+        _decoders.add(self)
+        metrics.gauge(
+            "frames_dropped_decode",
+            labels,
+            fn=lambda: sum(decoder.dropped for decoder in list(_decoders) if decoder.labels == labels),
+        )
+        self.pool = pool or QThreadPool.globalInstance()
+        self.max_in_flight = max_in_flight
+        self.pending: deque = deque(maxlen=max_pending)
+        self.in_flight = 0
+        self.dropped = 0
+        self.decoded = 0
+        self._next_index = 0
+        self._last_emitted = -1
+        self._generation = 0
+        self._lock = threading.Lock()
+        # called on the worker thread with (frame, (H, W, 3) array), keep them cheap
+        self.array_hooks: List[Callable[[Frame, "np.ndarray"], None]] = []
+        # same, with the decoded QImage before scaling; no pixel copy is made for these
+        self.image_hooks: List[Callable[[Frame, QImage], None]] = []
+        self.failed = 0
+
+    def add_array_hook(self, hook: Callable[[Frame, "np.ndarray"], None]):
+        self.array_hooks.append(hook)
+
+    def add_image_hook(self, hook: Callable[[Frame, QImage], None]):
+        self.image_hooks.append(hook)
+
+    def _run_image_hooks(self, frame: Frame, image: QImage):
+        for hook in self.image_hooks:
+            try:
+                hook(frame, image)
+            except Exception as e:
+                metrics.counter("frame_hook_errors_total").inc()
+                log(f"Frame hook failed: {e}")
+
+    def _run_hooks(self, frame: Frame):
+        for hook in self.array_hooks:
+            try:
+                hook(frame, frame.array)
+            except Exception as e:
+                metrics.counter("frame_hook_errors_total").inc()
+                log(f"Frame hook failed: {e}")
+
+    def submit(self, frame: Frame):
+        with self._lock:
+            index = self._next_index
+            self._next_index += 1
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                task = _DecodeTask(self, frame, index, self._generation)
+            else:
+                # decoding is behind, the oldest waiting frame is the least useful one
+                if len(self.pending) == self.pending.maxlen:
+                    self.dropped += 1
+                self.pending.append((frame, index))
+                return
+        self.pool.start(task)
+
+    def clear(self):
+        # results of tasks that are already running are discarded when they finish
+        with self._lock:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self._generation += 1
+
+    def _task_done(self, frame: Frame, image: Optional[QImage], index: int, generation: int):
+        next_task = None
+        emit = False
+        with self._lock:
+            self.in_flight -= 1
+            if generation == self._generation and image is not None and not image.isNull():
+                if index > self._last_emitted:
+                    self._last_emitted = index
+                    self.decoded += 1
+                    emit = True
+                else:
+                    # a newer frame finished first
+                    self.dropped += 1
+            elif generation == self._generation:
+                # corrupt or truncated payload, QImage gives a null image instead of raising
+                self.failed += 1
+            if self.pending:
+                next_frame, next_index = self.pending.popleft()
+                self.in_flight += 1
+                next_task = _DecodeTask(self, next_frame, next_index, self._generation)
+        if next_task is not None:
+            self.pool.start(next_task)
+        if emit:
+            # emitted from the worker, delivered to the GUI thread through a queued connection
+            self.frame_decoded.emit(frame, image)
+
+
+_STOP = object()
+
+
+class DeltaAssembler(QObject):
+    """Applies keyframes and tile deltas in arrival order on one thread and hands whole frames to a decoder.
+
+    Delta frames can't be dropped the way FrameDecoder drops stale frames, so they are assembled
+    first; when several are waiting only the newest result is passed on.
+    """
+
+    keyframe_needed = pyqtSignal()
+
+    def __init__(self, decoder: FrameDecoder, parent: Optional[QObject] = None, labels: Optional[dict] = None):
+        super().__init__(parent)
+        self.decoder = decoder
+        # created on the assembler thread, see _run
+        self.canvas = None
+        self.assemble_time = metrics.histogram("frame_assemble_seconds", labels)
+        self.coalesced = 0
+        self.discarded = 0
+        self._generation = 0
+        self._waiting_for_keyframe = False
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: Frame):
+        self._queue.put((self._generation, frame))
+
+    def clear(self):
+        # e.g. after a reset, tiles of the old episode must not land on the new one
+        self._generation += 1
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        import numpy as np
+
+        from gui.delta import TileCanvas
+
+        self.canvas = TileCanvas()
+        generation = 0
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            result = None
+            start = time.perf_counter()
+            for item in batch:
+                if item is _STOP:
+                    return
+                item_generation, frame = item
+                if item_generation != generation:
+                    generation = item_generation
+                    self.canvas.reset()
+                    result = None
+                if item_generation != self._generation:
+                    continue
+                try:
+                    applied = self._apply(frame)
+                except Exception as e:
+                    metrics.counter("delta_frame_errors_total").inc()
+                    log(f"Delta frame failed: {e}")
+                    applied = False
+                if applied:
+                    if result is not None:
+                        self.coalesced += 1
+                    result = frame
+            if result is not None:
+                image = self.canvas.image()
+                height, width = image.shape[:2]
+                # the canvas keeps changing, the decoder gets a snapshot as a raw frame
+                payload = memoryview(np.ascontiguousarray(image).copy()).cast("B")
+                self.assemble_time.observe(time.perf_counter() - start)
+                self.decoder.submit(Frame(payload, FrameEncoding.RAW_RGB, result.seq, result.timestamp, width, height))
+
+    def _apply(self, frame: Frame) -> bool:
+        if frame.encoding != FrameEncoding.TILES:
+            image = decode_frame(frame)
+            if image.isNull():
+                raise ProtocolError("keyframe could not be decoded")
+            if frame.array is not None:
+                array = frame.array
+            else:
+                from gui.utils import qimage_to_numpy
+
+                array = qimage_to_numpy(image)
+            if frame.encoding == FrameEncoding.RAW_BGR:
+                array = array[..., ::-1]
+            self.canvas.set_keyframe(array, frame.seq)
+            self._waiting_for_keyframe = False
+            return True
+        if self.canvas.apply(*parse_tiles(frame.data())):
+            return True
+        self.discarded += 1
+        if not self._waiting_for_keyframe:
+            # missed the keyframe these tiles build on, ask for a new one instead of waiting for the next
+            self._waiting_for_keyframe = True
+            self.keyframe_needed.emit()
+        return False
@@ -0,0 +1,105 @@
+"""Tile deltas for mostly-static observations.
+
+The server sends a keyframe (a normal JPEG/PNG/raw frame) and then TILES frames holding only the
+square tiles that changed since. Both sides keep the same reference image: the server diffs new
+frames against what the client has reconstructed, not against its own lossless frames, so lossy
+keyframes don't make every tile look changed and errors don't accumulate.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from gui.protocol import pack_tiles
+
+
+def pad_to_tiles(array: np.ndarray, tile_size: int) -> np.ndarray:
+    height, width = array.shape[:2]
+    pad_h, pad_w = -height % tile_size, -width % tile_size
+    if not pad_h and not pad_w:
+        return array
+    return np.pad(array, ((0, pad_h), (0, pad_w), (0, 0)), mode="edge")
+
+
+def tile_view(array: np.ndarray, tile_size: int) -> np.ndarray:
+    """(rows, cols, T, T, 3) view of a padded (H, W, 3) array; writes go through to `array`."""
+    height, width = array.shape[:2]
+    rows, cols = height // tile_size, width // tile_size
+    return array.reshape(rows, tile_size, cols, tile_size, 3).swapaxes(1, 2)
+
+
+class TileEncoder:
+    """Server side: decides when to send a keyframe and which tiles changed otherwise."""
+
+    def __init__(self, tile_size: int = 32, threshold: float = 4.0, keyframe_interval: int = 60, level: int = 1):
+        self.tile_size = tile_size
+        # mean absolute difference per tile above which it is resent; 0 resends any change
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.reference: Optional[np.ndarray] = None
+        self.keyframe_seq = 0
+        self._since_keyframe = 0
+        self._force = True
+
+    def force_keyframe(self):
+        self._force = True
+
+    def keyframe_due(self) -> bool:
+        return self._force or self.reference is None or self._since_keyframe >= self.keyframe_interval
+
+    def set_keyframe(self, reference: np.ndarray, seq: int):
+        """`reference` is the keyframe as the client will decode it."""
+        self.reference = pad_to_tiles(np.array(reference, dtype=np.uint8), self.tile_size)
+        self.keyframe_seq = seq
+        self._since_keyframe = 0
+        self._force = False
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        padded = pad_to_tiles(frame, self.tile_size)
+        if padded.shape != self.reference.shape:
+            raise ValueError(f"frame shape {frame.shape} doesn't match the keyframe")
+        current = tile_view(padded, self.tile_size)
+        reference = tile_view(self.reference, self.tile_size)
+        diff = np.abs(current.astype(np.int16) - reference).mean(axis=(2, 3, 4))
+        rows, cols = np.nonzero(diff > self.threshold)
+        tiles = current[rows, cols]
+        # the client ends up with these tiles, so does our reference
+        reference[rows, cols] = tiles
+        self._since_keyframe += 1
+        positions = np.stack([cols, rows], axis=1)
+        return pack_tiles(self.keyframe_seq, self.tile_size, positions, tiles, self.level)
+
+
+class TileCanvas:
+    """Client side: the reconstructed frame, updated in place by keyframes and tile deltas."""
+
+    def __init__(self):
+        self.array: Optional[np.ndarray] = None
+        self.size: Tuple[int, int] = (0, 0)  # width, height without padding
+        self.keyframe_seq: Optional[int] = None
+
+    def reset(self):
+        self.array = None
+        self.keyframe_seq = None
+
+    def set_keyframe(self, image: np.ndarray, seq: Optional[int]):
+        height, width = image.shape[:2]
+        self.size = (width, height)
+        self.array = np.array(image, dtype=np.uint8)
+        self.keyframe_seq = seq
+
+    def apply(self, base_seq: int, tile_size: int, positions: np.ndarray, tiles: np.ndarray) -> bool:
+        """Write the tiles in; False if they belong to a keyframe we don't have."""
+        if self.array is None or self.keyframe_seq is None or base_seq != self.keyframe_seq & 0xFFFFFFFF:
+            return False
+        if self.array.shape[0] % tile_size or self.array.shape[1] % tile_size:
+            self.array = pad_to_tiles(self.array, tile_size)
+        if len(positions):
+            # one fancy-indexed write for all tiles
+            tile_view(self.array, tile_size)[positions[:, 1], positions[:, 0]] = tiles
+        return True
+
+    def image(self) -> np.ndarray:
+        width, height = self.size
+        return self.array[:height, :width]
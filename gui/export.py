@@ -0,0 +1,486 @@
+"""Export a recorded session (or a snapshot of the live history) to MP4, WebM or GIF.
+
+    python -m gui.export episode.ogs episode.mp4 --fps 15 --width 960 --workers 4
+
+The timeline is cut into chunks that worker processes render and encode independently: each
+opens the session itself, decodes its frames (rebuilding TILES frames from their keyframe), burns
+in captions and grounding boxes and pipes the result to its own ffmpeg (libx264 / libvpx-vp9, CPU
+only). The segments are joined without re-encoding, GIF segments by copying their image blocks
+into one file. Nothing here imports Qt, so the workers start quickly.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from gui.grounding import parse_grounding
+from gui.protocol import Frame, FrameEncoding, parse_tiles
+from gui.session import KIND_COMMAND, KIND_EVENT, KIND_RESPONSE, SessionReader, SessionWriter
+
+FORMATS = (".mp4", ".webm", ".gif")
+
+# encoder options per container; every segment is encoded the same way so they can be joined as-is
+_CODECS = {
+    ".mp4": lambda crf: ["-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf), "-pix_fmt", "yuv420p"],
+    ".webm": lambda crf: [
+        "-c:v", "libvpx-vp9", "-b:v", "0", "-crf", str(crf), "-deadline", "realtime", "-cpu-used", "8", "-pix_fmt", "yuv420p"
+    ],
+}
+_DEFAULT_CRF = {".mp4": 23, ".webm": 33}
+
+
+class ExportError(RuntimeError):
+    pass
+
+
+@dataclass
+class ExportArgument:
+    fps: float = 10.0
+    # frames wider than this are scaled down; GIFs default to 640
+    width: Optional[int] = None
+    captions: bool = True
+    boxes: bool = True
+    # how long a command/response stays on screen, and grounding boxes (the overlay's default ttl)
+    caption_seconds: float = 6.0
+    box_seconds: float = 10.0
+    # None picks a per-codec default
+    crf: Optional[int] = None
+    # None leaves a core for the GUI
+    workers: Optional[int] = None
+    # seconds of output per chunk, smaller chunks balance better but each restarts from a keyframe
+    chunk_seconds: float = 10.0
+
+
+# (timestamp, text)
+Caption = Tuple[float, str]
+# (timestamp, x1, y1, x2 or None for a point, y2, label, color, (width, height) of the coordinates or None)
+Box = Tuple[float, float, float, Optional[float], Optional[float], str, str, Optional[Tuple[int, int]]]
+
+
+def find_ffmpeg() -> str:
+    """The ffmpeg bundled with imageio-ffmpeg if installed, otherwise the one on PATH."""
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        pass
+    path = shutil.which("ffmpeg")
+    if path is None:
+        raise ExportError("MP4/WebM export needs ffmpeg: pip install imageio-ffmpeg, or put ffmpeg on PATH")
+    return path
+
+
+def annotations(reader: SessionReader) -> Tuple[List[Caption], List[Box]]:
+    """Captions from the recorded commands and responses, boxes from grounding responses."""
+    captions: List[Caption] = []
+    boxes: List[Box] = []
+    source_size = None
+    for record in sorted(reader.records(), key=lambda r: r["timestamp"]):
+        timestamp = record["timestamp"]
+        if record["kind"] == KIND_EVENT:
+            if record.get("event") == "stream" and record.get("source_size"):
+                source_size = tuple(record["source_size"])
+        elif record["kind"] == KIND_COMMAND:
+            if record.get("text"):
+                captions.append((timestamp, f"You ({record['task']}): {record['text']}"))
+        elif record["kind"] == KIND_RESPONSE and record.get("response"):
+            task = record.get("task")
+            captions.append((timestamp, f"{'Action' if task == 'action' else 'Agent'}: {record['response']}"))
+            if task == "grounding":
+                for item in parse_grounding(record["response"]):
+                    boxes.append((timestamp, item.x1, item.y1, item.x2, item.y2, item.label, item.color, source_size))
+    return captions, boxes
+
+
+def write_session(path: str, frames: Iterable[Tuple[float, Frame]], records: Iterable[Tuple[float, str, dict]]):
+    """Write (time, frame) pairs and (time, "command" | "response" | "event", body) records to a new session file."""
+    writer = SessionWriter(path)
+    items = [(timestamp, "", frame) for timestamp, frame in frames]
+    items += list(records)
+    # in time order, a frame and a record at the same time keep the frame first
+    for timestamp, kind, body in sorted(items, key=lambda item: (item[0], item[1])):
+        if not kind:
+            writer.record_frame(body, timestamp)
+        elif kind == "command":
+            writer.record_command(body.get("text"), body.get("task"), timestamp)
+        elif kind == "response":
+            writer.record_response(body.get("response"), body.get("task"), timestamp)
+        else:
+            writer.record_event(body.get("event"), timestamp, **{k: v for k, v in body.items() if k != "event"})
+    writer.close()
+
+
+def decode_array(frame: Frame) -> np.ndarray:
+    """(H, W, 3) RGB pixels of a keyframe, without Qt."""
+    if frame.is_raw:
+        array = np.frombuffer(frame.data(), dtype=np.uint8).reshape(frame.height, frame.width, 3)
+        return array[..., ::-1] if frame.encoding == FrameEncoding.RAW_BGR else array
+    from PIL import Image
+
+    with Image.open(io.BytesIO(frame.data())) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+class _FrameSource:
+    """Frames of a session by index, reusing the tile canvas when moving forward."""
+
+    def __init__(self, reader: SessionReader):
+        from gui.delta import TileCanvas
+
+        self.reader = reader
+        encodings = reader.frame_index["encoding"]
+        self.keyframes = np.flatnonzero(encodings != FrameEncoding.TILES)
+        self.delta = len(self.keyframes) < len(encodings)
+        self.canvas = TileCanvas()
+        self.index = -1
+        self.image: Optional[np.ndarray] = None
+
+    def get(self, index: int) -> Optional[np.ndarray]:
+        if index == self.index:
+            return self.image
+        if not self.delta:
+            self.image = decode_array(self.reader.frame(index))
+        else:
+            k = int(np.searchsorted(self.keyframes, index, side="right")) - 1
+            keyframe = int(self.keyframes[k]) if k >= 0 else 0
+            # carry on from the frame shown last if no keyframe came in between
+            start = self.index + 1 if keyframe <= self.index < index else keyframe
+            for i in range(start, index + 1):
+                frame = self.reader.frame(i)
+                if frame.encoding == FrameEncoding.TILES:
+                    self.canvas.apply(*parse_tiles(frame.data()))
+                else:
+                    self.canvas.set_keyframe(decode_array(frame), frame.seq)
+            self.image = self.canvas.image() if self.canvas.array is not None else None
+        self.index = index
+        return self.image
+
+
+class _Renderer:
+    """Scales frames to the output size and burns in captions and boxes with PIL."""
+
+    def __init__(self, size: Tuple[int, int], captions: List[Caption], boxes: List[Box], args: ExportArgument):
+        from PIL import ImageFont
+
+        self.size = size
+        self.captions = captions
+        self.caption_times = np.array([c[0] for c in captions])
+        self.boxes = boxes
+        self.args = args
+        font_size = max(12, size[1] // 32)
+        try:
+            self.font = ImageFont.load_default(size=font_size)
+        except TypeError:
+            # Pillow before 10.1 has one fixed-size bitmap font
+            self.font = ImageFont.load_default()
+        self.line_height = font_size + 4
+        # rough characters per line for wrapping, the default font is about 0.6 em wide
+        self.line_chars = max(20, int(size[0] / (font_size * 0.6)))
+
+    def render(self, array: Optional[np.ndarray], t: float):
+        from PIL import Image, ImageDraw
+
+        width, height = self.size
+        if array is None:
+            image = Image.new("RGB", self.size)
+            source = self.size
+        else:
+            image = Image.fromarray(np.ascontiguousarray(array))
+            source = image.size
+            if image.size != self.size:
+                image = image.resize(self.size, Image.Resampling.BILINEAR)
+        draw = ImageDraw.Draw(image, "RGBA")
+        if self.args.boxes:
+            for timestamp, x1, y1, x2, y2, label, color, size in self.boxes:
+                if not timestamp <= t < timestamp + self.args.box_seconds:
+                    continue
+                sx, sy = width / (size or source)[0], height / (size or source)[1]
+                left, top = x1 * sx, y1 * sy
+                if x2 is None:
+                    draw.ellipse((left - 6, top - 6, left + 6, top + 6), outline=color, width=3)
+                else:
+                    right, bottom = x2 * sx, y2 * sy
+                    draw.rectangle((min(left, right), min(top, bottom), max(left, right), max(top, bottom)), outline=color, width=3)
+                if label:
+                    text_box = draw.textbbox((0, 0), label, font=self.font)
+                    label_top = top - (text_box[3] + 4) if top - (text_box[3] + 4) >= 0 else top
+                    draw.rectangle((left, label_top, left + text_box[2] + 8, label_top + text_box[3] + 4), fill=color)
+                    draw.text((left + 4, label_top + 2), label, fill="#000000", font=self.font)
+        if self.args.captions and len(self.captions):
+            i = int(np.searchsorted(self.caption_times, t, side="right")) - 1
+            if i >= 0 and t - self.captions[i][0] < self.args.caption_seconds:
+                lines = textwrap.wrap(self.captions[i][1], self.line_chars, max_lines=3, placeholder=" …")
+                top = height - self.line_height * len(lines) - 8
+                draw.rectangle((0, top, width, height), fill=(0, 0, 0, 160))
+                for n, line in enumerate(lines):
+                    draw.text((8, top + 4 + n * self.line_height), line, fill="#FFFFFF", font=self.font)
+        return image
+
+
+# the ffmpeg of the chunk this worker is encoding, killed along with the worker on cancel
+_encoder: Optional[subprocess.Popen] = None
+
+
+def _init_worker():
+    def terminate(signum, frame):
+        if _encoder is not None:
+            _encoder.kill()
+        os._exit(1)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+
+def _read_blocks(data: bytes, pos: int) -> int:
+    """Position after the data sub-blocks starting at `pos`."""
+    while data[pos]:
+        pos += data[pos] + 1
+    return pos + 1
+
+
+def join_gifs(paths: List[str], output: str):
+    """Concatenate GIF files frame by frame, without decoding them.
+
+    Each segment has its own global palette, so it is attached to that segment's frames as a
+    local palette. The loop extension is taken from the first segment only.
+    """
+    with open(output, "wb") as out:
+        for n, path in enumerate(paths):
+            with open(path, "rb") as f:
+                data = f.read()
+            flags = data[10]
+            table_end = 13 + (3 << ((flags & 7) + 1) if flags & 0x80 else 0)
+            palette = data[13:table_end]
+            palette_flags = 0x80 | (flags & 7) if flags & 0x80 else 0
+            if n == 0:
+                out.write(data[:table_end])
+            pos = table_end
+            while data[pos] != 0x3B:
+                if data[pos] == 0x21:
+                    end = _read_blocks(data, pos + 2)
+                    # application extensions (NETSCAPE2.0 looping) belong to the file, not to a frame
+                    if data[pos + 1] != 0xFF or n == 0:
+                        out.write(data[pos:end])
+                elif data[pos] == 0x2C:
+                    image_flags = data[pos + 9]
+                    if image_flags & 0x80:
+                        # a palette of its own
+                        header_end = pos + 10 + (3 << ((image_flags & 7) + 1))
+                        out.write(data[pos:header_end])
+                    else:
+                        header_end = pos + 10
+                        out.write(data[pos : pos + 9] + bytes([(image_flags & 0x78) | palette_flags]) + palette)
+                    # LZW minimum code size, then the image data
+                    end = _read_blocks(data, header_end + 1)
+                    out.write(data[header_end:end])
+                else:
+                    raise ExportError(f"{path}: unexpected GIF block {data[pos]:#x}")
+                pos = end
+        out.write(b"\x3b")
+
+
+def _render_chunk(
+    session_path: str,
+    times: np.ndarray,
+    size: Tuple[int, int],
+    captions: List[Caption],
+    boxes: List[Box],
+    args: ExportArgument,
+    fmt: str,
+    ffmpeg: Optional[str],
+    segment_path: Optional[str],
+):
+    """Worker process: render the frames at `times` and encode them to `segment_path`."""
+    global _encoder
+    reader = SessionReader(session_path)
+    source = _FrameSource(reader)
+    renderer = _Renderer(size, captions, boxes, args)
+    indices = np.searchsorted(reader.frame_times, times, side="right") - 1
+    try:
+        if fmt == ".gif":
+            from PIL import Image
+
+            frames = (
+                renderer.render(source.get(max(0, int(i))), t).quantize(method=Image.Quantize.FASTOCTREE)
+                for i, t in zip(indices, times)
+            )
+            # a chunk at a time, the parent only joins the files
+            next(frames).save(segment_path, save_all=True, append_images=frames, duration=round(1000 / args.fps), loop=0)
+            return segment_path
+        crf = args.crf if args.crf is not None else _DEFAULT_CRF[fmt]
+        command = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", f"{args.fps:g}", "-i", "-",
+            "-an", *_CODECS[fmt](crf),
+            # the pool already uses every core, one encoder thread per process
+            "-threads", "1",
+            segment_path,
+        ]
+        process = _encoder = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for i, t in zip(indices, times):
+                process.stdin.write(renderer.render(source.get(max(0, int(i))), t).tobytes())
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+        errors = process.stderr.read().decode(errors="replace")
+        if process.wait():
+            raise ExportError(f"ffmpeg failed: {errors.strip()}")
+        return segment_path
+    finally:
+        _encoder = None
+        source.image = None
+        reader.close()
+
+
+def output_size(reader: SessionReader, max_width: Optional[int]) -> Tuple[int, int]:
+    widths = reader.frame_index["width"]
+    known = np.flatnonzero(widths)
+    if len(known):
+        width, height = int(widths[known[0]]), int(reader.frame_index["height"][known[0]])
+    else:
+        # base64 frames carry no size, look at the first one
+        first = _FrameSource(reader).get(0)
+        if first is None:
+            raise ExportError("the first frame can't be decoded on its own")
+        height, width = first.shape[:2]
+    if max_width and width > max_width:
+        width, height = max_width, round(height * max_width / width)
+    # yuv420p needs even dimensions
+    return width + width % 2, height + height % 2
+
+
+def export_session(
+    session_path: str,
+    output: str,
+    args: Optional[ExportArgument] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """Encode `session_path` to `output` (format from its extension); returns `output`.
+
+    `progress(done, total)` is called from this thread as chunks finish. Setting `cancel` stops
+    the workers and their encoders within half a second and raises ExportError.
+    """
+    args = args or ExportArgument()
+    fmt = os.path.splitext(output)[1].lower()
+    if fmt not in FORMATS:
+        raise ExportError(f"unsupported format {fmt or output!r}, use one of {', '.join(FORMATS)}")
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise ExportError("export needs Pillow: pip install pillow") from None
+    ffmpeg = find_ffmpeg() if fmt != ".gif" else None
+
+    reader = SessionReader(session_path)
+    try:
+        if not len(reader):
+            raise ExportError(f"{session_path} has no frames")
+        max_width = args.width or (640 if fmt == ".gif" else None)
+        size = output_size(reader, max_width)
+        captions, boxes = annotations(reader) if args.captions or args.boxes else ([], [])
+        start, end = float(reader.frame_times[0]), float(reader.frame_times[-1])
+    finally:
+        reader.close()
+    times = start + np.arange(int((end - start) * args.fps) + 1) / args.fps
+    per_chunk = max(1, int(args.chunk_seconds * args.fps))
+    chunks = [times[i : i + per_chunk] for i in range(0, len(times), per_chunk)]
+    workers = args.workers or max(1, (os.cpu_count() or 2) - 1)
+
+    with tempfile.TemporaryDirectory(prefix="export-") as tmp:
+        results = [None] * len(chunks)
+        # spawn, not fork: the GUI process has Qt and decoder threads a forked child would inherit half of
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)), mp_context=get_context("spawn"), initializer=_init_worker
+        )
+        try:
+            pending = {
+                pool.submit(
+                    _render_chunk, session_path, chunk, size, captions, boxes, args, fmt, ffmpeg,
+                    os.path.join(tmp, f"{n:05d}{fmt}"),
+                ): n
+                for n, chunk in enumerate(chunks)
+            }
+            done = 0
+            while pending:
+                finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if cancel is not None and cancel.is_set():
+                    raise ExportError("export cancelled")
+                for future in finished:
+                    results[pending.pop(future)] = future.result()
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(chunks))
+        except BaseException:
+            # no waiting for the chunks being encoded: queued ones are dropped, running ones killed
+            processes = list((pool._processes or {}).values())
+            pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(1)
+            raise
+        pool.shutdown()
+
+        if fmt == ".gif":
+            join_gifs(results, output)
+        else:
+            listing = os.path.join(tmp, "segments.txt")
+            with open(listing, "w") as f:
+                f.writelines(f"file '{path}'\n" for path in results)
+            command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0", "-i", listing, "-c", "copy"]
+            if fmt == ".mp4":
+                command += ["-movflags", "+faststart"]
+            joined = subprocess.run(command + [output], stderr=subprocess.PIPE)
+            if joined.returncode:
+                raise ExportError(f"ffmpeg failed joining segments: {joined.stderr.decode(errors='replace').strip()}")
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a recorded session to MP4, WebM or GIF")
+    parser.add_argument("session", help="session file recorded with --record")
+    parser.add_argument("output", help="output file, .mp4, .webm or .gif")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--width", type=int, help="scale frames down to this width")
+    parser.add_argument("--workers", type=int, help="encoder processes, all cores but one by default")
+    parser.add_argument("--chunk-seconds", type=float, default=10.0, help="seconds of output per worker task")
+    parser.add_argument("--crf", type=int, help="quality, lower is better (x264 default 23, VP9 33)")
+    parser.add_argument("--no-captions", action="store_true", help="don't burn in commands and responses")
+    parser.add_argument("--no-boxes", action="store_true", help="don't draw grounding boxes")
+    ns = parser.parse_args(argv)
+
+    args = ExportArgument(
+        fps=ns.fps,
+        width=ns.width,
+        captions=not ns.no_captions,
+        boxes=not ns.no_boxes,
+        crf=ns.crf,
+        workers=ns.workers,
+        chunk_seconds=ns.chunk_seconds,
+    )
+    start = time.perf_counter()
+    try:
+        export_session(ns.session, ns.output, args, progress=lambda done, total: print(f"{done}/{total} chunks", file=sys.stderr))
+    except ExportError as e:
+        sys.exit(str(e))
+    print(f"Wrote {ns.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
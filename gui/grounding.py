@@ -0,0 +1,51 @@
+"""Grounding boxes and points parsed from agent responses, independent of Qt."""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+PALETTE = ("#FF3B30", "#34C759", "#FFCC00", "#0A84FF", "#FF9F0A", "#BF5AF2")
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+# "label: (x1,y1),(x2,y2)", "label: [x1, y1, x2, y2]" or a point "label: (x,y)", the label is optional
+_GROUNDING_RE = re.compile(
+    r"(?:(?P<label>[^\n():;,\[\]]*?)\s*:\s*)?"
+    rf"(?:\[\s*(?P<bx1>{_NUMBER})\s*,\s*(?P<by1>{_NUMBER})\s*,\s*(?P<bx2>{_NUMBER})\s*,\s*(?P<by2>{_NUMBER})\s*\]"
+    rf"|\(\s*(?P<x1>{_NUMBER})\s*,\s*(?P<y1>{_NUMBER})\s*\)"
+    rf"(?:\s*,?\s*\(\s*(?P<x2>{_NUMBER})\s*,\s*(?P<y2>{_NUMBER})\s*\))?)"
+)
+# leading object index, e.g. the "1" in "1 tree: (...)"
+_INDEX_RE = re.compile(r"^\d+[.)]?\s*")
+
+
+@dataclass
+class OverlayItem:
+    """A box (x2/y2 set) or a point, in the server's image coordinates."""
+
+    x1: float
+    y1: float
+    x2: Optional[float] = None
+    y2: Optional[float] = None
+    label: str = ""
+    color: str = PALETTE[0]
+    expires: Optional[float] = None
+
+    @property
+    def is_point(self) -> bool:
+        return self.x2 is None
+
+
+def parse_grounding(text: str) -> List[OverlayItem]:
+    items = []
+    for match in _GROUNDING_RE.finditer(text):
+        label = _INDEX_RE.sub("", (match["label"] or "").strip())
+        color = PALETTE[len(items) % len(PALETTE)]
+        if match["bx1"] is not None:
+            coords = [float(match[g]) for g in ("bx1", "by1", "bx2", "by2")]
+            items.append(OverlayItem(*coords, label=label, color=color))
+        elif match["x2"] is not None:
+            coords = [float(match[g]) for g in ("x1", "y1", "x2", "y2")]
+            items.append(OverlayItem(*coords, label=label, color=color))
+        else:
+            items.append(OverlayItem(float(match["x1"]), float(match["y1"]), label=label, color=color))
+    return items
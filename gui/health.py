@@ -0,0 +1,184 @@
+"""Observation stream health: frozen, black and missing frames.
+
+Every decoded frame is shrunk to a small greyscale sample on the decode worker, and two numbers
+are kept from it: brightness and the mean absolute difference from the previous sample. The GUI
+thread only turns those into alerts on a timer, so the analysis keeps up with the frame rate.
+
+Silence and unchanged frames only count while frames are expected to change: while `active()`
+says so (e.g. the action loop runs) or a keyframe has been asked for. An idle environment, or a
+server that stops sending repeats of an unchanged frame, is not a fault.
+"""
+
+from dataclasses import dataclass
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from gui.protocol import Frame, FrameEncoding
+from server.metrics import metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PyQt6.QtGui import QImage
+
+
+@dataclass
+class HealthArgument:
+    sample_size: Tuple[int, int] = (64, 36)
+    # mean absolute difference in grey levels (0-255) below which a frame counts as unchanged
+    still_threshold: float = 0.5
+    freeze_seconds: float = 3.0
+    # mean grey level below which a frame counts as black
+    black_threshold: float = 8.0
+    black_frames: int = 5
+    gap_seconds: float = 2.0
+    # no frames for this long on an open socket and it is reopened
+    reconnect_seconds: float = 6.0
+
+
+class StreamHealth:
+    """Per-frame statistics from the decode workers, arrivals and alerts on the GUI thread."""
+
+    def __init__(self, args: Optional[HealthArgument] = None, active: Optional[Callable[[], bool]] = None):
+        self.args = args or HealthArgument()
+        # whether frames should be changing now, None means always
+        self.active = active
+        # paused on purpose, nothing to alert about
+        self.suspended = False
+        self._keyframe_requested = False
+        self._was_expecting = True
+        self.brightness: Optional[float] = None
+        self.difference: Optional[float] = None
+        self.frames_lost = 0
+        self.empty_messages = 0
+        self._previous = None
+        self._black_run = 0
+        self._last_change: Optional[float] = None
+        self._last_arrival: Optional[float] = None
+        self._connected_at: Optional[float] = None
+        self._last_seq: Optional[int] = None
+        self._raised = set()
+        self._lock = threading.Lock()
+        self.lost_counter = metrics.counter("frames_lost_total")
+        self.frame_difference = metrics.histogram("frame_difference", buckets=(0.1, 0.5, 1, 2, 4, 8, 16, 32, 64))
+
+    def on_image(self, frame: Frame, image: "QImage"):
+        """Decode worker: sample the frame. A few thousand pixels, whatever the frame size."""
+        # imported here, not at the top, so the window can paint before numpy is loaded
+        import numpy as np
+        from PyQt6.QtCore import Qt
+        from PyQt6.QtGui import QImage
+
+        width, height = self.args.sample_size
+        small = image.scaled(
+            width, height, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.FastTransformation
+        ).convertToFormat(QImage.Format.Format_Grayscale8)
+        bits = small.constBits()
+        bits.setsize(small.sizeInBytes())
+        rows = np.frombuffer(bits, dtype=np.uint8).reshape(small.height(), small.bytesPerLine())
+        self.on_sample(rows[:, : small.width()])
+
+    def on_sample(self, grey: "np.ndarray", now: Optional[float] = None):
+        """The statistics of one greyscale sample, from `on_image` or directly."""
+        import numpy as np
+
+        grey = np.asarray(grey, dtype=np.float32)
+        brightness = float(grey.mean())
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            previous = self._previous
+            difference = float(np.abs(grey - previous).mean()) if previous is not None else None
+            self._previous = grey
+            self.brightness, self.difference = brightness, difference
+            if difference is None or difference > self.args.still_threshold:
+                self._last_change = now
+            self._black_run = self._black_run + 1 if brightness < self.args.black_threshold else 0
+        if difference is not None:
+            self.frame_difference.observe(difference)
+
+    def on_arrival(self, frame: Frame, now: Optional[float] = None):
+        """GUI thread, for every frame received, repeats included."""
+        now = time.monotonic() if now is None else now
+        self._last_arrival = now
+        if self._last_change is None:
+            self._last_change = now
+        if frame.encoding != FrameEncoding.TILES:
+            self._keyframe_requested = False
+        if frame.seq is None:
+            return
+        if self._last_seq is not None:
+            missing = frame.seq - self._last_seq - 1
+            # a seq going backwards is a restarted stream, e.g. after a reconnect to a new server process
+            if missing > 0:
+                self.frames_lost += missing
+                self.lost_counter.inc(missing)
+        self._last_seq = frame.seq
+
+    def on_connected(self, now: Optional[float] = None):
+        # the seq is kept, frames sent while reconnecting show up as lost if the server carries on counting
+        self._connected_at = time.monotonic() if now is None else now
+
+    def keyframe_requested(self):
+        """A keyframe was asked for, one is expected whatever `active` says."""
+        self._keyframe_requested = True
+
+    def set_suspended(self, suspended: bool, now: Optional[float] = None):
+        """Pause or resume alerting, e.g. while the agent is paused or the environment resets."""
+        if self.suspended and not suspended:
+            # the silence while suspended was expected, the clocks start again from here
+            self._restart_clocks(time.monotonic() if now is None else now)
+        self.suspended = suspended
+
+    def _restart_clocks(self, now: float):
+        if self._last_arrival is not None:
+            self._last_arrival = now
+        if self._connected_at is not None:
+            self._connected_at = now
+        with self._lock:
+            self._last_change = now
+
+    def expecting(self, now: Optional[float] = None) -> bool:
+        """Whether frames should be arriving and changing now."""
+        expecting = not self.suspended and (self._keyframe_requested or self.active is None or bool(self.active()))
+        if expecting and not self._was_expecting:
+            # idle until now, the silence so far doesn't count
+            self._restart_clocks(time.monotonic() if now is None else now)
+        self._was_expecting = expecting
+        return expecting
+
+    def reset(self):
+        """A new episode: the first frame after it is a change, not a freeze or a gap."""
+        with self._lock:
+            self._previous = None
+            self._black_run = 0
+            self._last_change = None
+        self._last_arrival = None
+        self._last_seq = None
+        self._keyframe_requested = False
+
+    def stalled(self, now: Optional[float] = None) -> bool:
+        """True when an open socket has delivered nothing for `reconnect_seconds` while frames were expected."""
+        now = time.monotonic() if now is None else now
+        if self._connected_at is None or not self.expecting(now):
+            return False
+        last = max(self._connected_at, self._last_arrival or 0.0)
+        return now - last > self.args.reconnect_seconds
+
+    def alerts(self, now: Optional[float] = None) -> List[str]:
+        now = time.monotonic() if now is None else now
+        alerts = {}
+        if not self.suspended and self._last_arrival is not None:
+            if self.expecting(now):
+                gap = now - self._last_arrival
+                if gap > self.args.gap_seconds:
+                    alerts["gap"] = f"no frames for {gap:.0f} s"
+                elif self._last_change is not None and now - self._last_change > self.args.freeze_seconds:
+                    alerts["frozen"] = f"frozen for {now - self._last_change:.0f} s"
+            # a black screen is worth knowing about whether or not anything should be moving
+            if self._black_run >= self.args.black_frames:
+                alerts["black"] = f"{self._black_run} black frames"
+        for kind in alerts.keys() - self._raised:
+            # counted once per episode of the condition, not on every check
+            metrics.counter("stream_alerts_total", {"kind": kind}).inc()
+        self._raised = set(alerts)
+        return list(alerts.values())
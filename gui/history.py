@@ -0,0 +1,205 @@
+"""Bounded history of received frames, for scrubbing back through a live session.
+
+Frames are kept as received (compressed, or raw if that is what the server sends) with their
+arrival time. The store is bounded by bytes and age and evicts the oldest first. Frames are only
+decoded when the timeline cursor lands on or near them.
+"""
+
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from gui.decoder import decode_frame, scale_image
+from gui.protocol import Frame, FrameEncoding, parse_tiles
+from server.log import log
+
+
+class FrameHistory:
+    """Frames by absolute index; `first`..`last` are kept, older ones have been evicted."""
+
+    def __init__(self, max_bytes: int = 256 << 20, max_age: Optional[float] = 300.0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # lists with a moving start instead of deques, the timeline indexes into the middle
+        self._frames: List[Frame] = []
+        self._times: List[float] = []
+        self._start = 0
+        self.first = 0
+        self.bytes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._frames) - self._start
+
+    @property
+    def last(self) -> int:
+        return self.first + len(self) - 1
+
+    def append(self, frame: Frame, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        # the decoder hangs pixel arrays off the frame it is given, the history keeps only the payload
+        self._frames.append(dataclasses.replace(frame, array=None))
+        self._times.append(now)
+        self.bytes += len(frame.payload)
+        self._evict(now)
+        return self.last
+
+    def frame(self, index: int) -> Frame:
+        return self._frames[self._start + index - self.first]
+
+    def time(self, index: int) -> float:
+        return self._times[self._start + index - self.first]
+
+    def frames_for(self, index: int) -> List[Frame]:
+        """What it takes to rebuild frame `index`: the frame itself, or its keyframe and the tiles up to it."""
+        i = self._start + index - self.first
+        start = i
+        while start > self._start and self._frames[start].encoding == FrameEncoding.TILES:
+            start -= 1
+        return self._frames[start : i + 1]
+
+    def clear(self):
+        self.first += len(self)
+        self._frames, self._times, self._start = [], [], 0
+        self.bytes = 0
+
+    def _evict(self, now: float):
+        def over_budget() -> bool:
+            if len(self) <= 1:
+                return False
+            if self.bytes > self.max_bytes:
+                return True
+            return self.max_age is not None and now - self._times[self._start] > self.max_age
+
+        while over_budget() or (len(self) > 1 and self._frames[self._start].encoding == FrameEncoding.TILES):
+            # tiles left at the front have lost their keyframe, they go with it
+            self.bytes -= len(self._frames[self._start].payload)
+            self._frames[self._start] = None
+            self._start += 1
+            self.first += 1
+            self.evicted += 1
+        if self._start > 1024 and self._start * 2 > len(self._frames):
+            del self._frames[: self._start]
+            del self._times[: self._start]
+            self._start = 0
+
+
+def rebuild_frame(frames: List[Frame]) -> QImage:
+    """Decode the last of `frames`; a TILES frame is rebuilt from the keyframe and tiles before it."""
+    if frames[-1].encoding != FrameEncoding.TILES:
+        return decode_frame(frames[-1])
+    import numpy as np
+
+    from gui.delta import TileCanvas
+    from gui.utils import numpy_to_qimage, qimage_to_numpy
+
+    keyframe = frames[0]
+    image = decode_frame(keyframe)
+    if image.isNull():
+        return image
+    array = keyframe.array if keyframe.array is not None else qimage_to_numpy(image)
+    if keyframe.encoding == FrameEncoding.RAW_BGR:
+        array = array[..., ::-1]
+    canvas = TileCanvas()
+    canvas.set_keyframe(array, keyframe.seq)
+    for frame in frames[1:]:
+        canvas.apply(*parse_tiles(frame.data()))
+    # the canvas is thrown away, the image needs its own copy of the pixels
+    return numpy_to_qimage(np.ascontiguousarray(canvas.image())).copy()
+
+
+class _HistoryDecodeTask(QRunnable):
+    def __init__(self, decoder: "HistoryDecoder", index: int, frames: List[Frame], generation: int):
+        super().__init__()
+        self.decoder = decoder
+        self.index = index
+        self.frames = frames
+        self.generation = generation
+
+    def run(self):
+        image = None
+        try:
+            image = scale_image(rebuild_frame(self.frames), self.decoder.target_size, Qt.AspectRatioMode.KeepAspectRatio)
+        except Exception as e:
+            log(f"Decode of history frame {self.index} failed: {e}")
+        self.decoder._decoded(self.index, image, self.generation)
+
+
+class HistoryDecoder(QObject):
+    """Decodes history frames on demand, with an LRU cache of decoded frames around the cursor."""
+
+    frame_ready = pyqtSignal(int, object)  # index, QImage
+
+    def __init__(
+        self,
+        history: FrameHistory,
+        target_size: Optional[QSize] = None,
+        radius: int = 8,
+        cache_size: int = 48,
+        pool: Optional[QThreadPool] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.history = history
+        self.target_size = target_size
+        # frames on each side of the cursor decoded ahead of a scrub reaching them
+        self.radius = radius
+        self.pool = pool or QThreadPool.globalInstance()
+        self._cache: "OrderedDict[int, QImage]" = OrderedDict()
+        self._cache_size = cache_size
+        self._requested = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def request(self, index: int):
+        """Emit frame_ready for `index`, at once if it is cached, and decode its neighbourhood."""
+        with self._lock:
+            image = self._cache.get(index)
+            if image is not None:
+                self._cache.move_to_end(index)
+        if image is not None:
+            self.frame_ready.emit(index, image)
+        first, last = self.history.first, self.history.last
+        # the cursor first, then outwards from it
+        order = [index]
+        for offset in range(1, self.radius + 1):
+            order += [index + offset, index - offset]
+        tasks = []
+        with self._lock:
+            for i in order:
+                if first <= i <= last and i not in self._cache and i not in self._requested:
+                    self._requested.add(i)
+                    tasks.append(_HistoryDecodeTask(self, i, self.history.frames_for(i), self._generation))
+        for task in tasks:
+            self.pool.start(task)
+
+    def set_target_size(self, size: Optional[QSize]):
+        if size == self.target_size:
+            return
+        self.target_size = size
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._requested.clear()
+            self._cache.clear()
+
+    def _decoded(self, index: int, image: Optional[QImage], generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._requested.discard(index)
+            if image is None or image.isNull():
+                return
+            self._cache[index] = image
+            self._cache.move_to_end(index)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        # queued to the GUI thread, which shows it only if the cursor is still there
+        self.frame_ready.emit(index, image)
@@ -1,33 +1,59 @@
 # main_window.py
 
-import base64
-import re
+import itertools
+import json
+import os
+import tempfile
 import threading
+import time
+import weakref
 from collections import deque
 from enum import Enum
-from typing import Optional
+from typing import Optional, Sequence
 
-import numpy as np
-from PIL import Image, ImageDraw
-from PyQt6.QtCore import Qt, QTimer, QUrl, pyqtSignal
-from PyQt6.QtGui import QColor, QFont, QImage, QPixmap, QTextBlockFormat, QTextCursor
+from PyQt6.QtCore import QByteArray, QEvent, QSize, Qt, QTimer, QUrl, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QImage, QPixmap
 from PyQt6.QtWebSockets import QWebSocket
 from PyQt6.QtWidgets import (
+    QFileDialog,
     QFrame,
     QHBoxLayout,
     QLabel,
     QLineEdit,
     QMainWindow,
+    QProgressBar,
     QPushButton,
+    QSizePolicy,
+    QSlider,
     QSplitter,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
-from PyQt6.QtCore import QPoint, QRect
-from PyQt6.QtGui import QPixmap, QPainter, QPen, QColor
 
+from gui.control import ControlChannel
+from gui.decoder import DeltaAssembler, FrameDecoder
+from gui.grounding import parse_grounding
+from gui.health import StreamHealth
+from gui.history import FrameHistory, HistoryDecoder
+from gui.overlay import OverlayWidget
+from gui.playout import PlayoutBuffer
+from gui.protocol import (
+    Frame,
+    FrameEncoding,
+    ProtocolError,
+    config_message,
+    frame_from_base64,
+    hello_message,
+    keyframe_request_message,
+    parse_frame,
+    payload_digest,
+)
+from gui.transcript import TranscriptRenderer
 from server.api import Server
+from server.log import log
+from server.metrics import DEPTH_BUCKETS, MetricsExporter, metrics
+from server.stepper import ActionStepper, StepperArgument
 
 
 class GUIStatus(Enum):
@@ -36,18 +62,150 @@ class GUIStatus(Enum):
     RUNNING = 3
 
 
+# done in the background after the window is shown, in any order
+STARTUP_STEPS = ("status", "initial_text", "connection", "frame")
+
+# the gauge is registered once, a callback per window would keep the first window alive and report only it
+_windows: "weakref.WeakSet[MainWindow]" = weakref.WeakSet()
+metrics.gauge("frames_skipped_playout", fn=lambda: sum(window.image_buffer.skipped for window in list(_windows)))
+
+
 class MainWindow(QMainWindow):
+    # repeated frames from the server are dropped before decoding, see _on_frame
+    drop_duplicates = True
+
     agent_response_signal = pyqtSignal(str)
+    # stream id, token / stream id, final response data (None on failure), task
+    agent_token_signal = pyqtSignal(int, str)
+    agent_stream_done_signal = pyqtSignal(int, object, str)
     reset_done_signal = pyqtSignal(object, object)
+    # startup step, result
+    startup_signal = pyqtSignal(str, object)
+    # observation fetched over REST after the WebSocket connects, error
+    initial_obs_signal = pyqtSignal(object, object)
+    # chunks encoded, total / output path, error (None on success)
+    export_progress_signal = pyqtSignal(int, int)
+    export_done_signal = pyqtSignal(str, object)
 
-    def __init__(self, server: Server):
+    def __init__(
+        self,
+        server: Server,
+        binary_frames: bool = True,
+        raw_frames: bool = False,
+        delta_frames: bool = False,
+        encodings: Optional[Sequence[str]] = None,
+        quality: Optional[int] = None,
+        max_fps: Optional[float] = None,
+        target_latency: float = 0.15,
+        stepper_args: Optional[StepperArgument] = None,
+        metrics_enabled: bool = True,
+        metrics_export: Optional[str] = None,
+        record_path: Optional[str] = None,
+        typewriter: bool = True,
+        transcript_blocks: int = 5000,
+        overlay_ttl: Optional[float] = 10.0,
+        history_bytes: int = 256 << 20,
+        history_seconds: Optional[float] = 300.0,
+        telemetry_interval: Optional[float] = 2.0,
+        control_channel: bool = False,
+        health_monitor: bool = True,
+    ):
         super().__init__()
+        self._init_start = time.perf_counter()
+        # seconds from construction until each startup step (and "paint") finished
+        self.startup_times = {}
+        self._startup_pending = set(STARTUP_STEPS)
         self.server = server
+        metrics.enabled = metrics_enabled
+        self.frame_interval = metrics.histogram("ws_frame_interarrival_seconds")
+        self.display_time = metrics.histogram("frame_display_seconds")
+        self.frame_latency = metrics.histogram("frame_latency_seconds")
+        self.buffer_depth = metrics.histogram("playout_buffer_depth", buckets=DEPTH_BUCKETS)
+        self.frames_displayed = metrics.counter("frames_displayed_total")
+        self.frames_duplicate = metrics.counter("frames_duplicate_total")
+        self.duplicate_bytes = metrics.counter("frames_duplicate_bytes_total")
+        # hash of the last frame passed on, repeats of it are dropped before decoding
+        self._last_digest: Optional[bytes] = None
+        self.last_frame_arrival: Optional[float] = None
+        self.metrics_exporter = MetricsExporter(metrics, metrics_export) if metrics_export else None
+        self.binary_frames = binary_frames
+        self.raw_frames = raw_frames
+        self.delta_frames = delta_frames
+        # set once the server acknowledges delta mode (or TILES frames show up)
+        self._delta_stream = False
+        # stream options sent in the hello, the display size follows the image label
+        self.encodings = encodings
+        self.quality = quality
+        self.max_fps = max_fps
+        self.ws: Optional[QWebSocket] = None
+        # control calls over the observation socket once the server agrees, HTTP until then and as fallback
+        self.control = ControlChannel(self) if control_channel else None
+        self._sent_stream_size: Optional[tuple] = None
+        # coordinate space of the server (e.g. for grounding), frames may be sent smaller than this
+        self._source_size_known = False
+        self._stream_config_timer = QTimer(self)
+        self._stream_config_timer.setSingleShot(True)
+        self._stream_config_timer.setInterval(250)
+        self._stream_config_timer.timeout.connect(self._send_stream_config)
+        self.last_frame_seq: Optional[int] = None
+        self.last_displayed_frame: Optional[Frame] = None
         self.gui_status = GUIStatus.INIT
         self.selected_task: Optional[str] = None
         
-        self.image_buffer = deque(maxlen=100)
+        self.image_buffer = PlayoutBuffer(target_latency=target_latency)
+        _windows.add(self)
         self.original_pixmap: Optional[QPixmap] = None
+        # frames are decoded straight to the label's size, see _on_display_resized
+        self.decoder = FrameDecoder(parent=self, target_size=None, aspect_mode=Qt.AspectRatioMode.KeepAspectRatio)
+        # (source cacheKey, target size, scaled pixmap) of the last rescale done on the GUI thread
+        self._scaled_cache: Optional[tuple] = None
+        self._shown_key: Optional[int] = None
+        self.decoder.frame_decoded.connect(self._on_frame_decoded)
+        # frozen/black/missing frame detection, sampled on the decode workers
+        # silence only counts while the action loop runs, an idle environment sends nothing new
+        self.health = StreamHealth(active=lambda: self.stepper.running) if health_monitor else None
+        if self.health is not None:
+            self.decoder.add_image_hook(self.health.on_image)
+        self._closing = False
+        # reopens the socket after it drops, with a doubling delay while the server stays away
+        self._reconnect_delay = 1.0
+        self.ws_reconnects = metrics.counter("ws_reconnects_total")
+        self._reconnect_timer = QTimer(self)
+        self._reconnect_timer.setSingleShot(True)
+        self._reconnect_timer.timeout.connect(self._reconnect_ws)
+        self.assembler = DeltaAssembler(self.decoder, parent=self)
+        self.assembler.keyframe_needed.connect(self._request_keyframe)
+        # received frames kept for scrubbing back, history_bytes=0 turns it off
+        self.history: Optional[FrameHistory] = None
+        self.history_decoder: Optional[HistoryDecoder] = None
+        if history_bytes:
+            self.history = FrameHistory(history_bytes, history_seconds)
+            self.history_decoder = HistoryDecoder(self.history, parent=self)
+            self.history_decoder.frame_ready.connect(self._on_history_frame)
+        # /status and /gpu sampled in the background once the server has been checked, None turns it off
+        self.telemetry_interval = telemetry_interval
+        self.telemetry = None
+        self.telemetry_panel = None
+        # history index shown while scrubbing, None while following the live stream
+        self._scrub_index: Optional[int] = None
+        # newest live frame that came in while scrubbing, shown on going back to live
+        self._live_item: Optional[tuple] = None
+        self.recorder = None
+        if record_path:
+            # the session container needs numpy, a window that doesn't record shouldn't wait for it
+            from gui.session import SessionWriter
+
+            self.recorder = SessionWriter(record_path)
+        # (time, kind, body) of commands, responses and stream events, so the history can be exported without a recording
+        self.exchanges = deque(maxlen=2000)
+        # set while an export runs, setting it stops the export
+        self._export_cancel: Optional[threading.Event] = None
+        self.stepper = ActionStepper(
+            server,
+            stepper_args,
+            on_stopped=lambda: self.agent_response_signal.emit("Action|action"),
+            on_step=self._on_action_step,
+        )
 
         self.pause_default_style = "color: #FFFFFF; background-color: #555555;"
         self.pause_active_style = "color: #000000; background-color: #79D5A9;"
@@ -55,7 +213,15 @@ class MainWindow(QMainWindow):
         self.reset_active_style = "color: #000000; background-color: #79D5A9;"
         
         self.agent_response_signal.connect(self.receive_agent_response)
+        self.agent_token_signal.connect(self._on_agent_token)
+        self.agent_stream_done_signal.connect(self._on_agent_stream_done)
+        self._stream_ids = itertools.count()
+        self._streams = {}
         self.reset_done_signal.connect(self._finish_reset)
+        self.startup_signal.connect(self._on_startup_result)
+        self.initial_obs_signal.connect(self._on_initial_obs)
+        self.export_progress_signal.connect(self._on_export_progress)
+        self.export_done_signal.connect(self._on_export_done)
         tasks = {
             "Planning": "planning",
             "Action": "action",
@@ -80,8 +246,15 @@ class MainWindow(QMainWindow):
         self.image_label = QLabel("Waiting for server...")
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setFrameShape(QFrame.Shape.StyledPanel)
-        self.image_label.setScaledContents(True)
+        # the pixmap is already scaled to fit, letting the label scale it again costs a third rescale per paint
+        self.image_label.setScaledContents(False)
+        self.image_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.image_label.setMinimumSize(320, 180)
+        self.image_label.installEventFilter(self)
+        self.overlay = OverlayWidget(self.image_label, ttl=overlay_ttl)
         left_layout.addWidget(self.image_label, stretch=1)
+        if self.history is not None:
+            left_layout.addWidget(self._build_history_bar())
         self.btn_default_style = "color: #FFFFFF; background-color: #555555;"
         self.btn_selected_style = "color: #000000; background-color: #FFA92D;"
         self.task_buttons = {}  # task_type -> QPushButton
@@ -100,6 +273,7 @@ class MainWindow(QMainWindow):
        
         right_widget = QWidget()
         right_layout = QVBoxLayout(right_widget)
+        self.side_layout = right_layout
         right_layout.setContentsMargins(5, 5, 5, 5)
         right_layout.setSpacing(5)
 
@@ -115,6 +289,9 @@ class MainWindow(QMainWindow):
         self.system_color = QColor("#79D5A9")  # System 消息：绿色
         self.agent_color = QColor("#6096E6")  # Agent 消息：蓝色
         self.user_color = QColor("#FFA92D")  # User 消息：黄色
+        self.transcript = TranscriptRenderer(
+            self.message_area, animate=typewriter, max_blocks=transcript_blocks, parent=self
+        )
         right_splitter.addWidget(self.message_area)
 
         
@@ -142,32 +319,112 @@ class MainWindow(QMainWindow):
         self.reset_button.clicked.connect(self.handle_reset_environment)
         btn_layout.addWidget(self.reset_button)
 
+        self.export_button = QPushButton("Export Video")
+        self.export_button.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+        self.export_button.setStyleSheet(self.reset_default_style)
+        self.export_button.clicked.connect(self.export_video)
+        btn_layout.addWidget(self.export_button)
+
         right_layout.addLayout(btn_layout)
         main_splitter.addWidget(right_widget)
         main_splitter.setSizes([1100, 300])
 
-        self.statusBar().showMessage("Initializing...")
+        self.statusBar().showMessage(f"Connecting to {self.server.base}...")
+        self.startup_progress = QProgressBar()
+        self.startup_progress.setRange(0, len(STARTUP_STEPS))
+        self.startup_progress.setValue(0)
+        self.startup_progress.setFormat("starting %v/%m")
+        self.startup_progress.setMaximumWidth(160)
+        self.statusBar().addPermanentWidget(self.startup_progress)
+        self.step_stats_label = QLabel()
+        self.step_stats_label.setStyleSheet("color: #E0E0E0;")
+        self.statusBar().addPermanentWidget(self.step_stats_label)
+        self.step_stats_timer = QTimer(self)
+        self.step_stats_timer.timeout.connect(self._update_step_stats)
+        self.frame_stats_label = QLabel()
+        self.frame_stats_label.setStyleSheet("color: #E0E0E0;")
+        self.statusBar().addPermanentWidget(self.frame_stats_label)
+        self.frame_stats_timer = QTimer(self)
+        self.frame_stats_timer.timeout.connect(self._update_frame_stats)
+        self._last_displayed_count = 0.0
+        if metrics.enabled:
+            self.frame_stats_timer.start(1000)
+        if self.health is not None:
+            self.health_label = QLabel()
+            self.statusBar().addPermanentWidget(self.health_label)
+            self.health_timer = QTimer(self)
+            self.health_timer.timeout.connect(self._check_health)
+            self.health_timer.start(500)
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
 
         
+        # single-shot, re-armed for the next due frame so nothing runs while no frames arrive
         self.image_display_timer = QTimer(self)
+        self.image_display_timer.setSingleShot(True)
+        self.image_display_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.image_display_timer.timeout.connect(self._update_image_from_buffer)
-        self.image_display_timer.start(50)
 
        
         self.gui_status = GUIStatus.RUNNING
+        # QWebSocket.open doesn't block, the connect runs alongside the two requests below
         self.start_websocket_listener()
+        self._start_background_startup()
 
-       
+    def _start_background_startup(self):
+        # nothing here may block the first paint, results come back through startup_signal
+        for step, call in (("status", self.server.check), ("initial_text", self.server.get_initial_text)):
+            threading.Thread(target=self._run_startup_step, args=(step, call), daemon=True).start()
+
+    def _run_startup_step(self, step: str, call):
         try:
-            init_data = self.server.get_initial_text()
-            text = init_data.get("text") if init_data else None
-        except:
-            text = None
-        if not text:
-            text = "hello, I'm Optimus-3."
+            result = call()
+        except Exception as e:
+            result = e
+        self.startup_signal.emit(step, result)
 
-        self._typewriter(text, prefix="Agent: ")
-        # self.statusBar().showMessage("Received initial text from server.")
+    def _on_startup_result(self, step: str, result):
+        if step == "status":
+            if result is False or isinstance(result, Exception):
+                self.statusBar().showMessage(f"Server at {self.server.base} is not reachable.")
+            elif result:
+                self.statusBar().showMessage("Server is running.")
+            if self.telemetry_interval:
+                self._start_telemetry()
+        elif step == "initial_text":
+            text = result.get("text") if isinstance(result, dict) else None
+            self._typewriter(text or "hello, I'm Optimus-3.", prefix="Agent: ")
+        self._startup_step_done(step)
+
+    def _start_telemetry(self):
+        if self.telemetry is not None:
+            return
+        # numpy comes in with these, after the first paint rather than before it
+        from gui.telemetry import TelemetryPanel
+        from server.telemetry import TelemetryArgument, TelemetryPoller
+
+        self.telemetry = TelemetryPoller(
+            self.server,
+            TelemetryArgument(interval=self.telemetry_interval),
+            # lets frame stalls be lined up with the server's numbers
+            extra={"frames": lambda: self.frames_displayed.value},
+        )
+        self.telemetry_panel = TelemetryPanel(self.telemetry)
+        # between the transcript and the pause/reset buttons
+        self.side_layout.insertWidget(1, self.telemetry_panel)
+        self.telemetry.start()
+
+    def _startup_step_done(self, step: str):
+        if step in self.startup_times:
+            return
+        elapsed = time.perf_counter() - self._init_start
+        self.startup_times[step] = elapsed
+        metrics.histogram("startup_seconds", {"step": step}).observe(elapsed)
+        if step in self._startup_pending:
+            self._startup_pending.discard(step)
+            self.startup_progress.setValue(len(STARTUP_STEPS) - len(self._startup_pending))
+            if not self._startup_pending:
+                self.startup_progress.hide()
 
     def _select_task(self, task: str):
         
@@ -177,125 +434,199 @@ class MainWindow(QMainWindow):
                 btn.setStyleSheet(self.btn_selected_style)
             else:
                 btn.setStyleSheet(self.btn_default_style)
-        self.message_area.setTextColor(self.system_color)
-        self.message_area.append(f"System: Selected task → {task}\n\n")
+        self.transcript.append(f"System: Selected task → {task}\n\n", self.system_color)
         if self.selected_task == "action":
             self.handle_input()
 
     def handle_input(self):
         if self.selected_task == "action":
-            threading.Thread(target=self._send_command_to_server, args=(None, self.selected_task), daemon=True).start()
+            self._start_action_loop()
             return
         cmd = self.input_field.text().strip()
         if not cmd:
             return
         if self.selected_task is None:
-            self.message_area.setTextColor(self.system_color)
-            self.message_area.append("System: Please select a task before sending.\n\n")
+            self.transcript.append("System: Please select a task before sending.\n\n", self.system_color)
             return
        
-        cursor = self.message_area.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        block_fmt = QTextBlockFormat()
-        block_fmt.setAlignment(Qt.AlignmentFlag.AlignRight)
-        cursor.insertBlock(block_fmt)
-        cursor_char_fmt = cursor.charFormat()
-        cursor_char_fmt.setForeground(self.user_color)
-        cursor.insertText(f"You: {cmd}", cursor_char_fmt)
-        self.message_area.ensureCursorVisible()
-
-        cursor.insertBlock()
-        self.message_area.ensureCursorVisible()
+        self.transcript.append(f"You: {cmd}", self.user_color, align=Qt.AlignmentFlag.AlignRight)
         self.input_field.clear()
+        if self.recorder is not None:
+            self.recorder.record_command(cmd, self.selected_task)
+        self.exchanges.append((time.time(), "command", {"text": cmd, "task": self.selected_task}))
 
        
-        threading.Thread(target=self._send_command_to_server, args=(cmd, self.selected_task), daemon=True).start()
+        threading.Thread(
+            target=self._send_command_to_server, args=(cmd, self.selected_task, next(self._stream_ids)), daemon=True
+        ).start()
 
-    def _send_command_to_server(self, cmd: str | None, task: str):
-        print(cmd, task)
+    def _send_command_to_server(self, cmd: str | None, task: str, stream_id: Optional[int] = None):
+        if stream_id is not None and self.server.streaming:
+            try:
+                data = self.server.send_text_stream(cmd, task, lambda token: self.agent_token_signal.emit(stream_id, token))
+            except Exception as e:
+                data = {"response": f"Error: {e}"}
+            self.agent_stream_done_signal.emit(stream_id, data, task)
+            return
         try:
-            if task == "action":
-                while self.gui_status == GUIStatus.RUNNING:
-                    self.server.send_text("action", task)
-                    print("action", self.gui_status)
-                resp = "Action"
-            else:
-                data = self.server.send_text(cmd, task)
-                resp = data.get("response", "No response.") if data else "No response."
+            data = self.server.send_text(cmd, task)
+            resp = data.get("response", "No response.") if data else "No response."
         except Exception as e:
             resp = f"Error: {e}"
         self.agent_response_signal.emit(resp + "|" + task)
 
+    def _start_action_loop(self):
+        if self.gui_status != GUIStatus.RUNNING:
+            return
+        if self.recorder is not None and not self.stepper.running:
+            self.recorder.record_command(None, "action")
+        self.stepper.start("action")
+        self.step_stats_timer.start(500)
+
+    def _on_action_step(self, data: dict, latency: float):
+        # runs on a stepper worker thread, the recorder only enqueues
+        if self.recorder is not None:
+            self.recorder.record_response(data.get("response"), "action", latency=latency)
+        self.exchanges.append((time.time(), "response", {"response": data.get("response"), "task": "action"}))
+
+    def _update_step_stats(self):
+        stats = self.stepper.stats()
+        self.step_stats_label.setText(
+            f"{stats['rate']:.1f} steps/s | latency {stats['mean_latency_ms']:.0f} ms | in flight {stats['in_flight']}"
+        )
+        if not self.stepper.running:
+            self.step_stats_timer.stop()
+
+    def _on_agent_token(self, stream_id: int, token: str):
+        message = self._streams.get(stream_id)
+        if message is None:
+            message = self._streams[stream_id] = self.transcript.open_message("Agent: ", self.agent_color)
+        self.transcript.extend(message, token)
+
+    def _on_agent_stream_done(self, stream_id: int, data: Optional[dict], task: str):
+        message = self._streams.pop(stream_id, None)
+        resp = data.get("response", "No response.") if data else "No response."
+        if message is not None:
+            # the response is already on screen, token by token
+            self.transcript.close_message(message, "\n\n" if data else " [response incomplete]\n\n")
+        self._handle_agent_response(resp, task, typed=message is None)
+        if data and "latency" in data:
+            self.statusBar().showMessage(
+                f"Agent responded in {data['latency']:.2f} s, first token after {data['ttft'] * 1000:.0f} ms. Ready."
+            )
+
     def receive_agent_response(self, args):
         
         resp, cmd = args.split("|")[0], args.split("|")[1]
-        self._typewriter(resp, prefix="Agent: ")
+        self._handle_agent_response(resp, cmd)
+
+    def _handle_agent_response(self, resp: str, cmd: str, typed: bool = True):
+        if self.recorder is not None and cmd != "action":
+            self.recorder.record_response(resp, cmd)
+        if cmd != "action":
+            self.exchanges.append((time.time(), "response", {"response": resp, "task": cmd}))
+        if typed:
+            self._typewriter(resp, prefix="Agent: ")
         self.statusBar().showMessage("Agent responded. Ready.")
 
         if cmd == "grounding":
-            
-            painter = QPainter(self.original_pixmap)
-
-            
-            pen = QPen(QColor("red"))
-            pen.setWidth(3)  # 设置线条宽度为 3 像素
-
-            
-            painter.setPen(pen)
-
-           
-            numbers = re.findall(r"\d+", resp)
-            coords = [int(num) for num in numbers][1:5]
-            x1, y1, x2, y2 = coords
-            top_left = QPoint(x1, y1)
-            bottom_right = QPoint(x2, y2)
-            rect = QRect(top_left, bottom_right)
-            painter.drawRect(rect)
-
-            
-            painter.end()
-            self._display_pixmap(self.original_pixmap)
+            # drawn on the overlay, so the boxes stay up while frames keep coming
+            items = parse_grounding(resp)
+            if items:
+                self.overlay.add(items)
+            else:
+                self.statusBar().showMessage("Grounding response had no boxes.")
 
     def _append_agent_text(self, text: str):
         
-        cursor = self.message_area.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        block_fmt = QTextBlockFormat()
-        block_fmt.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        cursor.insertBlock(block_fmt)
-        fmt = cursor.charFormat()
-        fmt.setForeground(self.agent_color)
-        cursor.insertText(f"Agent: {text}", fmt)
-        self.message_area.ensureCursorVisible()
+        self.transcript.append(f"Agent: {text}", self.agent_color)
 
     def _typewriter(self, text: str, prefix: str = "Agent: "):
         
-        cursor = self.message_area.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        block_fmt = QTextBlockFormat()
-        block_fmt.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        cursor.insertBlock(block_fmt)
-        self.message_area.setTextCursor(cursor)
-        self.message_area.setTextColor(self.agent_color)
-        self.message_area.insertPlainText(prefix)
-        self.message_area.ensureCursorVisible()
-
-        def append_char(idx=0):
-            if idx < len(text):
-                self.message_area.insertPlainText(text[idx])
-                self.message_area.ensureCursorVisible()
-                QTimer.singleShot(10, lambda: append_char(idx + 1))
-            else:
-                self.message_area.insertPlainText("\n\n")
-                self.message_area.ensureCursorVisible()
+        self.transcript.append(f"{prefix}{text}\n\n", self.agent_color, animate=True)
 
-        append_char()
+    def eventFilter(self, obj, event):
+        # the label also resizes when the splitter moves, not only with the window
+        if obj is self.image_label and event.type() == QEvent.Type.Resize:
+            self._on_display_resized(self.image_label.contentsRect().size())
+        elif obj is self.image_label and event.type() == QEvent.Type.Paint and "paint" not in self.startup_times:
+            self._startup_step_done("paint")
+        return super().eventFilter(obj, event)
 
-    def resizeEvent(self, event):
-        
+    def _build_history_bar(self) -> QWidget:
+        bar = QWidget()
+        layout = QHBoxLayout(bar)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.history_slider = QSlider(Qt.Orientation.Horizontal)
+        self.history_slider.setRange(0, 0)
+        # sliderMoved only fires for user drags, the timer below moves it while live
+        self.history_slider.sliderMoved.connect(self._scrub)
+        self.live_button = QPushButton("Live")
+        self.live_button.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+        self.live_button.setStyleSheet(self.pause_active_style)
+        self.live_button.clicked.connect(self._go_live)
+        self.history_label = QLabel()
+        self.history_label.setStyleSheet("color: #E0E0E0;")
+        layout.addWidget(self.history_slider, stretch=1)
+        layout.addWidget(self.history_label)
+        layout.addWidget(self.live_button)
+        # the slider follows the history a few times a second, not on every frame
+        self.history_timer = QTimer(self)
+        self.history_timer.timeout.connect(self._update_history_bar)
+        self.history_timer.start(250)
+        return bar
+
+    def _update_history_bar(self):
+        history = self.history
+        if not len(history):
+            return
+        if self._scrub_index is not None and self._scrub_index < history.first:
+            # scrubbed-to frame was evicted, hold on to the oldest one left
+            self._scrub(history.first)
+        self.history_slider.setRange(history.first, history.last)
+        if self._scrub_index is None:
+            if not self.history_slider.isSliderDown():
+                self.history_slider.setValue(history.last)
+            span = history.time(history.last) - history.time(history.first)
+            text = f"live | {span:.0f} s, {history.bytes / 1e6:.0f} MB"
+        else:
+            text = f"-{history.time(history.last) - history.time(self._scrub_index):.1f} s"
+        if text != self.history_label.text():
+            self.history_label.setText(text)
+
+    def _scrub(self, index: int):
+        if not len(self.history):
+            return
+        index = max(self.history.first, min(index, self.history.last))
+        if self._scrub_index is None:
+            self.live_button.setStyleSheet(self.pause_default_style)
+        self._scrub_index = index
+        self.history_decoder.request(index)
+        self._update_history_bar()
+
+    def _on_history_frame(self, index: int, image: QImage):
+        if index == self._scrub_index:
+            self._process_and_display_pixmap(QPixmap.fromImage(image))
+
+    def _go_live(self):
+        if self._scrub_index is None:
+            return
+        self._scrub_index = None
+        self.live_button.setStyleSheet(self.pause_active_style)
+        if self._live_item is not None:
+            frame, pixmap = self._live_item
+            self._live_item = None
+            self._show_frame(frame, pixmap)
+        self._update_history_bar()
+
+    def _on_display_resized(self, size: QSize):
+        self.decoder.target_size = QSize(size)
+        if self.history_decoder is not None:
+            self.history_decoder.set_target_size(QSize(size))
+        # resizes come in bursts while dragging, renegotiate once it settles
+        self._stream_config_timer.start()
         if self.original_pixmap and not self.original_pixmap.isNull():
             self._display_pixmap(self.original_pixmap)
-        super().resizeEvent(event)
 
     def handle_pause(self):
        
@@ -304,22 +635,29 @@ class MainWindow(QMainWindow):
             self.pause_button.setText("Resume Agent")
             self.pause_button.setStyleSheet(self.pause_active_style)
             self.reset_button.setStyleSheet(self.reset_default_style)
-            self.message_area.setTextColor(self.system_color)
-            self.message_area.append("System: Agent paused.\n\n")
+            self.transcript.append("System: Agent paused.\n\n", self.system_color)
             self.statusBar().showMessage("Agent Paused")
-            self.server.pause()
+            if self.recorder is not None:
+                self.recorder.record_event("pause")
+            self.stepper.stop()
+            if self.health is not None:
+                # the server may stop sending or repeat one frame while paused, that is no fault
+                self.health.set_suspended(True)
+            # off the GUI thread, so it can go over the control channel (and never blocks the window)
+            threading.Thread(target=self.server.pause, daemon=True).start()
         else:
             self.gui_status = GUIStatus.RUNNING
             self.pause_button.setText("Pause Agent")
             self.pause_button.setStyleSheet(self.pause_default_style)
-            self.message_area.setTextColor(self.system_color)
-            self.message_area.append("System: Agent resumed.\n\n")
+            self.transcript.append("System: Agent resumed.\n\n", self.system_color)
             self.statusBar().showMessage("Agent Resumed")
-            self.server.resume()
+            if self.recorder is not None:
+                self.recorder.record_event("resume")
+            if self.health is not None:
+                self.health.set_suspended(False)
+            threading.Thread(target=self.server.resume, daemon=True).start()
             if self.selected_task == "action":
-                threading.Thread(
-                    target=self._send_command_to_server, args=(None, self.selected_task), daemon=True
-                ).start()
+                self._start_action_loop()
             else:
                 self.task_buttons[self.selected_task].setStyleSheet(self.btn_default_style)
 
@@ -327,11 +665,24 @@ class MainWindow(QMainWindow):
        
         self.reset_button.setStyleSheet(self.reset_active_style)
         self.pause_button.setStyleSheet(self.pause_default_style)
-        self.message_area.setTextColor(self.system_color)
-        self.message_area.append("System: environment reset...\n\n")
+        self.transcript.append("System: environment reset...\n\n", self.system_color)
         self.statusBar().showMessage("Resetting environment...")
+        if self.recorder is not None:
+            self.recorder.record_event("reset")
+        self.stepper.stop()
+        if self.history is not None:
+            self._live_item = None
+            self._go_live()
         self.image_buffer.clear()
+        self.decoder.clear()
+        self.assembler.clear()
+        # the first frame after the reset has to be shown even if it looks like the last one before
+        self._last_digest = None
+        if self.health is not None:
+            self.health.reset()
+            self.health.set_suspended(True)
         self.original_pixmap = None
+        self.overlay.clear()
         self._display_pixmap(None)
         self.image_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
         self.image_label.setStyleSheet("color: #FFFFFF;")
@@ -351,68 +702,351 @@ class MainWindow(QMainWindow):
     def _finish_reset(self, data, error):
        
         if error:
-            self.message_area.setTextColor(self.system_color)
-            self.message_area.append(f"System: Reset failed: {error}")
+            self.transcript.append(f"System: Reset failed: {error}", self.system_color)
         else:
             if data and data.get("observation"):
-                pix = self._base64_to_pixmap(data["observation"])
-                if pix:
-                    self.image_buffer.append(pix)
-                    self.original_pixmap = pix
-                    self.statusBar().showMessage("Environment reset. Displaying new observation.")
-                    self.gui_status = GUIStatus.RUNNING
+                self._on_frame(frame_from_base64(data["observation"]))
+                self.statusBar().showMessage("Environment reset. Displaying new observation.")
+                self.gui_status = GUIStatus.RUNNING
+                if self.selected_task == "action":
+                    self._start_action_loop()
             else:
-                self.message_area.setTextColor(self.system_color)
-                self.message_area.append("System: Reset returned no observation.")
+                self.transcript.append("System: Reset returned no observation.", self.system_color)
 
        
         self.reset_button.setStyleSheet(self.reset_default_style)
+        if self.health is not None:
+            self.health.set_suspended(self.gui_status != GUIStatus.RUNNING)
 
     def start_websocket_listener(self):
         self.ws = QWebSocket()
         parsed = QUrl(self.server.url)
         host = parsed.host()
         ws_url = QUrl(f"ws://{host}:{self.server.port}/ws/obs")
-        self.ws.errorOccurred.connect(lambda e: print(f"WebSocket error: {e}"))
+        self.ws.errorOccurred.connect(self._on_ws_error)
         self.ws.connected.connect(self._on_ws_connected)
-        self.ws.disconnected.connect(lambda: print("WebSocket disconnected"))
+        self.ws.disconnected.connect(self._on_ws_disconnected)
         self.ws.textMessageReceived.connect(self._on_ws_message)
-        print(f"Connecting WebSocket to {ws_url.toString()}...")
+        self.ws.binaryMessageReceived.connect(self._on_ws_binary_message)
+        log(f"Connecting WebSocket to {ws_url.toString()}...")
         self.ws.open(ws_url)
 
+    def _on_ws_error(self, error):
+        log(f"WebSocket error: {error}")
+        self.statusBar().showMessage(f"Observation stream error: {self.ws.errorString()}")
+        if "connection" not in self.startup_times:
+            # no stream to wait for, don't leave the progress bar up
+            self._startup_step_done("connection")
+            self._startup_step_done("frame")
+        # a failed open doesn't always emit disconnected
+        self._schedule_reconnect()
+
+    def _on_ws_disconnected(self):
+        log("WebSocket disconnected")
+        if self.control is not None:
+            self.control.detach()
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._closing or self.health is None or self._reconnect_timer.isActive():
+            return
+        self._reconnect_timer.start(round(self._reconnect_delay * 1000))
+        self._reconnect_delay = min(self._reconnect_delay * 2, 30.0)
+
+    def _reconnect_ws(self):
+        old = self.ws
+        if self.control is not None:
+            # the error-only path never emits disconnected, the channel must not keep the deleted socket
+            self.control.detach()
+        if old is not None:
+            # signals of the old socket must not schedule another reconnect
+            for signal in (old.errorOccurred, old.connected, old.disconnected, old.textMessageReceived, old.binaryMessageReceived):
+                signal.disconnect()
+            old.abort()
+            old.deleteLater()
+        self.ws_reconnects.inc()
+        self.start_websocket_listener()
+
     def _on_ws_connected(self):
-        print("WebSocket connected")
-        
+        log("WebSocket connected")
+        self._startup_step_done("connection")
+        if self.health is not None:
+            self.health.on_connected()
+        self._delta_stream = False
+        self._sent_stream_size = self._stream_size()
+        self.ws.sendTextMessage(
+            hello_message(
+                self.binary_frames,
+                self.raw_frames,
+                self.delta_frames,
+                encodings=self.encodings,
+                max_size=self._sent_stream_size,
+                quality=self.quality,
+                max_fps=self.max_fps,
+                control=self.control is not None,
+            )
+        )
+
+        # shows something before the first streamed frame, fetched off the GUI thread
+        threading.Thread(target=self._fetch_initial_obs, daemon=True).start()
+
+    def _fetch_initial_obs(self):
         try:
-            b64 = self.server.receive_obs()
-            if b64:
-                pix = self._base64_to_pixmap(b64)
-                if pix:
-                    self.image_buffer.append(pix)
-                    self.original_pixmap = pix
+            self.initial_obs_signal.emit(self.server.receive_obs(), None)
         except Exception as e:
-            self.message_area.addItem(QListWidgetItem(f"System: Failed to get initial observation via REST: {e}"))
+            self.initial_obs_signal.emit(None, e)
+
+    def _on_initial_obs(self, b64: Optional[str], error):
+        if error is not None:
+            self.transcript.append(f"System: Failed to get initial observation via REST: {error}", self.system_color)
+        elif b64 and self.last_displayed_frame is None:
+            self._on_frame(frame_from_base64(b64))
 
     def _on_ws_message(self, b64_str: str):
         if not b64_str:
+            if self.health is not None:
+                self.health.empty_messages += 1
             return
-        img_data = base64.b64decode(b64_str)
-        qimg = QImage.fromData(img_data)
-        if qimg.isNull():
+        if b64_str.startswith("{"):
+            # JSON control messages (e.g. the hello ack) share the text channel
+            self._on_control_message(b64_str)
+            return
+        self._on_frame(frame_from_base64(b64_str))
+
+    def _on_control_message(self, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
             return
+        if self.control is not None and self.control.handle(message):
+            return
+        if message.get("type") == "hello_ack":
+            self._delta_stream = bool(message.get("delta"))
+            if self.control is not None and message.get("control"):
+                self.control.attach(self.ws)
+                self.server.control = self.control
+        if message.get("type") in ("hello_ack", "config_ack") and message.get("source_size"):
+            self._source_size_known = True
+            self.overlay.set_source_size(*message["source_size"])
+            # grounding coordinates are in this size, an export needs it to place the boxes
+            source_size = list(message["source_size"])
+            if self.recorder is not None:
+                self.recorder.record_event("stream", source_size=source_size)
+            self.exchanges.append((time.time(), "event", {"event": "stream", "source_size": source_size}))
+
+    def _stream_size(self) -> tuple:
+        # in device pixels, so HiDPI displays still get a sharp image
+        size = self.image_label.contentsRect().size()
+        ratio = self.image_label.devicePixelRatioF()
+        return (max(16, round(size.width() * ratio)), max(16, round(size.height() * ratio)))
+
+    def _send_stream_config(self):
+        size = self._stream_size()
+        if self.ws is None or not self.ws.isValid() or size == self._sent_stream_size:
+            return
+        self._sent_stream_size = size
+        self.ws.sendTextMessage(config_message(size, self.quality, self.max_fps))
+
+    def _request_keyframe(self):
+        if self.ws is not None and self.ws.isValid():
+            self.ws.sendTextMessage(keyframe_request_message())
+            if self.health is not None:
+                self.health.keyframe_requested()
+
+    def _on_ws_binary_message(self, data: QByteArray):
+        try:
+            frame = parse_frame(data.data())
+        except ProtocolError as e:
+            metrics.counter("frames_bad_total").inc()
+            log(f"Bad binary frame: {e}")
+            return
+        self._on_frame(frame)
+
+    def _on_frame(self, frame: Frame):
+        if self.health is not None:
+            # before the duplicate check, a stream of repeats is what a frozen environment looks like
+            self.health.on_arrival(frame)
+        # a socket that opens and then stays silent is no recovery, the backoff only restarts here
+        self._reconnect_delay = 1.0
+        if frame.seq is not None:
+            self.last_frame_seq = frame.seq
+        now = time.perf_counter()
+        if self.last_frame_arrival is not None:
+            self.frame_interval.observe(now - self.last_frame_arrival)
+        self.last_frame_arrival = now
+        if frame.encoding == FrameEncoding.TILES:
+            self._delta_stream = True
+        if self.drop_duplicates and not self._delta_stream and not frame.is_raw:
+            # delta frames are excluded, a repeated keyframe still moves the base the tiles refer to;
+            # raw frames are too large to hash on the GUI thread
+            digest = payload_digest(frame.payload)
+            if digest == self._last_digest:
+                self.frames_duplicate.inc()
+                self.duplicate_bytes.inc(len(frame.payload))
+                return
+            self._last_digest = digest
+        if self.recorder is not None:
+            self.recorder.record_frame(frame)
+        if self.history is not None:
+            self.history.append(frame)
+        if self._delta_stream and frame.seq is not None:
+            # keyframes and tiles have to be applied in order, the decoder may drop frames
+            self.assembler.submit(frame)
+        else:
+            self.decoder.submit(frame)
+
+    def _on_frame_decoded(self, frame: Frame, qimg: QImage):
+        # QPixmap has to be created on the GUI thread, the image is already decoded and scaled
         pixmap = QPixmap.fromImage(qimg)
-        pixmap = pixmap.scaled(
-            640, 360, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
-        )
-        self.image_buffer.append(pixmap)
-        self.original_pixmap = pixmap
+        self.image_buffer.push((frame, pixmap), frame.timestamp)
+        self.buffer_depth.observe(len(self.image_buffer))
+        self._schedule_display()
+
+    def _schedule_display(self):
+        if not self.image_display_timer.isActive():
+            self._update_image_from_buffer()
 
     def _update_image_from_buffer(self):
-        if self.image_buffer:
-            pix = self.image_buffer.popleft()
+        item, wait = self.image_buffer.pop_due()
+        if item is not None:
+            self._show_frame(*item)
+        if wait is not None:
+            self.image_display_timer.start(max(1, round(wait * 1000)))
+
+    def _show_frame(self, frame: Frame, pixmap: QPixmap):
+        if self.last_displayed_frame is None:
+            self._startup_step_done("frame")
+        if self._scrub_index is not None:
+            # live frames keep being decoded while scrubbing, only the newest is kept for going back
+            self._live_item = (frame, pixmap)
+            return
+        self.last_displayed_frame = frame
+        if frame.width and frame.height and not self._source_size_known:
+            self.overlay.set_source_size(frame.width, frame.height)
+        start = time.perf_counter()
+        self._process_and_display_pixmap(pixmap)
+        self.display_time.observe(time.perf_counter() - start)
+        self.frames_displayed.inc()
+        if frame.timestamp is not None:
+            # only meaningful when the server clock is synced with ours, e.g. the local stand-in
+            self.frame_latency.observe(max(0.0, time.time() - frame.timestamp))
+
+    def _update_frame_stats(self):
+        displayed = self.frames_displayed.value
+        fps = displayed - self._last_displayed_count
+        self._last_displayed_count = displayed
+        latency = self.frame_latency.quantile(0.5)
+        latency_text = f"{latency * 1000:.0f} ms" if latency is not None else "-"
+        text = (
+            f"{fps:.0f} fps | latency p50 {latency_text} | decode {self.decoder.decode_time.mean * 1000:.1f} ms"
+            f" | display {self.display_time.mean * 1000:.1f} ms | buffer {len(self.image_buffer)}"
+            f" | dropped {self.decoder.dropped + self.image_buffer.skipped} | dup {self.frames_duplicate.value:.0f}"
+        )
+        # an unchanged label would still relayout the status bar
+        if text != self.frame_stats_label.text():
+            self.frame_stats_label.setText(text)
+
+    def _check_health(self):
+        health = self.health
+        alerts = health.alerts()
+        if health.stalled() and self.ws is not None and self.ws.isValid():
+            # the socket looks open but nothing comes through, reopen it
+            alerts.append("stalled, reconnecting")
+            self.ws.abort()
+        if health.empty_messages:
+            alerts.append(f"{health.empty_messages} empty messages")
+        if self.decoder.failed:
+            alerts.append(f"{self.decoder.failed} undecodable frames")
+        extra = f" | lost {health.frames_lost} | reconnects {self.ws_reconnects.value:.0f}"
+        if alerts:
+            text, color = "stream: " + ", ".join(alerts) + extra, "#FF6B6B"
         else:
-            pix = self.original_pixmap
-        self._process_and_display_pixmap(pix)
+            text, color = "stream ok" + extra, "#79D5A9"
+        if text != self.health_label.text():
+            self.health_label.setText(text)
+            self.health_label.setStyleSheet(f"color: {color};")
+
+    def export_video(self):
+        if self._export_cancel is not None:
+            self.statusBar().showMessage("An export is already running.")
+            return
+        source = self._export_source()
+        if source is None:
+            self.statusBar().showMessage("Nothing to export: no frames recorded or kept in the history.")
+            return
+        path, chosen = QFileDialog.getSaveFileName(
+            self, "Export video", "session.mp4", "MP4 video (*.mp4);;WebM video (*.webm);;GIF (*.gif)"
+        )
+        if not path:
+            return
+        if os.path.splitext(path)[1].lower() not in (".mp4", ".webm", ".gif"):
+            path += chosen[chosen.index("*") + 1 : -1]
+        self._export_cancel = threading.Event()
+        self.export_button.setEnabled(False)
+        self.statusBar().showMessage(f"Exporting {os.path.basename(path)}...")
+        # encoding runs in worker processes, this thread only waits for them
+        threading.Thread(target=self._run_export, args=(source, path, self._export_cancel), daemon=True).start()
+
+    def _export_source(self) -> Optional[tuple]:
+        """(session path, None) for the recording, (None, (frames, records)) for a history snapshot."""
+        if self.recorder is not None:
+            # readable while it is still being written, the last second may be missing
+            return self.recorder.path, None
+        if self.history is None or not len(self.history):
+            return None
+        # taken on the GUI thread, the history changes with every frame
+        frames = [(self.history.time(i), self.history.frame(i)) for i in range(self.history.first, self.history.last + 1)]
+        return None, (frames, list(self.exchanges))
+
+    def _run_export(self, source: tuple, output: str, cancel: threading.Event):
+        from gui.export import export_session, write_session
+
+        session_path, snapshot = source
+        error = None
+        try:
+            if snapshot is not None:
+                fd, session_path = tempfile.mkstemp(suffix=".ogs")
+                os.close(fd)
+                write_session(session_path, *snapshot)
+            export_session(session_path, output, progress=self.export_progress_signal.emit, cancel=cancel)
+        except Exception as e:
+            error = e
+        finally:
+            if snapshot is not None and session_path is not None:
+                os.remove(session_path)
+        if not cancel.is_set():
+            self.export_done_signal.emit(output, error)
+
+    def _on_export_progress(self, done: int, total: int):
+        self.statusBar().showMessage(f"Exporting video: {done}/{total} chunks")
+
+    def _on_export_done(self, output: str, error: Optional[Exception]):
+        self._export_cancel = None
+        self.export_button.setEnabled(True)
+        if error is not None:
+            self.statusBar().showMessage(f"Export failed: {error}")
+        else:
+            self.statusBar().showMessage(f"Exported {output}")
+
+    def closeEvent(self, event):
+        self._closing = True
+        if self._export_cancel is not None:
+            self._export_cancel.set()
+        self._reconnect_timer.stop()
+        # the step thread may still be winding down, it must not call back into a deleted window
+        self.stepper.on_stopped = self.stepper.on_step = None
+        self.stepper.shutdown()
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.assembler.close()
+        if self.control is not None:
+            self.server.control = None
+            self.control.detach()
+        super().closeEvent(event)
 
     def _process_and_display_pixmap(self, pixmap: QPixmap):
         if pixmap and not pixmap.isNull():
@@ -422,37 +1056,27 @@ class MainWindow(QMainWindow):
         #     self.message_area.addItem(QListWidgetItem("Error: Could not load image for display."))
 
     def _display_pixmap(self, pix: Optional[QPixmap]):
-        if pix and not pix.isNull():
-            self.image_label.setPixmap(
-                pix.scaled(
-                    640,
-                    360,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation,
-                )
-            )
-        else:
-            if self.original_pixmap:
-                self.image_label.setPixmap(
-                    self.original_pixmap.scaled(
-                        640,
-                        360,
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation,
-                    )
-                )
-            else:
-                self.image_label.setText("No Image")
+        if not pix or pix.isNull():
+            pix = self.original_pixmap
+        if not pix or pix.isNull():
+            self._shown_key = None
+            self.image_label.setText("No Image")
+            return
+        scaled = self._scaled_for_label(pix)
+        if scaled.cacheKey() == self._shown_key:
+            # same frame at the same size, nothing to repaint
+            return
+        self._shown_key = scaled.cacheKey()
+        self.image_label.setPixmap(scaled)
 
-    def _base64_to_pixmap(self, b64_str: str) -> Optional[QPixmap]:
-        try:
-            data = base64.b64decode(b64_str)
-            qimg = QImage.fromData(data)
-            if qimg.isNull():
-                return None
-            pix = QPixmap.fromImage(qimg)
-            return pix.scaled(
-                640, 360, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
-            )
-        except Exception:
-            return None
+    def _scaled_for_label(self, pix: QPixmap) -> QPixmap:
+        target = self.image_label.contentsRect().size()
+        if target.isEmpty() or pix.size() == pix.size().scaled(target, Qt.AspectRatioMode.KeepAspectRatio):
+            # decoded at the display size already
+            return pix
+        cache = self._scaled_cache
+        if cache is not None and cache[0] == pix.cacheKey() and cache[1] == target:
+            return cache[2]
+        scaled = pix.scaled(target, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        self._scaled_cache = (pix.cacheKey(), QSize(target), scaled)
+        return scaled
@@ -0,0 +1,119 @@
+import time
+from typing import List, Optional
+
+from PyQt6.QtCore import QEvent, QPointF, QRectF, QSize, Qt, QTimer
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen
+from PyQt6.QtWidgets import QLabel, QStyle, QWidget
+
+from gui.grounding import OverlayItem
+
+
+class OverlayWidget(QWidget):
+    """Boxes and points drawn on top of an image label; the frames underneath keep changing on their own.
+
+    Coordinates are mapped from `source_size` (the frame size the server works in) to wherever the
+    label currently draws its pixmap.
+    """
+
+    def __init__(self, target: QLabel, ttl: Optional[float] = 10.0):
+        super().__init__(target)
+        self.target = target
+        self.ttl = ttl
+        self.items: List[OverlayItem] = []
+        self.source_size = QSize()
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        self.setGeometry(target.rect())
+        target.installEventFilter(self)
+        self._expiry_timer = QTimer(self)
+        self._expiry_timer.setSingleShot(True)
+        self._expiry_timer.timeout.connect(self._expire)
+        self._font = QFont("Arial", 10, QFont.Weight.Bold)
+
+    def eventFilter(self, obj, event):
+        if obj is self.target and event.type() == QEvent.Type.Resize:
+            self.setGeometry(self.target.rect())
+        return super().eventFilter(obj, event)
+
+    def add(self, items: List[OverlayItem], ttl: Optional[float] = -1):
+        """Show `items` for `ttl` seconds (the widget default if omitted, forever if None)."""
+        ttl = self.ttl if ttl == -1 else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        for item in items:
+            item.expires = expires
+        self.items.extend(items)
+        self._schedule_expiry()
+        self.update()
+
+    def clear(self):
+        if self.items:
+            self.items.clear()
+            self._expiry_timer.stop()
+            self.update()
+
+    def set_source_size(self, width: int, height: int):
+        if width == self.source_size.width() and height == self.source_size.height():
+            return
+        self.source_size = QSize(width, height)
+        if self.items:
+            self.update()
+
+    def _schedule_expiry(self):
+        deadlines = [item.expires for item in self.items if item.expires is not None]
+        if deadlines:
+            self._expiry_timer.start(max(1, round((min(deadlines) - time.monotonic()) * 1000)))
+        else:
+            self._expiry_timer.stop()
+
+    def _expire(self):
+        now = time.monotonic()
+        self.items = [item for item in self.items if item.expires is None or item.expires > now]
+        self._schedule_expiry()
+        self.update()
+
+    def image_rect(self) -> QRectF:
+        pixmap = self.target.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return QRectF()
+        rect = QStyle.alignedRect(
+            self.target.layoutDirection(), self.target.alignment(), pixmap.size(), self.target.contentsRect()
+        )
+        return QRectF(rect)
+
+    def paintEvent(self, event):
+        if not self.items:
+            return
+        image_rect = self.image_rect()
+        if image_rect.isEmpty():
+            return
+        source = self.source_size if not self.source_size.isEmpty() else image_rect.size().toSize()
+        sx = image_rect.width() / source.width()
+        sy = image_rect.height() / source.height()
+
+        def map_point(x: float, y: float) -> QPointF:
+            return QPointF(image_rect.x() + x * sx, image_rect.y() + y * sy)
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self._font)
+        painter.setClipRect(image_rect)
+        for item in self.items:
+            color = QColor(item.color)
+            pen = QPen(color)
+            pen.setWidth(3)
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            top_left = map_point(item.x1, item.y1)
+            if item.is_point:
+                painter.drawEllipse(top_left, 6, 6)
+            else:
+                painter.drawRect(QRectF(top_left, map_point(item.x2, item.y2)).normalized())
+            if item.label:
+                text_rect = painter.fontMetrics().boundingRect(item.label)
+                label_rect = QRectF(top_left.x(), top_left.y() - text_rect.height() - 4, text_rect.width() + 8, text_rect.height() + 4)
+                if label_rect.top() < image_rect.top():
+                    label_rect.moveTop(top_left.y())
+                painter.fillRect(label_rect, color)
+                painter.setPen(QColor("#000000"))
+                painter.drawText(label_rect, Qt.AlignmentFlag.AlignCenter, item.label)
+        painter.end()
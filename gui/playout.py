@@ -0,0 +1,81 @@
+import time
+from collections import deque
+from typing import Any, Optional, Tuple
+
+
+class PlayoutBuffer:
+    """Jitter buffer that paces frames by their server timestamps.
+
+    Each frame is due at `server_ts + base_offset + delay`, where `base_offset`
+    is the smallest observed (arrival - server_ts) over a sliding window, i.e. the
+    clock skew plus the fastest network path, and `delay` follows the measured
+    jitter but never exceeds `target_latency`. Frames that are already later than
+    the target when they are due are skipped so live latency stays bounded.
+    """
+
+    def __init__(
+        self,
+        target_latency: float = 0.15,
+        min_latency: float = 0.02,
+        jitter_multiplier: float = 3.0,
+        max_frames: int = 100,
+        offset_window: int = 120,
+    ):
+        self.target_latency = target_latency
+        self.min_latency = min_latency
+        self.jitter_multiplier = jitter_multiplier
+        self.frames: deque = deque(maxlen=max_frames)
+        self.offsets: deque = deque(maxlen=offset_window)
+        self.jitter = 0.0
+        self.skipped = 0
+        self.played = 0
+        self.last_latency = 0.0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def delay(self) -> float:
+        return max(self.min_latency, min(self.target_latency, self.jitter_multiplier * self.jitter))
+
+    def base_offset(self) -> float:
+        return min(self.offsets) if self.offsets else 0.0
+
+    def push(self, item: Any, server_ts: Optional[float] = None, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if server_ts is None:
+            # frames without a timestamp can't be paced, show them as soon as possible
+            due = now
+        else:
+            offset = now - server_ts
+            self.offsets.append(offset)
+            base = self.base_offset()
+            self.jitter += (abs(offset - base) - self.jitter) / 16
+            due = server_ts + base + self.delay
+        if len(self.frames) == self.frames.maxlen:
+            self.skipped += 1
+        # arrival order is kept, a frame can't be due before the one queued ahead of it
+        if self.frames and due < self.frames[-1][0]:
+            due = self.frames[-1][0]
+        self.frames.append((due, item))
+
+    def pop_due(self, now: Optional[float] = None) -> Tuple[Optional[Any], Optional[float]]:
+        """Return the frame to show now (or None) and seconds until the next one is due."""
+        now = time.monotonic() if now is None else now
+        item = None
+        # behind schedule: skip ahead to the newest due frame instead of replaying the backlog
+        while self.frames and self.frames[0][0] <= now:
+            due, candidate = self.frames.popleft()
+            if item is not None:
+                self.skipped += 1
+            item = candidate
+            self.last_latency = now - due + self.delay
+        if item is not None:
+            self.played += 1
+        wait = max(0.0, self.frames[0][0] - now) if self.frames else None
+        return item, wait
+
+    def clear(self):
+        self.frames.clear()
+        self.offsets.clear()
+        self.jitter = 0.0
@@ -0,0 +1,194 @@
+import base64
+import hashlib
+import json
+import struct
+import zlib
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# magic, version, encoding, seq, server timestamp (s), width, height, payload length
+FRAME_HEADER = struct.Struct("<2sBBIdHHI")
+FRAME_MAGIC = b"OB"
+FRAME_VERSION = 1
+
+
+class FrameEncoding(IntEnum):
+    UNKNOWN = 0
+    JPEG = 1
+    PNG = 2
+    WEBP = 3
+    # uncompressed 8-bit pixels, row-major (height, width, 3), shape comes from the header
+    RAW_RGB = 4
+    RAW_BGR = 5
+    # changed tiles on top of the last keyframe (any other encoding), see pack_tiles
+    TILES = 6
+
+
+RAW_ENCODINGS = (FrameEncoding.RAW_RGB, FrameEncoding.RAW_BGR)
+
+# seq of the keyframe the tiles apply to, tile size, tile count, compression (0 none, 1 zlib)
+TILE_HEADER = struct.Struct("<IHHB")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+@dataclass
+class Frame:
+    payload: Union[bytes, memoryview, str]
+    encoding: FrameEncoding = FrameEncoding.UNKNOWN
+    seq: Optional[int] = None
+    timestamp: Optional[float] = None
+    width: int = 0
+    height: int = 0
+    # pixel view filled in by the decoder, shares memory with the payload for raw frames
+    array: Optional[Any] = None
+
+    @property
+    def is_raw(self) -> bool:
+        return self.encoding in RAW_ENCODINGS
+
+    def data(self) -> Union[bytes, memoryview]:
+        if isinstance(self.payload, str):
+            return base64.b64decode(self.payload)
+        return self.payload
+
+
+def payload_digest(payload: Union[bytes, memoryview, str]) -> bytes:
+    """Short content hash of the still-compressed payload, for spotting repeated frames before decoding."""
+    if isinstance(payload, str):
+        payload = payload.encode("ascii")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def pack_frame(payload: bytes, encoding: FrameEncoding, seq: int, timestamp: float, width: int = 0, height: int = 0) -> bytes:
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, int(encoding), seq & 0xFFFFFFFF, timestamp, width, height, len(payload))
+    return header + payload
+
+
+def parse_frame(data: Union[bytes, bytearray, memoryview]) -> Frame:
+    view = memoryview(data)
+    if len(view) < FRAME_HEADER.size:
+        raise ProtocolError(f"frame too short: {len(view)} bytes")
+    magic, version, encoding, seq, timestamp, width, height, length = FRAME_HEADER.unpack_from(view)
+    if magic != FRAME_MAGIC:
+        raise ProtocolError(f"bad frame magic {magic!r}")
+    if version != FRAME_VERSION:
+        raise ProtocolError(f"unsupported frame version {version}")
+    payload = view[FRAME_HEADER.size : FRAME_HEADER.size + length]
+    if len(payload) != length:
+        raise ProtocolError(f"truncated frame: expected {length} bytes, got {len(payload)}")
+    try:
+        encoding = FrameEncoding(encoding)
+    except ValueError:
+        encoding = FrameEncoding.UNKNOWN
+    return Frame(payload, encoding, seq, timestamp, width, height)
+
+
+def pack_tiles(base_seq: int, tile_size: int, positions: "np.ndarray", tiles: "np.ndarray", level: int = 1) -> bytes:
+    """Payload of a TILES frame: (tile x, tile y) uint16 positions, then the RGB tiles zlib-compressed."""
+    import numpy as np
+
+    pixels = np.ascontiguousarray(tiles, dtype=np.uint8).tobytes()
+    compression = 1 if level else 0
+    if level:
+        pixels = zlib.compress(pixels, level)
+    header = TILE_HEADER.pack(base_seq & 0xFFFFFFFF, tile_size, len(positions), compression)
+    return header + np.ascontiguousarray(positions, dtype="<u2").tobytes() + pixels
+
+
+def parse_tiles(payload) -> Tuple[int, int, "np.ndarray", "np.ndarray"]:
+    """(base seq, tile size, (N, 2) positions, (N, T, T, 3) tiles) from a TILES payload."""
+    # numpy is only needed once a delta stream is negotiated, not for starting the window
+    import numpy as np
+
+    view = memoryview(payload)
+    if len(view) < TILE_HEADER.size:
+        raise ProtocolError(f"tile payload too short: {len(view)} bytes")
+    base_seq, tile_size, count, compression = TILE_HEADER.unpack_from(view)
+    end = TILE_HEADER.size + 4 * count
+    positions = np.frombuffer(view[TILE_HEADER.size : end], dtype="<u2").reshape(count, 2)
+    pixels = view[end:]
+    if compression == 1:
+        pixels = zlib.decompress(pixels)
+    elif compression != 0:
+        raise ProtocolError(f"unknown tile compression {compression}")
+    expected = count * tile_size * tile_size * 3
+    if len(pixels) != expected:
+        raise ProtocolError(f"tile payload has {len(pixels)} pixel bytes, expected {expected}")
+    tiles = np.frombuffer(pixels, dtype=np.uint8).reshape(count, tile_size, tile_size, 3)
+    return base_seq, tile_size, positions, tiles
+
+
+def frame_from_base64(b64_str: str) -> Frame:
+    # legacy text frames carry no metadata, QImage sniffs the format from the bytes.
+    # decoding is deferred to Frame.data() so it happens on the decode worker
+    return Frame(b64_str)
+
+
+def _stream_options(max_size: Optional[Tuple[int, int]], quality: Optional[int], max_fps: Optional[float]) -> dict:
+    options = {}
+    if max_size is not None:
+        # frames larger than this are wasted on the client, the server may scale down to fit (keeping the aspect)
+        options["max_size"] = [int(max_size[0]), int(max_size[1])]
+    if quality is not None:
+        options["quality"] = int(quality)
+    if max_fps is not None:
+        options["max_fps"] = float(max_fps)
+    return options
+
+
+def hello_message(
+    binary: bool = True,
+    raw: bool = False,
+    delta: bool = False,
+    encodings: Optional[Sequence[str]] = None,
+    max_size: Optional[Tuple[int, int]] = None,
+    quality: Optional[int] = None,
+    max_fps: Optional[float] = None,
+    control: bool = False,
+) -> str:
+    # servers that don't understand the hello ignore it and keep sending base64 text frames
+    formats = ["binary", "base64"] if binary else ["base64"]
+    # in order of preference
+    encodings = list(encodings or ["jpeg", "png", "webp"])
+    if binary and raw:
+        # raw pixels only make sense on a binary channel, base64 would add a third to a frame that is already large
+        encodings = ["raw_rgb", "raw_bgr"] + [e for e in encodings if not e.startswith("raw")]
+    elif not binary:
+        encodings = [e for e in encodings if not e.startswith("raw")]
+    message = {"type": "hello", "version": FRAME_VERSION, "formats": formats, "encodings": encodings}
+    if binary and delta:
+        # keyframes in one of `encodings`, TILES frames in between; the ack says whether the server agreed
+        message["delta"] = True
+    if control:
+        # control calls (pause, reset, send_text, ...) as rpc messages on this socket, see rpc_message
+        message["control"] = True
+    message.update(_stream_options(max_size, quality, max_fps))
+    return json.dumps(message)
+
+
+def config_message(
+    max_size: Optional[Tuple[int, int]] = None, quality: Optional[int] = None, max_fps: Optional[float] = None
+) -> str:
+    # changes the hello's stream options without renegotiating formats, e.g. when the display is resized
+    return json.dumps({"type": "config", **_stream_options(max_size, quality, max_fps)})
+
+
+def keyframe_request_message() -> str:
+    # sent when tiles arrive for a keyframe we don't have, e.g. after a reset
+    return json.dumps({"type": "keyframe"})
+
+
+def rpc_message(request_id: int, method: str, params: Optional[dict] = None) -> str:
+    # answered by {"type": "rpc_result", "id": ..., "result": {...}} or {"type": "rpc_error", "id": ..., "error": "..."},
+    # in whatever order the calls finish
+    message = {"type": "rpc", "id": request_id, "method": method}
+    if params:
+        message["params"] = params
+    return json.dumps(message)
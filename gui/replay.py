@@ -0,0 +1,448 @@
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont, QImage
+from PyQt6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget
+
+from gui.decoder import decode_frame, scale_image
+from gui.grounding import parse_grounding
+from gui.main_window import MainWindow
+from gui.protocol import Frame, FrameEncoding
+from gui.session import KIND_COMMAND, KIND_EVENT, KIND_RESPONSE, SessionReader
+from server.log import log
+
+SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+
+class OfflineServer:
+    """Stands in for `Server` when replaying; nothing is sent anywhere."""
+
+    def __init__(self, reader: SessionReader):
+        self.reader = reader
+        self.url = "replay"
+        self.port = 0
+        self.base = reader.path
+        self.streaming = False
+
+    def check(self, quiet: bool = False):
+        pass
+
+    def get_initial_text(self) -> dict:
+        duration = self.reader.end_time - self.reader.start_time
+        return {"text": f"Replaying {self.reader.path}: {len(self.reader)} frames, {duration:.0f} s."}
+
+    def reset(self):
+        return None
+
+    def pause(self):
+        return None
+
+    def resume(self):
+        return None
+
+    def send_text(self, text: str, task: str) -> dict:
+        return {"response": "Replay mode, there is no server to answer."}
+
+    def receive_obs(self):
+        return None
+
+    def receive_text(self):
+        return None
+
+    def check_gpu(self, quiet: bool = False):
+        return None
+
+    def request_stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class _PrefetchTask(QRunnable):
+    def __init__(self, controller: "ReplayController", index: int, generation: int):
+        super().__init__()
+        self.controller = controller
+        self.index = index
+        self.generation = generation
+
+    def run(self):
+        image = None
+        try:
+            image = scale_image(
+                decode_frame(self.controller.reader.frame(self.index)),
+                self.controller.target_size,
+                Qt.AspectRatioMode.KeepAspectRatio,
+            )
+        except Exception as e:
+            log(f"Prefetch of frame {self.index} failed: {e}")
+        self.controller._prefetched(self.index, image, self.generation)
+
+
+class ReplayController(QObject):
+    """Plays a recorded session: paced by recorded timestamps, seekable, prefetching ahead."""
+
+    position_changed = pyqtSignal(int)
+    state_changed = pyqtSignal(bool)  # playing
+    # a jump or a step, emitted before the frame at the new position
+    seeked = pyqtSignal(int)
+
+    def __init__(
+        self,
+        reader: SessionReader,
+        emit_frame: Callable[[Frame, Optional[QImage]], None],
+        target_size: Optional[QSize] = QSize(640, 360),
+        prefetch: int = 32,
+        pool: Optional[QThreadPool] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.reader = reader
+        # receives the frame and, when it was prefetched, its decoded image
+        self.emit_frame = emit_frame
+        self.target_size = target_size
+        self.prefetch = prefetch
+        self.pool = pool or QThreadPool.globalInstance()
+        self.speed = 1.0
+        self.playing = False
+        self.position = -1
+        self._anchor_wall = 0.0
+        self._anchor_ts = 0.0
+        # decoded frames around the playhead, bounded to keep memory flat on long sessions
+        self._cache: "OrderedDict[int, QImage]" = OrderedDict()
+        self._cache_size = 2 * prefetch
+        self._requested = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def play(self):
+        if not len(self) or self.playing:
+            return
+        if self.position >= len(self) - 1:
+            self.position = -1
+        self.playing = True
+        self._anchor(max(self.position, 0))
+        self.state_changed.emit(True)
+        self._tick()
+
+    def pause(self):
+        self.playing = False
+        self._timer.stop()
+        self.state_changed.emit(False)
+
+    def toggle(self):
+        self.pause() if self.playing else self.play()
+
+    def set_speed(self, speed: float):
+        self.speed = speed
+        if self.playing:
+            self._anchor(max(self.position, 0))
+
+    def step(self, delta: int = 1):
+        if self.playing:
+            self.pause()
+        self.seek(self.position + delta)
+
+    def seek(self, index: int):
+        if not len(self):
+            return
+        index = max(0, min(index, len(self) - 1))
+        self.seeked.emit(index)
+        if abs(index - self.position) > self.prefetch:
+            # far jump, in-flight prefetches for the old neighbourhood are no longer useful
+            with self._lock:
+                self._generation += 1
+                self._requested.clear()
+        self._show(index)
+        if self.playing:
+            self._anchor(index)
+            self._schedule()
+
+    def set_target_size(self, size: Optional[QSize]):
+        if size == self.target_size:
+            return
+        self.target_size = size
+        # cached images are at the old size, and so are the ones still being decoded
+        with self._lock:
+            self._generation += 1
+            self._requested.clear()
+            self._cache.clear()
+
+    def seek_time(self, timestamp: float):
+        index = self.reader.frame_at_time(timestamp)
+        if index >= 0:
+            self.seek(index)
+
+    def _anchor(self, index: int):
+        self._anchor_wall = time.monotonic()
+        self._anchor_ts = float(self.reader.frame_times[index])
+
+    def _tick(self):
+        if not self.playing:
+            return
+        session_now = self._anchor_ts + (time.monotonic() - self._anchor_wall) * self.speed
+        # when late, jump to the frame for the current time instead of replaying every one
+        index = max(self.reader.frame_at_time(session_now), self.position + 1)
+        if index >= len(self):
+            self.pause()
+            return
+        self._show(index)
+        self._schedule()
+
+    def _schedule(self):
+        following = self.position + 1
+        if following >= len(self):
+            # let the last frame stay up for a moment before stopping
+            self._timer.start(100)
+            return
+        due = self._anchor_wall + (float(self.reader.frame_times[following]) - self._anchor_ts) / self.speed
+        self._timer.start(max(1, round((due - time.monotonic()) * 1000)))
+
+    def _show(self, index: int):
+        self.position = index
+        with self._lock:
+            image = self._cache.get(index)
+            if image is not None:
+                self._cache.move_to_end(index)
+        self.emit_frame(self.reader.frame(index), image)
+        self.position_changed.emit(index)
+        self._prefetch_ahead()
+
+    def _prefetch_ahead(self):
+        start = self.position + 1
+        stop = min(len(self), start + self.prefetch)
+        self.reader.prefetch(start, stop)
+        tasks = []
+        with self._lock:
+            for index in range(start, stop):
+                if index not in self._cache and index not in self._requested:
+                    self._requested.add(index)
+                    tasks.append(_PrefetchTask(self, index, self._generation))
+        for task in tasks:
+            self.pool.start(task)
+
+    def _prefetched(self, index: int, image: Optional[QImage], generation: int):
+        with self._lock:
+            self._requested.discard(index)
+            if generation != self._generation or image is None or image.isNull():
+                return
+            self._cache[index] = image
+            self._cache.move_to_end(index)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+
+class ReplayWindow(MainWindow):
+    """MainWindow fed from a recorded session instead of a live server."""
+
+    # stepping back onto a frame is not a repeat from the server
+    drop_duplicates = False
+
+    def __init__(self, session_path: str, speed: float = 1.0, **kwargs):
+        self.reader = SessionReader(session_path)
+        self.replay: Optional[ReplayController] = None
+        # the session file is the history, the replay bar scrubs through it
+        kwargs.setdefault("history_bytes", 0)
+        kwargs.setdefault("telemetry_interval", None)
+        kwargs.setdefault("health_monitor", False)
+        super().__init__(OfflineServer(self.reader), **kwargs)
+        self.setWindowTitle(f"Optimus-3 Agent — replay {session_path}")
+
+        # tile frames only make sense on top of their keyframe, they are replayed through the assembler
+        encodings = self.reader.frame_index["encoding"]
+        self._keyframes = np.flatnonzero(encodings != FrameEncoding.TILES)
+        self._delta_stream = len(self._keyframes) < len(encodings)
+        self._assembled_index = -1
+        # frames are numbered as the controller emits them; a decode that finishes after a later
+        # frame was shown (straight from the prefetch cache) is dropped
+        self._emitted = 0
+        self._shown_emission = 0
+        # id of a frame on the decoder -> its number
+        self._decoding: Dict[int, int] = {}
+        self.replay = ReplayController(
+            self.reader,
+            self._emit_replay_frame,
+            self.decoder.target_size,
+            prefetch=0 if self._delta_stream else 32,
+            parent=self,
+        )
+        self.replay.position_changed.connect(self._on_replay_position)
+        self.replay.seeked.connect(self._on_replay_seek)
+        self.replay.state_changed.connect(self._on_replay_state)
+        self.records = self.reader.records((KIND_COMMAND, KIND_RESPONSE, KIND_EVENT))
+        self.transcript_times = np.array([r["timestamp"] for r in self.records])
+        self._transcript_pos = 0
+
+        self._build_replay_bar()
+        self.replay.set_speed(speed)
+        self.replay.play()
+
+    def _build_replay_bar(self):
+        bar = QWidget()
+        layout = QHBoxLayout(bar)
+        layout.setContentsMargins(0, 0, 0, 0)
+        style = "color: #FFFFFF; background-color: #555555;"
+
+        self.play_button = QPushButton("Pause")
+        self.play_button.clicked.connect(self.replay.toggle)
+        back = QPushButton("◀")
+        back.clicked.connect(lambda: self.replay.step(-1))
+        forward = QPushButton("▶")
+        forward.clicked.connect(lambda: self.replay.step(1))
+        self.speed_box = QComboBox()
+        for speed in SPEEDS:
+            self.speed_box.addItem(f"{speed:g}x", speed)
+        self.speed_box.setCurrentIndex(SPEEDS.index(1.0))
+        self.speed_box.currentIndexChanged.connect(lambda i: self.replay.set_speed(self.speed_box.itemData(i)))
+        for widget in (self.play_button, back, forward, self.speed_box):
+            widget.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+            widget.setStyleSheet(style)
+
+        self.timeline = QSlider(Qt.Orientation.Horizontal)
+        self.timeline.setRange(0, max(0, len(self.reader) - 1))
+        # sliderMoved only fires for user drags, so programmatic updates don't seek
+        self.timeline.sliderMoved.connect(self._seek)
+        self.time_label = QLabel()
+        self.time_label.setStyleSheet("color: #E0E0E0;")
+
+        layout.addWidget(self.play_button)
+        layout.addWidget(back)
+        layout.addWidget(forward)
+        layout.addWidget(self.speed_box)
+        layout.addWidget(self.timeline, stretch=1)
+        layout.addWidget(self.time_label)
+        left = self.centralWidget().widget(0)
+        left.layout().insertWidget(1, bar)
+
+    def _on_display_resized(self, size: QSize):
+        super()._on_display_resized(size)
+        if self.replay is not None:
+            self.replay.set_target_size(QSize(size))
+
+    def start_websocket_listener(self):
+        # frames come from the session file, there is no connection to wait for
+        self._startup_step_done("connection")
+
+    def _start_action_loop(self):
+        self.transcript.append("System: Action steps can't be run in replay mode.\n\n", self.system_color)
+
+    def _seek(self, index: int):
+        # a scrub skips the transcript in between instead of dumping it into the message area
+        frame_time = float(self.reader.frame_times[max(0, min(index, len(self.reader) - 1))])
+        self._transcript_pos = int(np.searchsorted(self.transcript_times, frame_time, side="right"))
+        self.replay.seek(index)
+
+    def _on_replay_seek(self, index: int):
+        # decodes still running for the old position must not land on top of the new one
+        self.decoder.clear()
+        self.image_buffer.clear()
+        # decodes already on their way to the GUI thread are past the decoder's own check
+        self._decoding.clear()
+        if self._delta_stream:
+            self.assembler.clear()
+            self._assembled_index = -1
+
+    def _emit_replay_frame(self, frame: Frame, image: Optional[QImage]):
+        self._append_transcript(frame.timestamp)
+        # pacing is done by the controller, the playout buffer shows frames on arrival
+        frame = dataclasses.replace(frame, timestamp=None)
+        if self._delta_stream:
+            self._assemble_to(self.replay.position, frame)
+            return
+        self._emitted += 1
+        if image is None:
+            # missed the prefetch cache, decoded off the GUI thread like a live frame
+            self._decoding[id(frame)] = self._emitted
+            self.decoder.submit(frame)
+            return
+        self._shown_emission = self._emitted
+        super()._on_frame_decoded(frame, image)
+
+    def _on_frame_decoded(self, frame: Frame, qimg: QImage):
+        if not self._delta_stream:
+            emission = self._decoding.pop(id(frame), None)
+            if emission is None or emission < self._shown_emission:
+                return
+            self._shown_emission = emission
+            # older frames still listed were dropped by the decoder
+            for key in [key for key, number in self._decoding.items() if number < emission]:
+                del self._decoding[key]
+        super()._on_frame_decoded(frame, qimg)
+
+    def _assemble_to(self, index: int, frame: Frame):
+        if index != self._assembled_index + 1:
+            # a jump: start again from the keyframe at or before the target
+            k = int(np.searchsorted(self._keyframes, index, side="right")) - 1
+            start = int(self._keyframes[k]) if k >= 0 else index
+            for i in range(start, index):
+                self.assembler.submit(dataclasses.replace(self.reader.frame(i), timestamp=None))
+        self._assembled_index = index
+        self._on_frame(frame)
+
+    def _request_keyframe(self):
+        # nothing to ask, _assemble_to replays from the last keyframe on seeks
+        pass
+
+    def _append_transcript(self, until: float):
+        end = int(np.searchsorted(self.transcript_times, until, side="right"))
+        if end < self._transcript_pos:
+            # seeking backwards, pick up from the new position without repeating
+            self._transcript_pos = end
+            return
+        for record in self.records[self._transcript_pos : end]:
+            if record["kind"] == KIND_COMMAND:
+                if record.get("text"):
+                    self.transcript.append(f"You ({record['task']}): {record['text']}\n", self.system_color)
+            elif record["kind"] == KIND_RESPONSE:
+                if record.get("task") != "action":
+                    self.transcript.append(f"Agent: {record['response']}\n", self.agent_color)
+                if record.get("task") == "grounding":
+                    self.overlay.add(parse_grounding(record["response"]))
+            elif record.get("event") == "stream":
+                # grounding coordinates are in the server's size, not the recorded frames'
+                self._source_size_known = True
+                self.overlay.set_source_size(*record["source_size"])
+            else:
+                self.transcript.append(f"System: {record['event']}\n", self.system_color)
+        self._transcript_pos = end
+
+    def _on_replay_position(self, index: int):
+        if not self.timeline.isSliderDown():
+            self.timeline.setValue(index)
+        elapsed = float(self.reader.frame_times[index]) - self.reader.start_time
+        total = self.reader.end_time - self.reader.start_time
+        self.time_label.setText(f"{elapsed:6.1f} / {total:.1f} s  #{index}")
+
+    def _on_replay_state(self, playing: bool):
+        self.play_button.setText("Pause" if playing else "Play")
+
+    def handle_pause(self):
+        self.replay.toggle()
+
+    def handle_reset_environment(self):
+        self.image_buffer.clear()
+        self.decoder.clear()
+        self.assembler.clear()
+        self._assembled_index = -1
+        self._last_digest = None
+        self._seek(0)
+
+    def _export_source(self) -> Optional[tuple]:
+        return self.reader.path, None
+
+    def closeEvent(self, event):
+        if self.replay is not None:
+            self.replay.pause()
+        super().closeEvent(event)
@@ -0,0 +1,282 @@
+"""Append-only session container for recorded episodes.
+
+Layout::
+
+    FILE_HEADER
+    CHUNK_HEADER, RECORD_HEADER + payload, RECORD_HEADER + payload, ...   (repeated)
+    INDEX_MAGIC, index entries (INDEX_DTYPE)                              (written on close)
+    TRAILER
+
+Frames are stored exactly as received (compressed or raw bytes). Commands, responses and
+events are UTF-8 JSON. If the writer never closed the file the index is rebuilt by walking
+the chunk headers, and a truncated last chunk is ignored.
+"""
+
+import json
+import mmap
+import queue
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from gui.protocol import Frame, FrameEncoding
+from server.log import log
+
+FILE_MAGIC = b"OGSESSN\0"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<8sHd")
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sII")  # magic, record count, payload bytes
+# kind, encoding, width, height, seq (-1 if unknown), local timestamp, payload length
+RECORD_HEADER = struct.Struct("<BBHHqdI")
+INDEX_MAGIC = b"INDX"
+TRAILER_MAGIC = b"OGSIDX\0\0"
+TRAILER = struct.Struct("<qq8s")  # index offset, entry count, magic
+
+KIND_FRAME = 1
+KIND_COMMAND = 2
+KIND_RESPONSE = 3
+KIND_EVENT = 4
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("seq", "<i8"),
+        ("offset", "<i8"),  # start of the payload in the file
+        ("length", "<u4"),
+        ("kind", "u1"),
+        ("encoding", "u1"),
+        ("width", "<u2"),
+        ("height", "<u2"),
+    ]
+)
+
+
+_STOP = object()
+
+
+class SessionError(ValueError):
+    pass
+
+
+class SessionWriter:
+    """Streams records to disk from a background thread; the record_* calls only enqueue."""
+
+    def __init__(self, path: str, chunk_bytes: int = 4 << 20, flush_interval: float = 1.0):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, time.time()))
+        # on disk at once, a reader opening the recording before the first chunk must find a valid file
+        self._file.flush()
+        self._offset = FILE_HEADER.size
+        self._index: List[tuple] = []
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self.records = 0
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record_frame(self, frame: Frame, timestamp: Optional[float] = None):
+        self._put((KIND_FRAME, frame, time.time() if timestamp is None else timestamp))
+
+    def record_command(self, text: Optional[str], task: str, timestamp: Optional[float] = None):
+        self._put((KIND_COMMAND, {"text": text, "task": task}, time.time() if timestamp is None else timestamp))
+
+    def record_response(self, response: str, task: str, timestamp: Optional[float] = None, **extra):
+        self._put((KIND_RESPONSE, dict(response=response, task=task, **extra), time.time() if timestamp is None else timestamp))
+
+    def record_event(self, name: str, timestamp: Optional[float] = None, **extra):
+        self._put((KIND_EVENT, dict(event=name, **extra), time.time() if timestamp is None else timestamp))
+
+    def _put(self, item):
+        if not self._closed:
+            self._queue.put(item)
+
+    def _serialize(self, item) -> tuple:
+        kind, body, timestamp = item
+        if kind == KIND_FRAME:
+            frame: Frame = body
+            payload = frame.data()
+            meta = (int(frame.encoding), frame.width, frame.height, -1 if frame.seq is None else frame.seq)
+        else:
+            payload = json.dumps(body).encode("utf-8")
+            meta = (0, 0, 0, -1)
+        encoding, width, height, seq = meta
+        header = RECORD_HEADER.pack(kind, encoding, width, height, seq, timestamp, len(payload))
+        return header, payload, (timestamp, seq, len(payload), kind, encoding, width, height)
+
+    def _run(self):
+        chunk: List[bytes] = []
+        entries: List[tuple] = []
+        chunk_size = 0
+        deadline = time.monotonic() + self.flush_interval
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stop = True
+            elif item is not None:
+                try:
+                    header, payload, entry = self._serialize(item)
+                except Exception as e:
+                    log(f"Failed to record {item[0]}: {e}")
+                else:
+                    chunk.append(header)
+                    chunk.append(payload)
+                    entries.append((chunk_size + len(header), entry))
+                    chunk_size += len(header) + len(payload)
+            if chunk and (stop or chunk_size >= self.chunk_bytes or time.monotonic() >= deadline):
+                self._write_chunk(chunk, entries, chunk_size)
+                chunk, entries, chunk_size = [], [], 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        self._write_index()
+        self._file.close()
+
+    def _write_chunk(self, chunk: List[bytes], entries: List[tuple], chunk_size: int):
+        self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(entries), chunk_size))
+        self._file.writelines(chunk)
+        self._file.flush()
+        base = self._offset + CHUNK_HEADER.size
+        for relative, (timestamp, seq, length, kind, encoding, width, height) in entries:
+            self._index.append((timestamp, seq, base + relative, length, kind, encoding, width, height))
+        self._offset = base + chunk_size
+        self.records += len(entries)
+        self.bytes_written = self._offset
+
+    def _write_index(self):
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        self._file.write(INDEX_MAGIC)
+        index_offset = self._offset + len(INDEX_MAGIC)
+        self._file.write(index.tobytes())
+        self._file.write(TRAILER.pack(index_offset, len(index), TRAILER_MAGIC))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # queued after everything recorded so far, the writer drains the queue and writes the index
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+class SessionReader:
+    """Memory-mapped random access to a recorded session."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.created = FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != FILE_MAGIC:
+            raise SessionError(f"{path} is not a session file")
+        if version != FILE_VERSION:
+            raise SessionError(f"unsupported session version {version}")
+        self.index = self._read_index()
+        self.frame_index = self.index[self.index["kind"] == KIND_FRAME]
+        self.frame_times = self.frame_index["timestamp"]
+
+    def _read_index(self) -> np.ndarray:
+        size = len(self._mmap)
+        if size >= FILE_HEADER.size + TRAILER.size:
+            offset, count, magic = TRAILER.unpack_from(self._mmap, size - TRAILER.size)
+            if magic == TRAILER_MAGIC:
+                return np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=count, offset=offset).copy()
+        return self._scan()
+
+    def _scan(self) -> np.ndarray:
+        # unclosed recording: walk the chunks, stop at the first incomplete one
+        entries = []
+        offset = FILE_HEADER.size
+        size = len(self._mmap)
+        while offset + CHUNK_HEADER.size <= size:
+            magic, count, nbytes = CHUNK_HEADER.unpack_from(self._mmap, offset)
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + nbytes > size:
+                break
+            position = offset + CHUNK_HEADER.size
+            for _ in range(count):
+                kind, encoding, width, height, seq, timestamp, length = RECORD_HEADER.unpack_from(self._mmap, position)
+                position += RECORD_HEADER.size
+                entries.append((timestamp, seq, position, length, kind, encoding, width, height))
+                position += length
+            offset += CHUNK_HEADER.size + nbytes
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.frame_index)
+
+    @property
+    def start_time(self) -> float:
+        return float(self.index["timestamp"][0]) if len(self.index) else self.created
+
+    @property
+    def end_time(self) -> float:
+        return float(self.index["timestamp"][-1]) if len(self.index) else self.created
+
+    def _payload(self, entry) -> memoryview:
+        offset = int(entry["offset"])
+        return memoryview(self._mmap)[offset : offset + int(entry["length"])]
+
+    def frame(self, i: int) -> Frame:
+        entry = self.frame_index[i]
+        try:
+            encoding = FrameEncoding(int(entry["encoding"]))
+        except ValueError:
+            encoding = FrameEncoding.UNKNOWN
+        seq = int(entry["seq"])
+        return Frame(
+            self._payload(entry),
+            encoding,
+            None if seq < 0 else seq,
+            float(entry["timestamp"]),
+            int(entry["width"]),
+            int(entry["height"]),
+        )
+
+    def prefetch(self, start: int, stop: int):
+        """Ask the OS to page in frames [start, stop) ahead of use."""
+        if not hasattr(mmap, "MADV_WILLNEED") or start >= stop or start >= len(self.frame_index):
+            return
+        first = self.frame_index[start]
+        last = self.frame_index[min(stop, len(self.frame_index)) - 1]
+        begin = int(first["offset"]) // mmap.PAGESIZE * mmap.PAGESIZE
+        end = int(last["offset"]) + int(last["length"])
+        try:
+            self._mmap.madvise(mmap.MADV_WILLNEED, begin, end - begin)
+        except (OSError, ValueError):
+            pass
+
+    def frame_at_time(self, timestamp: float) -> int:
+        """Index of the last frame recorded at or before `timestamp` (the first one if none), -1 without frames."""
+        if not len(self.frame_times):
+            return -1
+        i = int(np.searchsorted(self.frame_times, timestamp, side="right")) - 1
+        return max(0, min(i, len(self.frame_times) - 1))
+
+    def records(self, kinds=(KIND_COMMAND, KIND_RESPONSE, KIND_EVENT)) -> List[Dict[str, Any]]:
+        result = []
+        for entry in self.index[np.isin(self.index["kind"], kinds)]:
+            record = json.loads(bytes(self._payload(entry)).decode("utf-8"))
+            record["kind"] = int(entry["kind"])
+            record["timestamp"] = float(entry["timestamp"])
+            result.append(record)
+        return result
+
+    def close(self):
+        self.index = self.frame_index = self.frame_times = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # frames handed out still reference the mapping, it is released with them
+            pass
+        self._file.close()
+
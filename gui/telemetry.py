@@ -0,0 +1,137 @@
+import math
+from typing import List, Optional
+
+import numpy as np
+from PyQt6.QtCore import QPointF, Qt, QTimer
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QGridLayout, QLabel, QSizePolicy, QToolButton, QVBoxLayout, QWidget
+
+from server.telemetry import TelemetryPoller
+
+
+class Sparkline(QWidget):
+    """A line over the last samples of one series, scaled to its own range; NaN leaves a gap."""
+
+    def __init__(self, color: str, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.color = QColor(color)
+        self.values = np.empty(0)
+        self.setMinimumHeight(28)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+    def set_values(self, values: np.ndarray):
+        self.values = values
+        self.update()
+
+    def paintEvent(self, event):
+        values = self.values
+        finite = np.isfinite(values)
+        if not finite.any():
+            return
+        low, high = float(values[finite].min()), float(values[finite].max())
+        span = (high - low) or 1.0
+        width, height = self.width() - 2, self.height() - 2
+        xs = 1 + np.arange(len(values)) * (width / max(1, len(values) - 1))
+        ys = 1 + height - (values - low) / span * height
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(self.color, 1.5))
+        # one polyline per run of valid samples
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], finite.astype(np.int8), [0]))))
+        for start, stop in zip(edges[::2], edges[1::2]):
+            if stop - start == 1:
+                painter.drawPoint(QPointF(xs[start], ys[start]))
+            else:
+                painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs[start:stop], ys[start:stop])]))
+        painter.end()
+
+
+class TelemetryPanel(QWidget):
+    """Collapsible panel of live sparklines from a `TelemetryPoller`; redraws only while expanded."""
+
+    def __init__(self, poller: TelemetryPoller, refresh_interval: float = 1.0, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.poller = poller
+        self._last_count = -1
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+
+        self.toggle = QToolButton()
+        self.toggle.setText("Server telemetry")
+        self.toggle.setCheckable(True)
+        self.toggle.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextBesideIcon)
+        self.toggle.setArrowType(Qt.ArrowType.RightArrow)
+        self.toggle.setStyleSheet("color: #E0E0E0; border: none;")
+        self.toggle.toggled.connect(self._set_expanded)
+        layout.addWidget(self.toggle)
+
+        self.body = QWidget()
+        grid = QGridLayout(self.body)
+        grid.setContentsMargins(4, 0, 4, 0)
+        grid.setVerticalSpacing(2)
+        # name, color, values from the ring, text for the latest value
+        self.rows: List[tuple] = []
+        rows = (
+            ("RTT", "#79D5A9", lambda ring: ring.series("status_rtt") * 1000, lambda v: f"{v:.0f} ms"),
+            ("GPU util", "#FFA92D", lambda ring: ring.series("gpu_util"), lambda v: f"{v:.0f} %"),
+            ("GPU mem", "#6096E6", self._memory_fraction, lambda v: f"{v:.0f} %"),
+            ("Frames", "#E0E0E0", self._frame_rate, lambda v: f"{v:.0f} fps"),
+        )
+        for i, (name, color, series, fmt) in enumerate(rows):
+            title = QLabel(name)
+            title.setStyleSheet("color: #E0E0E0;")
+            line = Sparkline(color)
+            value = QLabel("-")
+            value.setStyleSheet(f"color: {color};")
+            value.setMinimumWidth(60)
+            grid.addWidget(title, i, 0)
+            grid.addWidget(line, i, 1)
+            grid.addWidget(value, i, 2)
+            self.rows.append((line, value, series, fmt))
+        self.body.setVisible(False)
+        layout.addWidget(self.body)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(100, int(refresh_interval * 1000)))
+        self.timer.timeout.connect(self.refresh)
+
+    @staticmethod
+    def _memory_fraction(ring) -> np.ndarray:
+        return 100 * ring.series("gpu_mem_used") / ring.series("gpu_mem_total")
+
+    @staticmethod
+    def _frame_rate(ring) -> np.ndarray:
+        if "frames" not in ring.fields:
+            return np.empty(0)
+        frames, times = ring.series("frames"), ring.series("time")
+        # frames displayed between polls, lined up with the later poll
+        rate = np.diff(frames) / np.diff(times)
+        return np.concatenate(([np.nan], rate)) if len(rate) else rate
+
+    def _set_expanded(self, expanded: bool):
+        self.toggle.setArrowType(Qt.ArrowType.DownArrow if expanded else Qt.ArrowType.RightArrow)
+        self.body.setVisible(expanded)
+        if expanded:
+            # fresh numbers right away instead of up to an interval later
+            self._last_count = -1
+            self.poller.poll_now()
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        ring = self.poller.ring
+        if ring.count == self._last_count:
+            return
+        self._last_count = ring.count
+        for line, value, series, fmt in self.rows:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = series(ring)
+            line.set_values(values)
+            latest = values[-1] if len(values) else math.nan
+            value.setText(fmt(latest) if math.isfinite(latest) else "-")
+        interval = self.poller.interval
+        backoff = f", backing off to {interval:.0f} s" if interval > self.poller.args.interval else ""
+        self.toggle.setText(f"Server telemetry ({len(ring)} samples{backoff})")
@@ -0,0 +1,161 @@
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from PyQt6.QtCore import QObject, Qt, QTimer
+from PyQt6.QtGui import QColor, QTextBlockFormat, QTextCharFormat, QTextCursor
+from PyQt6.QtWidgets import QTextEdit
+
+
+class _Message:
+    __slots__ = ("text", "fmt", "block_fmt", "animate", "pos", "open", "started")
+
+    def __init__(self, text: str, fmt: QTextCharFormat, block_fmt: QTextBlockFormat, animate: bool):
+        self.text = text
+        self.fmt = fmt
+        self.block_fmt = block_fmt
+        self.animate = animate
+        self.pos = 0
+        self.started = False
+        # still receiving text, later messages wait behind it
+        self.open = False
+
+
+class TranscriptRenderer(QObject):
+    """Appends messages to a QTextEdit in order, typing animated ones out in chunks once per frame.
+
+    The document is capped at `max_blocks` blocks (paragraphs), the oldest are dropped first.
+    """
+
+    def __init__(
+        self,
+        view: QTextEdit,
+        animate: bool = True,
+        chars_per_second: float = 600.0,
+        max_lag: float = 2.0,
+        max_blocks: int = 5000,
+        frame_interval_ms: int = 16,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.view = view
+        self.animate = animate
+        self.chars_per_second = chars_per_second
+        # the typing speeds up so the text on screen is never more than this many seconds behind
+        self.max_lag = max_lag
+        self._pending: Deque[_Message] = deque()
+        self._pending_chars = 0
+        self._last_tick = 0.0
+        self._cursor = QTextCursor(view.document())
+        view.document().setMaximumBlockCount(max_blocks)
+        self._timer = QTimer(self)
+        self._timer.setInterval(frame_interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+    def append(
+        self,
+        text: str,
+        color: Optional[QColor] = None,
+        align: Qt.AlignmentFlag = Qt.AlignmentFlag.AlignLeft,
+        animate: bool = False,
+        open: bool = False,
+    ) -> _Message:
+        fmt = QTextCharFormat()
+        if color is not None:
+            fmt.setForeground(color)
+        block_fmt = QTextBlockFormat()
+        block_fmt.setAlignment(align)
+        message = _Message(text, fmt, block_fmt, animate and self.animate)
+        message.open = open
+        self._pending.append(message)
+        self._pending_chars += len(text)
+        self._kick()
+        return message
+
+    def open_message(self, text: str, color: Optional[QColor] = None) -> _Message:
+        """Start a message whose text arrives later through `extend`, e.g. a streamed response."""
+        return self.append(text, color, open=True)
+
+    def extend(self, message: _Message, text: str):
+        message.text += text
+        self._pending_chars += len(text)
+        self._kick()
+
+    def close_message(self, message: _Message, text: str = ""):
+        message.open = False
+        self.extend(message, text)
+
+    def _kick(self):
+        if not self._timer.isActive():
+            self._last_tick = time.monotonic()
+            # render right away, the timer only takes over while something is being typed
+            self._tick()
+
+    def set_animated(self, animate: bool):
+        self.animate = animate
+        if not animate:
+            self.flush()
+
+    def flush(self):
+        """Render everything pending immediately, up to the first message still open."""
+        self._render(self._pending_chars)
+        if self._idle():
+            self._timer.stop()
+
+    def clear(self):
+        self._pending.clear()
+        self._pending_chars = 0
+        self._timer.stop()
+        self.view.clear()
+
+    def _tick(self):
+        now = time.monotonic()
+        elapsed = max(now - self._last_tick, 0.001)
+        self._last_tick = now
+        budget = max(1, int(self.chars_per_second * elapsed), int(self._pending_chars * elapsed / self.max_lag))
+        self._render(budget)
+        if self._idle():
+            self._timer.stop()
+        elif not self._timer.isActive():
+            self._timer.start()
+
+    def _idle(self) -> bool:
+        # an open message that is fully shown blocks the queue until more text arrives
+        if not self._pending:
+            return True
+        head = self._pending[0]
+        return head.open and head.pos == len(head.text)
+
+    def _render(self, budget: int):
+        if not self._pending:
+            return
+        scrollbar = self.view.verticalScrollBar()
+        # only follow the end if the user hasn't scrolled up to read something
+        follow = scrollbar.value() >= scrollbar.maximum() - 4
+        cursor = self._cursor
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        while self._pending:
+            message = self._pending[0]
+            if message.animate and budget <= 0:
+                break
+            if not message.started:
+                message.started = True
+                if self.view.document().isEmpty():
+                    cursor.setBlockFormat(message.block_fmt)
+                else:
+                    cursor.insertBlock(message.block_fmt, message.fmt)
+            if message.animate:
+                chunk = message.text[message.pos : message.pos + budget]
+            else:
+                chunk = message.text[message.pos :]
+            cursor.insertText(chunk, message.fmt)
+            message.pos += len(chunk)
+            budget -= len(chunk)
+            self._pending_chars -= len(chunk)
+            if message.pos < len(message.text) or message.open:
+                break
+            self._pending.popleft()
+        cursor.endEditBlock()
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
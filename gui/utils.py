@@ -1,8 +1,40 @@
 import base64
+from typing import Optional, Tuple
 
 import numpy as np
+from PyQt6.QtGui import QImage
 
 
-def base64_to_numpy_array(b64_string, dtype=np.uint8) -> np.ndarray:
+def base64_to_numpy_array(b64_string, dtype=np.uint8, shape: Optional[Tuple[int, ...]] = None) -> np.ndarray:
     decoded = base64.b64decode(b64_string)
-    return np.frombuffer(decoded, dtype=dtype)
+    array = np.frombuffer(decoded, dtype=dtype)
+    return array.reshape(shape) if shape is not None else array
+
+
+def raw_to_numpy(buffer, width: int, height: int) -> np.ndarray:
+    # a read-only (H, W, 3) view, no copy is made
+    array = np.frombuffer(buffer, dtype=np.uint8)
+    if array.size != width * height * 3:
+        raise ValueError(f"raw frame has {array.size} bytes, expected {width}x{height}x3")
+    return array.reshape(height, width, 3)
+
+
+def numpy_to_qimage(array: np.ndarray, bgr: bool = False) -> QImage:
+    # the QImage wraps the array's memory and keeps a reference to it
+    if array.ndim != 3 or array.shape[2] != 3 or array.dtype != np.uint8:
+        raise ValueError(f"expected an (H, W, 3) uint8 array, got {array.shape} {array.dtype}")
+    if not array.flags["C_CONTIGUOUS"]:
+        array = np.ascontiguousarray(array)
+    height, width = array.shape[:2]
+    fmt = QImage.Format.Format_BGR888 if bgr else QImage.Format.Format_RGB888
+    return QImage(array.data, width, height, array.strides[0], fmt)
+
+
+def qimage_to_numpy(image: QImage) -> np.ndarray:
+    # (H, W, 3) RGB copy of the image's pixels, it stays valid after the QImage is gone
+    if image.format() != QImage.Format.Format_RGB888:
+        image = image.convertToFormat(QImage.Format.Format_RGB888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, : image.width() * 3].reshape(image.height(), image.width(), 3).copy()
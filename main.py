@@ -1,17 +1,78 @@
+import argparse
 import sys
 
 from PyQt6.QtWidgets import QApplication
 
-from gui.main_window_test import MainWindow
+from gui.main_window import MainWindow
+from server import log as server_log
 from server.api import Server
+from server.metrics import metrics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimus-3 GUI client")
+    # input the url, e.g., http://10.xx.xx.xxx
+    parser.add_argument("--url", default="http://10.xx.xx.xx")
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--record", help="record the session to this file")
+    parser.add_argument("--replay", help="replay a recorded session instead of connecting to a server")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--delta", action="store_true", help="ask the server for keyframes plus changed tiles")
+    parser.add_argument("--max-fps", type=float, help="ask the server not to send frames faster than this")
+    parser.add_argument("--quality", type=int, help="JPEG/WebP quality to ask the server for")
+    parser.add_argument("--history-mb", type=int, default=256, help="memory for scrubbing back through received frames, 0 turns it off")
+    parser.add_argument("--history-minutes", type=float, default=5.0, help="how far back the timeline reaches")
+    parser.add_argument("--telemetry-interval", type=float, default=2.0, help="seconds between /status and /gpu samples, 0 turns it off")
+    parser.add_argument("--ws-control", action="store_true", help="send pause/resume/reset/commands over the observation WebSocket")
+    parser.add_argument("--no-health", action="store_true", help="don't watch for frozen/black frames or reconnect a stalled stream")
+    parser.add_argument("--metrics-export", metavar="PATH", help="write client metrics here periodically (.prom or JSON lines)")
+    parser.add_argument("--no-metrics", action="store_true", help="don't collect client metrics")
+    parser.add_argument("--quiet", action="store_true", help="no console logging")
+    parser.add_argument("--no-typewriter", action="store_true", help="show agent responses at once instead of typing them out")
+    parser.add_argument(
+        "--dashboard", nargs="+", metavar="URL:PORT", help="watch several servers side by side, e.g. http://10.0.0.1:9500"
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
     app = QApplication(sys.argv)
-    # input the url, e.g., http://10.xx.xx.xxx
-    server = Server(url="http://10.xx.xx.xx", port=9500)
+    server_log.verbose = not args.quiet
+    metrics_options = dict(metrics_enabled=not args.no_metrics, metrics_export=args.metrics_export)
+
+    if args.dashboard:
+        from gui.dashboard import DashboardWindow
+
+        metrics.enabled = not args.no_metrics
+
+        servers = []
+        for address in args.dashboard:
+            url, port = address.rsplit(":", 1)
+            # each tile checks its server in the background
+            servers.append(Server(url=url, port=int(port), verbose=not args.quiet, check_status=False))
+        gui = DashboardWindow(servers)
+    elif args.replay:
+        from gui.replay import ReplayWindow
 
-    gui = MainWindow(server)
+        gui = ReplayWindow(args.replay, speed=args.speed, typewriter=not args.no_typewriter, **metrics_options)
+    else:
+        # the window checks the server in the background once it is shown
+        server = Server(url=args.url, port=args.port, verbose=not args.quiet, check_status=False)
+        gui = MainWindow(
+            server,
+            record_path=args.record,
+            typewriter=not args.no_typewriter,
+            delta_frames=args.delta,
+            quality=args.quality,
+            max_fps=args.max_fps,
+            history_bytes=args.history_mb << 20,
+            history_seconds=args.history_minutes * 60,
+            telemetry_interval=args.telemetry_interval or None,
+            control_channel=args.ws_control,
+            health_monitor=not args.no_health,
+            **metrics_options,
+        )
 
     gui.show()
     # gui.receive_image_from_server()
@@ -1,9 +1,53 @@
 from dataclasses import dataclass
 import base64
 import json
-import numpy as np
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Tuple
+
 import requests
-from rich import print
+
+from server.metrics import metrics
+from server.transport import Transport, TransportArgument
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(event, data) pairs from server-sent event lines, the event defaults to "message"."""
+    event, data = "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def _no_log(message: str):
+    pass
+
+
+class ControlError(RuntimeError):
+    """A control call over the WebSocket channel failed on the server."""
+
+
+class ControlUnavailable(ControlError):
+    """The call was not sent, e.g. the channel isn't connected; HTTP can be used instead."""
+
+
+class ControlTimeout(ControlError):
+    """The call was sent but no reply came in time, the server may still have acted on it."""
 
 
 @dataclass
@@ -13,137 +57,303 @@ class ServerArgument:
 
 
 class Server:
-    def __init__(self, url: str, port: int):
+    def __init__(
+        self,
+        url: str,
+        port: int,
+        transport_args: Optional[TransportArgument] = None,
+        verbose: bool = True,
+        streaming: bool = True,
+        check_status: bool = True,
+    ):
         self.url = url
         self.port = port
+        self.verbose = verbose
+        # cleared the first time the server turns out not to have /send_text_stream
+        self.streaming = streaming
         self.base = f"{self.url}:{self.port}"
-        self.check()
+        # last /get_obs result and its ETag, for conditional fetches
+        self._obs_etag: Optional[str] = None
+        self._obs_cache: Optional[str] = None
+        self.obs_stats = {"fetches": 0, "not_modified": 0, "bytes_saved": 0}
+        # set by the GUI while control calls can go over the observation WebSocket (gui/control.py)
+        self.control = None
+        self.transport = Transport(self.base, transport_args)
+        # the GUI passes check_status=False and runs check() in the background instead
+        if check_status:
+            self.check()
+
+    def _log(self, message: str):
+        if self.verbose:
+            # rich takes longer to import than the rest of the client, only pay for it when logging
+            from rich import print
 
-    def check(self):
-        print("[green]Checking server status[/green]")
+            print(message)
+
+    def check(self, quiet: bool = False) -> bool:
+        # quiet is for background polling, which would otherwise log every few seconds
+        log = self._log if not quiet else _no_log
+        log("[green]Checking server status[/green]")
         try:
-            response = requests.get(f"{self.url}:{self.port}/status")
+            response = self.transport.get("/status")
             if response.status_code == 200:
-                print("[green]Server is running[/green]")
+                log("[green]Server is running[/green]")
+                return True
             else:
-                print("[red]😭Server is not running. Please start the Server![/red]")
+                log("[red]😭Server is not running. Please start the Server![/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭Error connecting to server: {e}[/red]")
+            log(f"[red]😭Error connecting to server: {e}[/red]")
+        return False
+
+    def _via_control(self, method: str, params: Optional[dict] = None, retry_http: bool = True) -> Tuple[bool, Optional[dict]]:
+        """(handled, data) of `method` over the control channel; not handled means use HTTP.
+
+        A call that was never sent always falls back to HTTP. After a timeout the server may already
+        have run it: pause, resume and receive_text can safely run twice and are repeated over HTTP.
+        reset and send_text pass retry_http=False and the timeout counts as a failure, the same rule
+        the transport applies to POSTs, since a second reset or action step is worse than a missing one.
+        """
+        control = self.control
+        if control is None:
+            return False, None
+        connect, read = self.transport.timeout_for(f"/{method}")
+        start = time.perf_counter()
+        try:
+            data = control.call(method, params, timeout=connect + read)
+        except ControlUnavailable:
+            return False, None
+        except ControlTimeout:
+            metrics.counter("control_call_errors_total", {"method": method}).inc()
+            if retry_http:
+                self._log(f"[yellow]No reply to {method} over the control channel, using HTTP[/yellow]")
+                return False, None
+            self._log(f"[red]😭 No reply to {method} over the control channel[/red]")
+            return True, None
+        except ControlError as e:
+            metrics.counter("control_call_errors_total", {"method": method}).inc()
+            self._log(f"[red]😭 {method} failed: {e}[/red]")
+            return True, None
+        metrics.histogram("control_call_seconds", {"method": method}).observe(time.perf_counter() - start)
+        return True, data
 
     def get_initial_text(self) -> dict:
         try:
-            response = requests.get(f"{self.base}/initial_text")
+            response = self.transport.get("/initial_text")
             if response.status_code == 200:
                 data = response.json()
-                print(f"[green]Initial text: {data.get('text')}[/green]")
+                self._log(f"[green]Initial text: {data.get('text')}[/green]")
                 return data
             else:
-                print(f"[red]Failed to get initial text: {response.status_code} {response.text}[/red]")
+                self._log(f"[red]Failed to get initial text: {response.status_code} {response.text}[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]Error connecting to server: {e}[/red]")
+            self._log(f"[red]Error connecting to server: {e}[/red]")
 
     def reset(self):
-        print("[green]Resetting server[/green]")
+        self._log("[green]Resetting server[/green]")
+        # not repeated over HTTP after a timeout, see _via_control
+        handled, data = self._via_control("reset", {"device": "cuda:0"}, retry_http=False)
+        if handled:
+            return data
         # return
         # Reset the server here
         try:
             # payload = {"device": device}
-            response = requests.post(f"{self.url}:{self.port}/reset", json={"device": "cuda:0"})
+            response = self.transport.post("/reset", json={"device": "cuda:0"})
             if response.status_code == 200:
                 data = response.json()
-                print("[green]Server reset successfully[/green]")
+                self._log("[green]Server reset successfully[/green]")
                 return data
             else:
-                print("[red]😭Failed to reset server[/red]")
+                self._log("[red]😭Failed to reset server[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭Error connecting to server: {e}[/red]")
+            self._log(f"[red]😭Error connecting to server: {e}[/red]")
 
     def pause(self):
-        print("[green]Pause Agent[/green]")
+        self._log("[green]Pause Agent[/green]")
+        handled, data = self._via_control("pause")
+        if handled:
+            return data
         # return
         # Reset the server here
         try:
             # payload = {"device": device}
-            response = requests.post(f"{self.url}:{self.port}/pause")
+            response = self.transport.post("/pause", idempotent=True)
             if response.status_code == 200:
                 data = response.json()
-                print("[green]Pause agent successfully[/green]")
+                self._log("[green]Pause agent successfully[/green]")
                 return data
             else:
-                print("[red]😭Failed to pause agent[/red]")
+                self._log("[red]😭Failed to pause agent[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭Error connecting to server: {e}[/red]")
+            self._log(f"[red]😭Error connecting to server: {e}[/red]")
 
     def resume(self):
-        print("[green]resume Agent[/green]")
+        self._log("[green]resume Agent[/green]")
+        handled, data = self._via_control("resume")
+        if handled:
+            return data
         try:
             # payload = {"device": device}
-            response = requests.post(f"{self.url}:{self.port}/resume")
+            response = self.transport.post("/resume", idempotent=True)
             if response.status_code == 200:
                 data = response.json()
-                print("[green]resume agent successfully[/green]")
+                self._log("[green]resume agent successfully[/green]")
                 return data
             else:
-                print("[red]😭Failed to resume agent[/red]")
+                self._log("[red]😭Failed to resume agent[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭Error connecting to server: {e}[/red]")
+            self._log(f"[red]😭Error connecting to server: {e}[/red]")
 
     def send_text(self, text: str, task: str) -> dict:
-        print(f"[green]Sending text command to server: {text}[/green]")
+        self._log(f"[green]Sending text command to server: {text}[/green]")
+        # not repeated over HTTP after a timeout, see _via_control
+        handled, data = self._via_control("send_text", {"text": text, "task": task}, retry_http=False)
+        if handled:
+            if data is not None:
+                self._log(f"[green]Received response: {data.get('response')}[/green]")
+            return data
         try:
             payload = {"text": text, "task": task}
-            response = requests.post(f"{self.base}/send_text", json=payload)
+            response = self.transport.post("/send_text", json=payload)
             if response.status_code == 200:
                 data = response.json()
-                print(f"[green]Received response: {data.get('response')}[/green]")
+                self._log(f"[green]Received response: {data.get('response')}[/green]")
                 return data
             else:
-                print(f"[red]😭 Failed to send text: {response.status_code} {response.text}[/red]")
+                self._log(f"[red]😭 Failed to send text: {response.status_code} {response.text}[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭 Error connecting to server: {e}[/red]")
+            self._log(f"[red]😭 Error connecting to server: {e}[/red]")
 
-    def receive_obs(self) -> str:
-       
-        # print("[green]Requesting observation[/green]")
+    def send_text_stream(self, text: str, task: str, on_token: Callable[[str], None]) -> Optional[dict]:
+        """Like `send_text`, calling `on_token` as the response is generated.
+
+        Falls back to `send_text` (and never calls `on_token`) when the server doesn't stream.
+        The returned dict also has "ttft" and "latency" in seconds.
+        """
+        if not self.streaming:
+            return self._timed_send_text(text, task)
+        self._log(f"[green]Streaming text command to server: {text}[/green]")
+        start = time.perf_counter()
+        ttft = None
+        data = None
         try:
-            
-            r = requests.get(f"{self.base}/get_obs")
+            response = self.transport.post(
+                "/send_text_stream",
+                json={"text": text, "task": task},
+                headers={"Accept": "text/event-stream"},
+                stream=True,
+            )
+            if response.status_code in (404, 405, 501):
+                response.close()
+                self._log("[yellow]Server doesn't stream responses, using /send_text[/yellow]")
+                self.streaming = False
+                return self._timed_send_text(text, task)
+            if response.status_code != 200:
+                self._log(f"[red]😭 Failed to send text: {response.status_code} {response.text}[/red]")
+                return None
+            with response:
+                # chunk_size=None hands over whatever has arrived instead of waiting for a full buffer
+                lines = response.iter_lines(chunk_size=None, decode_unicode=True)
+                for event, payload in iter_sse_events(lines):
+                    if event == "token":
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        on_token(json.loads(payload)["token"])
+                    elif event == "done":
+                        data = json.loads(payload)
+                        break
+                    elif event == "error":
+                        self._log(f"[red]😭 Server error while streaming: {payload}[/red]")
+                        break
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._log(f"[red]😭 Error while streaming response: {e}[/red]")
+        if data is None:
+            return None
+        latency = time.perf_counter() - start
+        data.update(ttft=ttft if ttft is not None else latency, latency=latency)
+        metrics.histogram("send_text_ttft_seconds", {"task": task}).observe(data["ttft"])
+        metrics.histogram("send_text_seconds", {"task": task}).observe(latency)
+        self._log(f"[green]Received response: {data.get('response')}[/green]")
+        return data
+
+    def _timed_send_text(self, text: str, task: str) -> Optional[dict]:
+        start = time.perf_counter()
+        data = self.send_text(text, task)
+        if data is not None:
+            # without streaming the first token arrives with the last
+            latency = time.perf_counter() - start
+            data.update(ttft=latency, latency=latency)
+            metrics.histogram("send_text_ttft_seconds", {"task": task}).observe(latency)
+            metrics.histogram("send_text_seconds", {"task": task}).observe(latency)
+        return data
+
+    def receive_obs(self, changed_only: bool = False) -> str:
+        """The current observation (base64). With `changed_only`, None if it is the one fetched last time."""
+        # self._log("[green]Requesting observation[/green]")
+        try:
+            # servers that send an ETag answer 304 while the frame hasn't changed
+            headers = {"If-None-Match": self._obs_etag} if self._obs_etag else None
+            r = self.transport.get("/get_obs", headers=headers)
+            self.obs_stats["fetches"] += 1
+            if r.status_code == 304 and self._obs_cache is not None:
+                self.obs_stats["not_modified"] += 1
+                self.obs_stats["bytes_saved"] += len(self._obs_cache)
+                metrics.counter("obs_not_modified_total").inc()
+                metrics.counter("obs_bytes_saved_total").inc(len(self._obs_cache))
+                return None if changed_only else self._obs_cache
             if r.status_code == 200:
                 resp_data = r.json()
-                return resp_data.get("observation")
+                observation = resp_data.get("observation")
+                self._obs_etag = r.headers.get("ETag")
+                self._obs_cache = observation if self._obs_etag else None
+                return observation
             else:
-                print(f"[red]Obs failed: {r.status_code} {r.text}[/red]")
+                self._log(f"[red]Obs failed: {r.status_code} {r.text}[/red]")
         except Exception as e:
-            print(f"[red]Error: {e}[/red]")
+            self._log(f"[red]Error: {e}[/red]")
 
     def receive_text(self) -> dict:
        
-        print("[green]Requesting status text from server[/green]")
+        self._log("[green]Requesting status text from server[/green]")
+        handled, data = self._via_control("receive_text")
+        if handled:
+            return data
         try:
-            response = requests.get(f"{self.base}/receive_text")
+            response = self.transport.get("/receive_text")
             if response.status_code == 200:
                 data = response.json()
-                print(f"[green]Status: {data.get('text')}[/green]")
+                self._log(f"[green]Status: {data.get('text')}[/green]")
                 return data
             else:
-                print(f"[red]😭 Failed to receive text: {response.status_code} {response.text}[/red]")
+                self._log(f"[red]😭 Failed to receive text: {response.status_code} {response.text}[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭 Error connecting to server: {e}[/red]")
+            self._log(f"[red]😭 Error connecting to server: {e}[/red]")
 
-    def check_gpu(self) -> dict:
-       
-        print("[green]Checking GPU status on server[/green]")
+    def check_gpu(self, quiet: bool = False) -> dict:
+        log = self._log if not quiet else _no_log
+        log("[green]Checking GPU status on server[/green]")
         try:
-            response = requests.get(f"{self.base}/gpu")
+            response = self.transport.get("/gpu")
             if response.status_code == 200:
                 data = response.json()
-                print(f"[green]GPU info: {data}[/green]")
+                log(f"[green]GPU info: {data}[/green]")
                 return data
             else:
-                print(f"[red]😭 Failed to check GPU: {response.status_code} {response.text}[/red]")
+                log(f"[red]😭 Failed to check GPU: {response.status_code} {response.text}[/red]")
         except requests.exceptions.RequestException as e:
-            print(f"[red]😭 Error connecting to server: {e}[/red]")
+            log(f"[red]😭 Error connecting to server: {e}[/red]")
+
+    def request_stats(self) -> dict:
+        return self.transport.stats()
+
+    def close(self):
+        self.transport.close()
+
+    @staticmethod
+    def decode_image(b64_string, dtype="uint8", shape: Optional[tuple] = None) -> "np.ndarray":
+        # raw observations only, pass shape=(height, width, 3) to get an image-shaped view
+        import numpy as np
 
-    def decode_image(b64_string, dtype=np.uint8) -> np.ndarray:
         decoded = base64.b64decode(b64_string)
-        return np.frombuffer(decoded, dtype=dtype)
+        array = np.frombuffer(decoded, dtype=dtype)
+        return array.reshape(shape) if shape is not None else array
@@ -0,0 +1,12 @@
+"""Console messages of the client (connection state, decode and hook failures).
+
+`verbose` is process-wide, main.py clears it for --quiet. Failures on per-frame paths are also
+counted in the metrics, so nothing is lost with the console quiet.
+"""
+
+verbose = True
+
+
+def log(message: str):
+    if verbose:
+        print(message)
@@ -0,0 +1,229 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from server.log import log
+
+# seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry: "Metrics"):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"value": self.value}
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, registry: "Metrics", fn: Optional[Callable[[], float]] = None):
+        self._registry = registry
+        # gauges backed by a callback cost nothing on the hot path, they are read at snapshot time
+        self._fn = fn
+        self.value = 0.0
+
+    def set(self, value: float):
+        if self._registry.enabled:
+            self.value = value
+
+    def snapshot(self) -> dict:
+        if self._fn is not None:
+            try:
+                self.value = float(self._fn())
+            except Exception:
+                pass
+        return {"value": self.value}
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry: "Metrics", buckets: Iterable[float] = LATENCY_BUCKETS):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.bounds = tuple(sorted(buckets))
+        # the last slot counts values above the largest bound
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        # linear interpolation inside the bucket holding the q-th observation
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.bounds[-1]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+            }
+
+
+class Metrics:
+    """Registry of counters, gauges and fixed-bucket histograms keyed by name and labels."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Dict[LabelKey, object]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, labels: Optional[Dict[str, str]], factory):
+        key = _label_key(labels)
+        family = self._metrics.get(name)
+        if family is not None and key in family:
+            return family[key]
+        with self._lock:
+            family = self._metrics.setdefault(name, {})
+            if key not in family:
+                family[key] = factory()
+            return family[key]
+
+    def counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get(name, labels, lambda: Counter(self))
+
+    def gauge(
+        self, name: str, labels: Optional[Dict[str, str]] = None, fn: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._get(name, labels, lambda: Gauge(self, fn))
+
+    def histogram(
+        self, name: str, labels: Optional[Dict[str, str]] = None, buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(name, labels, lambda: Histogram(self, buckets))
+
+    def families(self) -> List[Tuple[str, LabelKey, object]]:
+        with self._lock:
+            return [(name, key, metric) for name, family in self._metrics.items() for key, metric in family.items()]
+
+    def snapshot(self) -> dict:
+        result: Dict[str, list] = {}
+        for name, key, metric in self.families():
+            entry = {"type": metric.kind, "labels": dict(key)}
+            entry.update(metric.snapshot())
+            result.setdefault(name, []).append(entry)
+        return result
+
+    def to_prometheus(self) -> str:
+        lines = []
+        typed = set()
+        for name, key, metric in self.families():
+            if name not in typed:
+                lines.append(f"# TYPE {name} {metric.kind}")
+                typed.add(name)
+            snap = metric.snapshot()
+            if metric.kind == "histogram":
+                cumulative = 0
+                for bound, count in snap["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {snap['sum']}")
+                lines.append(f"{name}_count{_format_labels(key)} {snap['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(key)} {snap['value']}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Writes the registry to a file every `interval` seconds from a background thread.
+
+    `.prom` / `.txt` paths are rewritten atomically in Prometheus text format (for the node
+    exporter textfile collector), anything else gets one JSON line appended per interval.
+    """
+
+    def __init__(self, registry: Metrics, path: str, interval: float = 10.0, fmt: Optional[str] = None):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt or ("prometheus" if path.endswith((".prom", ".txt")) else "jsonl")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            if self.fmt == "prometheus":
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(self.registry.to_prometheus())
+                os.replace(tmp, self.path)
+            else:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"ts": time.time(), "metrics": self.registry.snapshot()}) + "\n")
+        except OSError as e:
+            log(f"Failed to export metrics to {self.path}: {e}")
+
+
+# process-wide registry shared by the transport, decoder and window
+metrics = Metrics()
@@ -0,0 +1,486 @@
+"""Local stand-in for the Optimus-3 server, for development and benchmarks without a GPU host.
+
+    python -m server.standin --port 9500 --fps 30 --size 1280x720 --encoding jpeg --latency 0.02
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from PIL import Image
+
+from gui.delta import TileEncoder
+from gui.protocol import FrameEncoding, pack_frame
+
+ENCODINGS = {
+    "jpeg": FrameEncoding.JPEG,
+    "png": FrameEncoding.PNG,
+    "webp": FrameEncoding.WEBP,
+    "raw_rgb": FrameEncoding.RAW_RGB,
+    "raw_bgr": FrameEncoding.RAW_BGR,
+}
+
+
+@dataclass
+class StandinArgument:
+    host: str = "127.0.0.1"
+    port: int = 9500
+    width: int = 640
+    height: int = 360
+    fps: float = 30.0
+    encoding: str = "jpeg"
+    quality: int = 80
+    # one-way delay added to every HTTP response and WebSocket frame
+    latency: float = 0.0
+    # extra time /send_text takes, on top of `latency`
+    inference_latency: float = 0.05
+    # extra time /status and /initial_text take, e.g. a host still loading the model
+    startup_latency: float = 0.0
+    # time per generated token; /send_text waits for all of them, /send_text_stream sends each as it is made
+    token_interval: float = 0.01
+    streaming: bool = True
+    # keyframe + changed tiles for clients that ask for it in their hello
+    delta: bool = True
+    # answer rpc control calls on /ws/obs for clients that ask for it in their hello
+    control: bool = True
+    tile_size: int = 32
+    keyframe_interval: int = 60
+    # distinct frames rendered before the animation repeats
+    cycle: int = 120
+    # ticks each rendered frame is repeated for, above 1 the stream carries identical consecutive frames
+    hold: int = 1
+
+
+class FrameSource:
+    """Synthetic Minecraft-ish frames: static sky/ground/hotbar with a moving block."""
+
+    def __init__(self, args: StandinArgument):
+        self.args = args
+        self._base: Dict[Tuple[int, int], np.ndarray] = {}
+        self._encoded: Dict[tuple, bytes] = {}
+
+    def _background(self, width: int, height: int) -> np.ndarray:
+        key = (width, height)
+        if key not in self._base:
+            frame = np.empty((height, width, 3), dtype=np.uint8)
+            horizon = height * 3 // 5
+            sky = np.linspace(0, 1, horizon, dtype=np.float32)[:, None]
+            frame[:horizon] = (np.array([120, 170, 255]) * (1 - 0.4 * sky))[:, None, :].astype(np.uint8)
+            frame[horizon:] = (70, 140, 60)
+            bar_h = max(8, height // 12)
+            frame[height - bar_h :, width // 4 : width * 3 // 4] = (40, 40, 40)
+            self._base[key] = frame
+        return self._base[key]
+
+    def render(self, index: int, width: Optional[int] = None, height: Optional[int] = None) -> np.ndarray:
+        width = width or self.args.width
+        height = height or self.args.height
+        frame = self._background(width, height).copy()
+        index %= self.args.cycle
+        size = max(4, height // 8)
+        x = int((width - size) * index / self.args.cycle)
+        y = height // 2 - size // 2 + int(size * np.sin(2 * np.pi * index / self.args.cycle))
+        frame[y : y + size, x : x + size] = (200, 60, 40)
+        return frame
+
+    def encode(
+        self,
+        index: int,
+        encoding: str,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        quality: Optional[int] = None,
+    ) -> bytes:
+        width = width or self.args.width
+        height = height or self.args.height
+        quality = quality or self.args.quality
+        index %= self.args.cycle
+        key = (index, encoding, width, height, quality)
+        cached = self._encoded.get(key)
+        if cached is not None:
+            return cached
+        pixels = self.render(index, width, height)
+        if encoding == "raw_rgb":
+            data = pixels.tobytes()
+        elif encoding == "raw_bgr":
+            data = pixels[..., ::-1].tobytes()
+        else:
+            buffer = io.BytesIO()
+            fmt = {"jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}[encoding]
+            Image.fromarray(pixels).save(buffer, format=fmt, quality=quality)
+            data = buffer.getvalue()
+        # raw frames are cheap to rebuild and large to keep
+        if encoding not in ("raw_rgb", "raw_bgr"):
+            if len(self._encoded) >= 4 * self.args.cycle:
+                # clients resizing keep asking for new sizes, don't keep every one
+                self._encoded.clear()
+            self._encoded[key] = data
+        return data
+
+    def decoded(self, index: int, encoding: str, width: Optional[int] = None, height: Optional[int] = None, quality: Optional[int] = None) -> np.ndarray:
+        """The frame as a client decodes it, which is what tile deltas are computed against."""
+        if encoding in ("raw_rgb", "raw_bgr"):
+            return self.render(index, width, height)
+        data = self.encode(index, encoding, width, height, quality)
+        return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+    def current_index(self) -> int:
+        return int(time.monotonic() * self.args.fps)
+
+
+class StandinState:
+    def __init__(self, args: StandinArgument):
+        self.args = args
+        self.frames = FrameSource(args)
+        self.paused = False
+        self._paused_index = 0
+        self.steps = 0
+        self.last_text = "Ready."
+
+    def obs_index(self) -> int:
+        # the observation stands still while paused
+        if self.paused:
+            return self._paused_index
+        return self.frames.current_index() // self.args.hold % self.args.cycle
+
+    def set_paused(self, paused: bool):
+        if paused and not self.paused:
+            self._paused_index = self.obs_index()
+        self.paused = paused
+
+    def observation_b64(self, index: Optional[int] = None) -> str:
+        index = self.obs_index() if index is None else index
+        return base64.b64encode(self.frames.encode(index, "jpeg")).decode()
+
+
+def fake_response(task: str, text: Optional[str], args: StandinArgument) -> str:
+    if task == "grounding":
+        w, h = args.width, args.height
+        x1, y1 = random.randint(0, w // 2), random.randint(0, h // 2)
+        # leading object index, then the box corners in source-image pixels
+        return f"1 {text}: ({x1},{y1}),({x1 + w // 4},{y1 + h // 4})"
+    if task == "planning":
+        return "1. chop 4 logs\n2. craft 4 planks\n3. craft a crafting table\n4. craft 4 sticks\n5. craft a wooden pickaxe"
+    if task == "captioning":
+        return "The agent stands on a grass plain facing a forest under a clear sky."
+    if task == "embodied_qa":
+        return "There is a tree about five blocks ahead."
+    return "Action"
+
+
+def fit_size(width: int, height: int, max_size: Optional[list]) -> Tuple[int, int]:
+    """Largest size within `max_size` with the aspect of width x height, never larger than the source."""
+    if not max_size:
+        return width, height
+    scale = min(1.0, max_size[0] / width, max_size[1] / height)
+    return max(16, round(width * scale)), max(16, round(height * scale))
+
+
+def choose_encoding(preferred: str, accepted: list, binary: bool) -> str:
+    usable = [e for e in accepted if e in ENCODINGS and (binary or not e.startswith("raw"))]
+    if preferred in usable:
+        return preferred
+    return usable[0] if usable else "jpeg"
+
+
+def tokenize(response: str) -> list:
+    return re.findall(r"\S+\s*|\s+", response)
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(args: StandinArgument) -> FastAPI:
+    app = FastAPI()
+    state = StandinState(args)
+    app.state.standin = state
+
+    async def delay(extra: float = 0.0):
+        if args.latency or extra:
+            await asyncio.sleep(args.latency + extra)
+
+    @app.get("/status")
+    async def status():
+        await delay(args.startup_latency)
+        return {"status": "running"}
+
+    @app.get("/initial_text")
+    async def initial_text():
+        await delay(args.startup_latency)
+        return {"text": "hello, I'm Optimus-3 (local stand-in)."}
+
+    # shared by the HTTP endpoints and rpc calls on /ws/obs, the network delay is added by the caller
+    async def do_reset(params: dict) -> dict:
+        state.steps = 0
+        state.set_paused(False)
+        return {"status": "reset", "observation": state.observation_b64()}
+
+    async def do_pause(params: dict) -> dict:
+        state.set_paused(True)
+        return {"status": "paused"}
+
+    async def do_resume(params: dict) -> dict:
+        state.set_paused(False)
+        return {"status": "resumed"}
+
+    async def do_send_text(params: dict) -> dict:
+        task = params.get("task") or "action"
+        response = fake_response(task, params.get("text"), args)
+        await asyncio.sleep(args.inference_latency + args.token_interval * len(tokenize(response)))
+        state.steps += 1
+        state.last_text = response
+        return {"response": response, "step": state.steps}
+
+    async def do_receive_text(params: dict) -> dict:
+        return {"text": state.last_text}
+
+    control_methods = {
+        "reset": do_reset,
+        "pause": do_pause,
+        "resume": do_resume,
+        "send_text": do_send_text,
+        "receive_text": do_receive_text,
+    }
+
+    @app.post("/reset")
+    async def reset():
+        await delay()
+        return await do_reset({})
+
+    @app.post("/pause")
+    async def pause():
+        await delay()
+        return await do_pause({})
+
+    @app.post("/resume")
+    async def resume():
+        await delay()
+        return await do_resume({})
+
+    @app.post("/send_text")
+    async def send_text(request: Request):
+        payload = await request.json()
+        await delay()
+        return await do_send_text(payload)
+
+    if args.streaming:
+
+        @app.post("/send_text_stream")
+        async def send_text_stream(request: Request):
+            payload = await request.json()
+            task = payload.get("task") or "action"
+            response = fake_response(task, payload.get("text"), args)
+
+            async def events():
+                await delay(args.inference_latency)
+                for token in tokenize(response):
+                    yield sse("token", {"token": token})
+                    await asyncio.sleep(args.token_interval)
+                state.steps += 1
+                state.last_text = response
+                yield sse("done", {"response": response, "step": state.steps})
+
+            return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.get("/get_obs")
+    async def get_obs(request: Request):
+        await delay()
+        index = state.obs_index()
+        # frames are identified by content, the animation repeats every `cycle` frames
+        etag = f'"{index}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse({"observation": state.observation_b64(index), "frame_id": index}, headers={"ETag": etag})
+
+    @app.get("/receive_text")
+    async def receive_text():
+        await delay()
+        return await do_receive_text({})
+
+    @app.get("/gpu")
+    async def gpu():
+        await delay()
+        return {
+            "name": "stand-in",
+            "memory_used": 8000 + random.randint(0, 500),
+            "memory_total": 24000,
+            "utilization": random.randint(20, 90),
+        }
+
+    @app.websocket("/ws/obs")
+    async def ws_obs(websocket: WebSocket):
+        await websocket.accept()
+        client = {"binary": False, "encodings": ["jpeg"], "delta": False, "max_size": None, "quality": None, "max_fps": None, "control": False}
+        tiles = TileEncoder(args.tile_size, keyframe_interval=args.keyframe_interval)
+        outbox: asyncio.Queue = asyncio.Queue()
+        # rpc calls run concurrently, a pause doesn't wait behind a send_text
+        calls = set()
+
+        async def answer(call: dict):
+            # the call itself arrives after the one-way delay
+            await asyncio.sleep(args.latency)
+            method = control_methods.get(call.get("method"))
+            if method is None:
+                reply = {"type": "rpc_error", "id": call.get("id"), "error": f"unknown method {call.get('method')!r}"}
+            else:
+                try:
+                    reply = {"type": "rpc_result", "id": call.get("id"), "result": await method(call.get("params") or {})}
+                except Exception as e:
+                    reply = {"type": "rpc_error", "id": call.get("id"), "error": str(e)}
+            # replies queue behind frames like everything else sent on the socket
+            await outbox.put((time.monotonic() + args.latency, json.dumps(reply)))
+
+        async def receive():
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+                if data.get("type") == "hello":
+                    client["binary"] = "binary" in data.get("formats", [])
+                    client["encodings"] = data.get("encodings") or ["jpeg"]
+                    client["delta"] = args.delta and client["binary"] and bool(data.get("delta"))
+                    client["control"] = args.control and bool(data.get("control"))
+                if data.get("type") in ("hello", "config"):
+                    for key in ("max_size", "quality", "max_fps"):
+                        if key in data:
+                            client[key] = data[key]
+                    # a new size needs a new keyframe to diff against
+                    tiles.force_keyframe()
+                    width, height = fit_size(args.width, args.height, client["max_size"])
+                    ack = {
+                        "type": "hello_ack" if data["type"] == "hello" else "config_ack",
+                        "binary": client["binary"],
+                        "delta": client["delta"],
+                        "encoding": choose_encoding(args.encoding, client["encodings"], client["binary"]),
+                        "size": [width, height],
+                        # grounding and other coordinates are in this space, whatever size frames are sent at
+                        "source_size": [args.width, args.height],
+                        "max_fps": min(args.fps, client["max_fps"] or args.fps),
+                        "control": client["control"],
+                    }
+                    await websocket.send_text(json.dumps(ack))
+                elif data.get("type") == "keyframe":
+                    tiles.force_keyframe()
+                elif data.get("type") == "rpc" and client["control"]:
+                    task = asyncio.create_task(answer(data))
+                    calls.add(task)
+                    task.add_done_callback(calls.discard)
+
+        async def send():
+            # frames wait in the outbox for the simulated one-way latency, without limiting the rate
+            while True:
+                send_at, message = await outbox.get()
+                wait = send_at - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+
+        async def produce():
+            # tick drives the animation, seq counts frames actually sent
+            seq = 0
+            tick = 0
+            last_sent = 0.0
+            interval = 1.0 / args.fps
+            next_tick = time.monotonic()
+            while True:
+                next_tick += interval
+                tick += 1
+                # a little slack so a 30 fps cap on a 30 fps stream doesn't drop frames to timer jitter
+                min_gap = 0.9 / client["max_fps"] if client["max_fps"] else 0.0
+                if not state.paused and time.monotonic() - last_sent >= min_gap:
+                    last_sent = time.monotonic()
+                    encoding = choose_encoding(args.encoding, client["encodings"], client["binary"])
+                    width, height = fit_size(args.width, args.height, client["max_size"])
+                    quality = client["quality"]
+                    index = tick // args.hold
+                    if client["delta"] and not tiles.keyframe_due():
+                        payload = tiles.encode(state.frames.render(index, width, height))
+                        message = pack_frame(payload, FrameEncoding.TILES, seq, time.time(), width, height)
+                    elif client["binary"]:
+                        data = state.frames.encode(index, encoding, width, height, quality)
+                        if client["delta"]:
+                            tiles.set_keyframe(state.frames.decoded(index, encoding, width, height, quality), seq)
+                        message = pack_frame(data, ENCODINGS[encoding], seq, time.time(), width, height)
+                    else:
+                        message = base64.b64encode(state.frames.encode(index, encoding, width, height, quality)).decode()
+                    await outbox.put((time.monotonic() + args.latency, message))
+                    seq += 1
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+        tasks = [asyncio.create_task(coro()) for coro in (receive, send, produce)]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in tasks + list(calls):
+                task.cancel()
+
+    return app
+
+
+def parse_args(argv=None) -> StandinArgument:
+    parser = argparse.ArgumentParser(description="Local Optimus-3 stand-in server")
+    defaults = StandinArgument()
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--size", default=f"{defaults.width}x{defaults.height}", help="frame size, WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=defaults.fps)
+    parser.add_argument("--encoding", choices=sorted(ENCODINGS), default=defaults.encoding)
+    parser.add_argument("--quality", type=int, default=defaults.quality)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="one-way delay in seconds")
+    parser.add_argument("--inference-latency", type=float, default=defaults.inference_latency)
+    parser.add_argument("--startup-latency", type=float, default=defaults.startup_latency)
+    parser.add_argument("--token-interval", type=float, default=defaults.token_interval)
+    parser.add_argument("--no-streaming", action="store_true", help="don't serve /send_text_stream")
+    parser.add_argument("--hold", type=int, default=defaults.hold, help="repeat each frame this many times")
+    parser.add_argument("--no-delta", action="store_true", help="always send whole frames")
+    parser.add_argument("--no-control", action="store_true", help="don't answer control calls on /ws/obs")
+    parser.add_argument("--tile-size", type=int, default=defaults.tile_size)
+    parser.add_argument("--keyframe-interval", type=int, default=defaults.keyframe_interval)
+    ns = parser.parse_args(argv)
+    width, height = (int(v) for v in ns.size.lower().split("x"))
+    return StandinArgument(
+        host=ns.host,
+        port=ns.port,
+        width=width,
+        height=height,
+        fps=ns.fps,
+        encoding=ns.encoding,
+        quality=ns.quality,
+        latency=ns.latency,
+        inference_latency=ns.inference_latency,
+        startup_latency=ns.startup_latency,
+        token_interval=ns.token_interval,
+        streaming=not ns.no_streaming,
+        hold=ns.hold,
+        delta=not ns.no_delta,
+        control=not ns.no_control,
+        tile_size=ns.tile_size,
+        keyframe_interval=ns.keyframe_interval,
+    )
+
+
+def run(args: StandinArgument):
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    run(parse_args())
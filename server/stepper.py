@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from server.api import Server
+
+
+@dataclass
+class StepperArgument:
+    # steps per second, 0 sends as fast as the in-flight window allows
+    target_rate: float = 0.0
+    # number of action steps allowed to be waiting on the server at once
+    max_in_flight: int = 2
+    rate_window: int = 50
+    # delay before the next step after a failed one, doubled per consecutive failure
+    error_backoff: float = 0.1
+    max_error_backoff: float = 5.0
+
+
+class ActionStepper:
+    """Drives the action task loop on its own threads, never on the GUI thread."""
+
+    def __init__(
+        self,
+        server: Server,
+        args: Optional[StepperArgument] = None,
+        on_stopped: Optional[Callable[[], None]] = None,
+        on_step: Optional[Callable[[dict, float], None]] = None,
+    ):
+        self.server = server
+        self.args = args or StepperArgument()
+        self.on_stopped = on_stopped
+        # called from a worker thread with (response data, step latency) for every completed step
+        self.on_step = on_step
+        self.executor = ThreadPoolExecutor(
+            # room for requests left over from a stopped run next to a fresh window
+            max_workers=2 * self.args.max_in_flight,
+            thread_name_prefix="action-step",
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # set from start() until the loop thread has finished, see _run
+        self._looping = False
+        # task of a start() that came in while the loop was stopping
+        self._restart: Optional[str] = None
+        self._consecutive_errors = 0
+        self._window: Optional[threading.Semaphore] = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._completions: deque = deque(maxlen=self.args.rate_window)
+        self.steps = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.last_latency = 0.0
+        self.mean_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._looping
+
+    def start(self, task: str = "action"):
+        with self._lock:
+            if self._looping:
+                if self._stop.is_set():
+                    # never waits for the stopping loop (start is called on the GUI thread),
+                    # the loop starts again on its way out instead
+                    self._restart = task
+                return
+            self._looping = True
+            self._stop.clear()
+        self._begin(task)
+
+    def _begin(self, task: str):
+        with self._lock:
+            self._generation += 1
+            self._completions.clear()
+            self.in_flight = 0
+            self._consecutive_errors = 0
+            generation = self._generation
+        self._window = threading.Semaphore(self.args.max_in_flight)
+        self._thread = threading.Thread(target=self._run, args=(task, generation), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # requests already on the wire can't be recalled, their results are ignored
+        with self._lock:
+            self._restart = None
+            self._stop.set()
+
+    def _backoff(self) -> float:
+        with self._lock:
+            errors = self._consecutive_errors
+        if not errors:
+            return 0.0
+        return min(self.args.error_backoff * 2 ** (errors - 1), self.args.max_error_backoff)
+
+    def set_rate(self, steps_per_sec: float):
+        self.args.target_rate = max(0.0, steps_per_sec)
+
+    def _run(self, task: str, generation: int):
+        window = self._window
+        next_send = time.perf_counter()
+        while not self._stop.is_set():
+            if not window.acquire(timeout=0.1):
+                continue
+            backoff = self._backoff()
+            # without it an unreachable server is hammered as fast as the requests fail
+            if backoff and self._stop.wait(backoff):
+                window.release()
+                break
+            if self.args.target_rate > 0:
+                delay = next_send - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    window.release()
+                    break
+                # don't bank credit after a stall, or the next steps go out in a burst
+                next_send = max(next_send, time.perf_counter() - 1.0 / self.args.target_rate) + 1.0 / self.args.target_rate
+            if self._stop.is_set():
+                window.release()
+                break
+            with self._lock:
+                self.in_flight += 1
+            future = self.executor.submit(self._step, task)
+            future.add_done_callback(lambda f, g=generation: self._step_done(f, g, window))
+        with self._lock:
+            task, self._restart = self._restart, None
+            self._looping = task is not None
+            if task is not None:
+                self._stop.clear()
+        if task is not None:
+            self._begin(task)
+        elif self.on_stopped is not None:
+            self.on_stopped()
+
+    def _step(self, task: str):
+        start = time.perf_counter()
+        data = self.server.send_text("action", task)
+        return data, time.perf_counter() - start
+
+    def _step_done(self, future, generation: int, window: threading.Semaphore):
+        window.release()
+        data = None
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.in_flight -= 1
+            try:
+                data, latency = future.result()
+            except Exception:
+                data, latency = None, 0.0
+            if data is None:
+                self.errors += 1
+                self._consecutive_errors += 1
+                return
+            self._consecutive_errors = 0
+            self.steps += 1
+            self.last_latency = latency
+            self.mean_latency += (latency - self.mean_latency) / min(self.steps, 20)
+            self._completions.append(time.perf_counter())
+        if self.on_step is not None:
+            self.on_step(data, latency)
+
+    def step_rate(self) -> float:
+        with self._lock:
+            if len(self._completions) < 2:
+                return 0.0
+            span = self._completions[-1] - self._completions[0]
+            return (len(self._completions) - 1) / span if span > 0 else 0.0
+
+    def stats(self) -> dict:
+        rate = self.step_rate()
+        with self._lock:
+            return {
+                "steps": self.steps,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "rate": rate,
+                "last_latency_ms": self.last_latency * 1000,
+                "mean_latency_ms": self.mean_latency * 1000,
+            }
+
+    def shutdown(self):
+        self.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from server.api import Server
+from server.metrics import metrics
+
+# per poll: when it started, client round trips (s), whether /status answered, what /gpu reported,
+# and client-side counters passed in as `extra`
+FIELDS = ("time", "status_rtt", "gpu_rtt", "status_ok", "gpu_util", "gpu_mem_used", "gpu_mem_total")
+
+# /gpu has no fixed schema, the first key present is used
+GPU_KEYS = {
+    "gpu_util": ("utilization", "gpu_util", "util"),
+    "gpu_mem_used": ("memory_used", "mem_used", "used"),
+    "gpu_mem_total": ("memory_total", "mem_total", "total"),
+}
+
+
+@dataclass
+class TelemetryArgument:
+    interval: float = 2.0
+    # longest interval reached when backing off from a slow or unreachable server
+    max_interval: float = 30.0
+    # a poll taking longer than this fraction of the interval counts as slow
+    slow_fraction: float = 0.5
+    # samples kept, 600 at 2 s is 20 minutes
+    capacity: int = 600
+
+
+class SampleRing:
+    """Fixed-size ring of float samples, one column per field, NaN where a value is missing."""
+
+    def __init__(self, capacity: int, fields: Sequence[str] = FIELDS):
+        self.fields = {name: i for i, name in enumerate(fields)}
+        self._data = np.full((capacity, len(self.fields)), np.nan)
+        self._next = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.count, len(self._data))
+
+    def append(self, values: Dict[str, float]):
+        row = np.full(len(self.fields), np.nan)
+        for name, value in values.items():
+            if value is not None and name in self.fields:
+                row[self.fields[name]] = value
+        with self._lock:
+            self._data[self._next] = row
+            self._next = (self._next + 1) % len(self._data)
+            self.count += 1
+
+    def series(self, name: str) -> np.ndarray:
+        """Oldest-first copy of one field."""
+        column = self.fields[name]
+        with self._lock:
+            if self.count < len(self._data):
+                return self._data[: self.count, column].copy()
+            return np.concatenate((self._data[self._next :, column], self._data[: self._next, column]))
+
+    def latest(self) -> Dict[str, float]:
+        with self._lock:
+            if not self.count:
+                return {}
+            row = self._data[self._next - 1].copy()
+        return {name: float(row[i]) for name, i in self.fields.items()}
+
+
+def _gpu_value(data: Optional[dict], keys: Sequence[str]) -> Optional[float]:
+    if not isinstance(data, dict):
+        return None
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return None
+
+
+class TelemetryPoller:
+    """Samples /status and /gpu (via `Server.check` / `Server.check_gpu`) from a background thread.
+
+    Polls never overlap: `poll_now` during a poll is folded into one follow-up poll. The
+    interval doubles while polls are slow or failing and comes back down once they are not.
+    """
+
+    def __init__(
+        self,
+        server: Server,
+        args: Optional[TelemetryArgument] = None,
+        extra: Optional[Dict[str, Callable[[], float]]] = None,
+    ):
+        self.server = server
+        self.args = args or TelemetryArgument()
+        # client-side values sampled with every poll, e.g. frames displayed so far
+        self.extra = dict(extra or {})
+        self.ring = SampleRing(self.args.capacity, FIELDS + tuple(self.extra))
+        self.interval = self.args.interval
+        self.polls = 0
+        self.coalesced = 0
+        self._polling = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.gpu_util = metrics.gauge("server_gpu_utilization", {"server": server.base})
+        self.gpu_mem = metrics.gauge("server_gpu_memory_used", {"server": server.base})
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            # a poll in progress is bounded by the transport timeouts, don't wait for it
+            self._thread.join(timeout=0.5)
+            self._thread = None
+
+    def poll_now(self):
+        if self._polling:
+            self.coalesced += 1
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self._polling = True
+            try:
+                slow = self.poll()
+            finally:
+                self._polling = False
+            if slow:
+                self.interval = min(self.interval * 2, self.args.max_interval)
+            else:
+                self.interval = max(self.interval / 2, self.args.interval)
+            self._wake.wait(self.interval)
+
+    def poll(self) -> bool:
+        """Take one sample; True if the server was slow or failed to answer."""
+        started = time.time()
+        poll_start = start = time.perf_counter()
+        try:
+            ok = bool(self.server.check(quiet=True))
+        except Exception:
+            ok = False
+        status_rtt = time.perf_counter() - start
+        gpu = None
+        gpu_rtt = None
+        if ok:
+            start = time.perf_counter()
+            try:
+                gpu = self.server.check_gpu(quiet=True)
+            except Exception:
+                gpu = None
+            gpu_rtt = time.perf_counter() - start
+        values = {"time": started, "status_ok": float(ok), "status_rtt": status_rtt, "gpu_rtt": gpu_rtt}
+        for field, keys in GPU_KEYS.items():
+            values[field] = _gpu_value(gpu, keys)
+        for name, fn in self.extra.items():
+            try:
+                values[name] = float(fn())
+            except Exception:
+                values[name] = None
+        self.ring.append(values)
+        self.polls += 1
+        if values["gpu_util"] is not None:
+            self.gpu_util.set(values["gpu_util"])
+        if values["gpu_mem_used"] is not None:
+            self.gpu_mem.set(values["gpu_mem_used"])
+        # a server without /gpu still answers /status, that alone is no reason to back off
+        return not ok or time.perf_counter() - poll_start > self.args.slow_fraction * self.interval
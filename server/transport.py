@@ -0,0 +1,163 @@
+from dataclasses import dataclass, field
+import gzip
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from server.metrics import metrics
+
+
+@dataclass
+class Timeout:
+    connect: float = 3.0
+    read: float = 10.0
+
+
+def default_timeouts() -> Dict[str, Timeout]:
+    return {
+        "/status": Timeout(2.0, 5.0),
+        "/initial_text": Timeout(2.0, 10.0),
+        "/reset": Timeout(3.0, 60.0),
+        "/pause": Timeout(2.0, 5.0),
+        "/resume": Timeout(2.0, 5.0),
+        # model inference, planning responses can take a while
+        "/send_text": Timeout(3.0, 120.0),
+        # read timeout is per chunk when streaming, so it bounds the gap between tokens
+        "/send_text_stream": Timeout(3.0, 120.0),
+        "/get_obs": Timeout(2.0, 5.0),
+        "/receive_text": Timeout(2.0, 10.0),
+        "/gpu": Timeout(2.0, 5.0),
+    }
+
+
+@dataclass
+class TransportArgument:
+    pool_size: int = 8
+    max_retries: int = 3
+    backoff_factor: float = 0.1
+    backoff_max: float = 2.0
+    retry_statuses: tuple = (502, 503, 504)
+    # accept gzip/deflate responses from the server
+    compression: bool = True
+    # gzip request bodies above this size, 0 disables it (the server has to support Content-Encoding)
+    compress_requests_over: int = 0
+    default_timeout: Timeout = field(default_factory=Timeout)
+    timeouts: Dict[str, Timeout] = field(default_factory=default_timeouts)
+
+
+@dataclass
+class RequestTiming:
+    count: int = 0
+    errors: int = 0
+    retries: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Transport:
+    """Shared keep-alive HTTP session used by every `Server` call."""
+
+    def __init__(self, base: str, args: Optional[TransportArgument] = None):
+        self.base = base
+        self.args = args or TransportArgument()
+        self.session = requests.Session()
+        # retries are handled in `request` so that only idempotent calls are repeated
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.args.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if self.args.compression else "identity"
+
+        self.timings: Dict[str, RequestTiming] = {}
+        self.on_timing: Optional[Callable[[str, float, bool], None]] = None
+        self._lock = threading.Lock()
+
+    def timeout_for(self, endpoint: str) -> tuple:
+        t = self.args.timeouts.get(endpoint, self.args.default_timeout)
+        return (t.connect, t.read)
+
+    def get(self, endpoint: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, idempotent=idempotent, **kwargs)
+
+    def post(self, endpoint: str, idempotent: bool = False, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, idempotent=idempotent, **kwargs)
+
+    def request(self, method: str, endpoint: str, idempotent: bool = False, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout_for(endpoint))
+        if "json" in kwargs and self.args.compress_requests_over:
+            body = json.dumps(kwargs["json"]).encode("utf-8")
+            if len(body) > self.args.compress_requests_over:
+                kwargs.pop("json")
+                kwargs["data"] = gzip.compress(body, compresslevel=5)
+                headers = dict(kwargs.pop("headers", None) or {})
+                headers["Content-Type"] = "application/json"
+                headers["Content-Encoding"] = "gzip"
+                kwargs["headers"] = headers
+
+        attempts = 1 + (self.args.max_retries if idempotent else 0)
+        start = time.perf_counter()
+        retries = 0
+        try:
+            for attempt in range(attempts):
+                last_attempt = attempt == attempts - 1
+                try:
+                    response = self.session.request(method, f"{self.base}{endpoint}", **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if last_attempt:
+                        raise
+                else:
+                    if response.status_code not in self.args.retry_statuses or last_attempt:
+                        self._record(endpoint, time.perf_counter() - start, retries, ok=True)
+                        return response
+                    response.close()
+                retries += 1
+                time.sleep(min(self.args.backoff_factor * (2**attempt), self.args.backoff_max))
+        except requests.exceptions.RequestException:
+            self._record(endpoint, time.perf_counter() - start, retries, ok=False)
+            raise
+
+    def _record(self, endpoint: str, elapsed: float, retries: int, ok: bool):
+        with self._lock:
+            timing = self.timings.get(endpoint)
+            if timing is None:
+                timing = self.timings[endpoint] = RequestTiming()
+            timing.count += 1
+            timing.retries += retries
+            timing.total += elapsed
+            timing.last = elapsed
+            timing.max = max(timing.max, elapsed)
+            if not ok:
+                timing.errors += 1
+        metrics.histogram("http_request_seconds", {"endpoint": endpoint}).observe(elapsed)
+        if not ok:
+            metrics.counter("http_request_errors_total", {"endpoint": endpoint}).inc()
+        if retries:
+            metrics.counter("http_request_retries_total", {"endpoint": endpoint}).inc(retries)
+        if self.on_timing is not None:
+            self.on_timing(endpoint, elapsed, ok)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": t.count,
+                    "errors": t.errors,
+                    "retries": t.retries,
+                    "mean_ms": t.mean * 1000,
+                    "last_ms": t.last * 1000,
+                    "max_ms": t.max * 1000,
+                }
+                for endpoint, t in self.timings.items()
+            }
+
+    def close(self):
+        self.session.close()
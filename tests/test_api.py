@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from requests.adapters import BaseAdapter  # noqa: E402
+
+from server.api import ControlError, ControlTimeout, ControlUnavailable, Server, iter_sse_events  # noqa: E402
+
+
+def test_events_and_default_type():
+    lines = ["event: token", 'data: {"token": "Hi"}', "", 'data: {"done": true}', ""]
+    assert list(iter_sse_events(lines)) == [("token", '{"token": "Hi"}'), ("message", '{"done": true}')]
+
+
+def test_multiline_data_and_comments():
+    lines = [": keep-alive", "event: done", "data: first", "data:second", "", ""]
+    assert list(iter_sse_events(lines)) == [("done", "first\nsecond")]
+
+
+def test_event_without_data_is_dropped_and_type_resets():
+    lines = ["event: token", "", "data: x", ""]
+    assert list(iter_sse_events(lines)) == [("message", "x")]
+
+
+def test_last_event_without_trailing_blank_line():
+    assert list(iter_sse_events(["event: error", "data: boom"])) == [("error", "boom")]
+
+
+class ObsAdapter(BaseAdapter):
+    """/get_obs stand-in: answers with the given (status, etag, observation) in turn, records If-None-Match."""
+
+    def __init__(self, answers):
+        super().__init__()
+        self.answers = list(answers)
+        self.sent_etags = []
+
+    def send(self, request, **kwargs):
+        self.sent_etags.append(request.headers.get("If-None-Match"))
+        status, etag, observation = self.answers.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.request = request
+        if etag:
+            response.headers["ETag"] = etag
+        response._content = json.dumps({"observation": observation}).encode() if status == 200 else b""
+        return response
+
+    def close(self):
+        pass
+
+
+def server_with(answers):
+    server = Server("http://server", 9500, verbose=False, check_status=False)
+    adapter = ObsAdapter(answers)
+    server.transport.session.mount("http://", adapter)
+    return server, adapter
+
+
+def test_not_modified_observation_comes_from_the_cache():
+    server, adapter = server_with([(200, '"v1"', "b64-one"), (304, None, None), (304, None, None)])
+    assert server.receive_obs() == "b64-one"
+    assert server.receive_obs() == "b64-one"
+    assert server.receive_obs(changed_only=True) is None
+    assert adapter.sent_etags == [None, '"v1"', '"v1"']
+    assert server.obs_stats == {"fetches": 3, "not_modified": 2, "bytes_saved": 2 * len("b64-one")}
+
+
+def test_a_new_etag_replaces_the_cache():
+    server, adapter = server_with([(200, '"v1"', "one"), (200, '"v2"', "two"), (304, None, None)])
+    server.receive_obs()
+    assert server.receive_obs(changed_only=True) == "two"
+    assert server.receive_obs() == "two"
+    assert adapter.sent_etags[-1] == '"v2"'
+
+
+def test_without_an_etag_nothing_is_cached_or_sent():
+    server, adapter = server_with([(200, None, "one"), (200, None, "one")])
+    assert server.receive_obs() == "one"
+    assert server.receive_obs(changed_only=True) == "one"
+    assert adapter.sent_etags == [None, None]
+    assert server.obs_stats["not_modified"] == 0
+
+
+class PathAdapter(BaseAdapter):
+    """Answers every request with 200 and {"via": "http"}, records the paths."""
+
+    def __init__(self):
+        super().__init__()
+        self.paths = []
+
+    def send(self, request, **kwargs):
+        self.paths.append(request.path_url)
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        response._content = b'{"via": "http"}'
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeControl:
+    """ControlChannel stand-in: raises `outcome` if it is an exception, returns it otherwise."""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = []
+
+    def call(self, method, params=None, timeout=None):
+        self.calls.append((method, params, timeout))
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def controlled(outcome):
+    server = Server("http://server", 9500, verbose=False, check_status=False)
+    adapter = PathAdapter()
+    server.transport.session.mount("http://", adapter)
+    server.control = FakeControl(outcome)
+    return server, adapter
+
+
+def test_control_reply_is_used_without_http():
+    server, adapter = controlled({"response": "ok"})
+    assert server.send_text("go", "action") == {"response": "ok"}
+    assert adapter.paths == []
+    method, params, timeout = server.control.calls[0]
+    assert (method, params) == ("send_text", {"text": "go", "task": "action"})
+    # the HTTP connect and read timeouts of the endpoint
+    assert timeout == pytest.approx(123.0)
+
+
+@pytest.mark.parametrize("method", ["pause", "resume", "reset", "send_text"])
+def test_unsent_calls_fall_back_to_http(method):
+    server, adapter = controlled(ControlUnavailable("not connected"))
+    args = ("go", "action") if method == "send_text" else ()
+    assert getattr(server, method)(*args) == {"via": "http"}
+    assert adapter.paths == [f"/{method}"]
+
+
+@pytest.mark.parametrize("method", ["pause", "resume"])
+def test_repeatable_calls_are_retried_over_http_after_a_timeout(method):
+    server, adapter = controlled(ControlTimeout("no reply"))
+    assert getattr(server, method)() == {"via": "http"}
+    assert adapter.paths == [f"/{method}"]
+
+
+@pytest.mark.parametrize("method, args", [("reset", ()), ("send_text", ("go", "action"))])
+def test_reset_and_send_text_report_a_timeout_instead_of_running_twice(method, args):
+    server, adapter = controlled(ControlTimeout("no reply"))
+    assert getattr(server, method)(*args) is None
+    assert adapter.paths == []
+
+
+def test_server_errors_are_not_retried():
+    server, adapter = controlled(ControlError("busy"))
+    assert server.pause() is None
+    assert adapter.paths == []
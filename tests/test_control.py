@@ -0,0 +1,112 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("requests")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+pytest.importorskip("PyQt6.QtWebSockets")
+
+from gui.control import ControlChannel  # noqa: E402
+from server.api import ControlError, ControlTimeout, ControlUnavailable  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    # queued signals from the calling threads need an event loop on this one
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+class FakeSocket:
+    def __init__(self, valid=True):
+        self.valid = valid
+        self.sent = []
+
+    def isValid(self):
+        return self.valid
+
+    def sendTextMessage(self, text):
+        self.sent.append(json.loads(text))
+
+
+def pump(app, condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def channel(app):
+    channel = ControlChannel()
+    channel.attach(FakeSocket())
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield channel, pool
+    pool.shutdown(wait=False)
+
+
+def test_replies_are_matched_by_id_whatever_their_order(app, channel):
+    channel, pool = channel
+    first = pool.submit(channel.call, "pause", None, 2)
+    second = pool.submit(channel.call, "send_text", {"text": "go"}, 2)
+    pump(app, lambda: len(channel.ws.sent) == 2)
+    ids = {message["method"]: message["id"] for message in channel.ws.sent}
+    assert ids["pause"] != ids["send_text"]
+    assert channel.handle({"type": "rpc_result", "id": ids["send_text"], "result": {"response": "ok"}})
+    assert channel.handle({"type": "rpc_result", "id": ids["pause"], "result": {"paused": True}})
+    assert first.result(1) == {"paused": True}
+    assert second.result(1) == {"response": "ok"}
+
+
+def test_rpc_error_raises_control_error(app, channel):
+    channel, pool = channel
+    future = pool.submit(channel.call, "reset", None, 2)
+    pump(app, lambda: channel.ws.sent)
+    channel.handle({"type": "rpc_error", "id": channel.ws.sent[0]["id"], "error": "busy"})
+    with pytest.raises(ControlError, match="busy"):
+        future.result(1)
+
+
+def test_other_messages_and_late_replies(app, channel):
+    channel, pool = channel
+    assert not channel.handle({"type": "hello_ack"})
+    # nothing waits for it any more, dropped
+    assert channel.handle({"type": "rpc_result", "id": 999, "result": {}})
+
+
+def test_detach_fails_pending_calls_with_a_timeout(app, channel):
+    channel, pool = channel
+    future = pool.submit(channel.call, "send_text", {"text": "go"}, 5)
+    pump(app, lambda: channel.ws.sent)
+    channel.detach()
+    with pytest.raises(ControlTimeout):
+        future.result(1)
+    assert not channel.ready
+    with pytest.raises(ControlUnavailable):
+        pool.submit(channel.call, "pause", None, 1).result(1)
+
+
+def test_no_reply_in_time_is_a_timeout(app, channel):
+    channel, pool = channel
+    future = pool.submit(channel.call, "pause", None, 0.05)
+    pump(app, future.done)
+    with pytest.raises(ControlTimeout):
+        future.result()
+
+
+def test_a_call_that_could_not_be_sent_is_unavailable(app, channel):
+    channel, pool = channel
+    channel.ws.valid = False
+    future = pool.submit(channel.call, "pause", None, 2)
+    pump(app, future.done)
+    with pytest.raises(ControlUnavailable):
+        future.result()
+
+
+def test_calls_never_wait_on_the_gui_thread(app, channel):
+    channel, pool = channel
+    with pytest.raises(ControlUnavailable):
+        channel.call("pause", timeout=1)
+    assert channel.ws.sent == []
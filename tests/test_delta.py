@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from gui.delta import TileCanvas, TileEncoder  # noqa: E402
+from gui.protocol import ProtocolError, pack_tiles, parse_tiles  # noqa: E402
+
+
+@pytest.mark.parametrize("level", [0, 1])
+def test_tiles_round_trip(level):
+    rng = np.random.default_rng(0)
+    positions = np.array([[0, 0], [3, 1]], dtype=np.uint16)
+    tiles = rng.integers(0, 256, (2, 8, 8, 3), dtype=np.uint8)
+    base_seq, tile_size, parsed_positions, parsed_tiles = parse_tiles(pack_tiles(2**32 + 9, 8, positions, tiles, level))
+    assert (base_seq, tile_size) == (9, 8)
+    assert np.array_equal(parsed_positions, positions)
+    assert np.array_equal(parsed_tiles, tiles)
+
+
+def test_truncated_tiles_raise():
+    payload = pack_tiles(1, 8, np.zeros((1, 2), np.uint16), np.zeros((1, 8, 8, 3), np.uint8), level=0)
+    with pytest.raises(ProtocolError):
+        parse_tiles(payload[:-1])
+
+
+def test_changed_tiles_rebuild_the_frame():
+    # 20x40 is not a multiple of the tile size, both sides pad the edges
+    keyframe = np.random.default_rng(1).integers(0, 256, (20, 40, 3), dtype=np.uint8)
+    encoder = TileEncoder(tile_size=16, threshold=0)
+    encoder.set_keyframe(keyframe, seq=7)
+    canvas = TileCanvas()
+    canvas.set_keyframe(keyframe, seq=7)
+
+    frame = keyframe.copy()
+    frame[17:19, 33:36] = 255
+    base_seq, tile_size, positions, tiles = parse_tiles(encoder.encode(frame))
+    assert base_seq == 7
+    # (x, y) of the one tile that changed
+    assert positions.tolist() == [[2, 1]]
+    assert canvas.apply(base_seq, tile_size, positions, tiles)
+    assert np.array_equal(canvas.image(), frame)
+
+    # the encoder's reference now matches the client, nothing left to send
+    _, _, positions, _ = parse_tiles(encoder.encode(frame))
+    assert len(positions) == 0
+
+
+def test_tiles_for_another_keyframe_are_refused():
+    canvas = TileCanvas()
+    canvas.set_keyframe(np.zeros((16, 16, 3), np.uint8), seq=1)
+    assert not canvas.apply(2, 16, np.zeros((0, 2), np.uint16), np.zeros((0, 16, 16, 3), np.uint8))
+
+
+def test_keyframes_are_due_on_an_interval():
+    encoder = TileEncoder(tile_size=8, keyframe_interval=2)
+    assert encoder.keyframe_due()
+    image = np.zeros((8, 8, 3), np.uint8)
+    encoder.set_keyframe(image, seq=0)
+    assert not encoder.keyframe_due()
+    encoder.encode(image)
+    encoder.encode(image)
+    assert encoder.keyframe_due()
+    encoder.set_keyframe(image, seq=3)
+    encoder.force_keyframe()
+    assert encoder.keyframe_due()
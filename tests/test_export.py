@@ -0,0 +1,28 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+np = pytest.importorskip("numpy")
+
+from gui.export import join_gifs  # noqa: E402
+
+
+def write_gif(path, values):
+    frames = [Image.fromarray(np.full((12, 16, 3), v, np.uint8)).quantize() for v in values]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100, loop=0)
+
+
+def test_joined_segments_keep_every_frame_and_its_palette(tmp_path):
+    paths = []
+    for n, values in enumerate(((10, 20), (200,), (90, 160, 250))):
+        paths.append(str(tmp_path / f"{n}.gif"))
+        write_gif(paths[-1], [(v, 255 - v, v // 2) for v in values])
+    output = str(tmp_path / "out.gif")
+    join_gifs(paths, output)
+    with Image.open(output) as image:
+        assert image.n_frames == 6
+        assert image.info["loop"] == 0
+        colors = []
+        for i in range(image.n_frames):
+            image.seek(i)
+            colors.append(image.convert("RGB").getpixel((3, 3)))
+    assert colors == [(v, 255 - v, v // 2) for v in (10, 20, 200, 90, 160, 250)]
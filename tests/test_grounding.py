@@ -0,0 +1,31 @@
+import pytest
+
+from gui.grounding import PALETTE, parse_grounding
+
+
+def test_box_from_two_points():
+    (item,) = parse_grounding("tree: (10,20),(110,220)")
+    assert (item.x1, item.y1, item.x2, item.y2, item.label) == (10, 20, 110, 220, "tree")
+    assert not item.is_point
+
+
+def test_box_from_bracket_list():
+    (item,) = parse_grounding("[1.5, 2, 3, 4.25]")
+    assert (item.x1, item.y1, item.x2, item.y2, item.label) == (1.5, 2, 3, 4.25, "")
+
+
+def test_point():
+    (item,) = parse_grounding("door: (5, 6)")
+    assert item.is_point
+    assert (item.x1, item.y1, item.label) == (5, 6, "door")
+
+
+def test_several_items_get_their_own_colors_and_lose_their_index():
+    items = parse_grounding("1 tree: (0,0),(1,1)\n2. cow: (2,2),(3,3)")
+    assert [item.label for item in items] == ["tree", "cow"]
+    assert [item.color for item in items] == list(PALETTE[:2])
+
+
+@pytest.mark.parametrize("text", ["", "no coordinates here", "(1, two)"])
+def test_text_without_coordinates(text):
+    assert parse_grounding(text) == []
@@ -0,0 +1,113 @@
+import pytest
+
+from gui.health import HealthArgument, StreamHealth
+from gui.protocol import Frame, FrameEncoding
+
+
+def frame(seq=None, encoding=FrameEncoding.JPEG):
+    return Frame(b"", encoding=encoding, seq=seq)
+
+
+class Switch:
+    def __init__(self, on=False):
+        self.on = on
+
+    def __call__(self):
+        return self.on
+
+
+def test_gap_while_frames_are_expected():
+    health = StreamHealth()
+    health.on_arrival(frame(), now=10.0)
+    assert health.alerts(now=11.0) == []
+    assert health.alerts(now=12.5) == ["no frames for 2 s"]
+
+
+def test_idle_stream_raises_no_gap_and_no_stall():
+    running = Switch()
+    health = StreamHealth(active=running)
+    health.on_connected(now=10.0)
+    health.on_arrival(frame(), now=10.0)
+    assert health.alerts(now=100.0) == []
+    assert not health.stalled(now=100.0)
+    # the silence before the loop started doesn't count
+    running.on = True
+    assert not health.stalled(now=101.0)
+    assert health.alerts(now=101.0) == []
+    assert health.stalled(now=108.0)
+
+
+def test_outstanding_keyframe_is_expected_until_one_arrives():
+    health = StreamHealth(active=Switch())
+    health.on_connected(now=10.0)
+    health.keyframe_requested()
+    assert not health.stalled(now=11.0)
+    assert health.stalled(now=17.5)
+    # tiles don't answer a keyframe request
+    health.on_arrival(frame(encoding=FrameEncoding.TILES), now=18.0)
+    assert health.expecting(now=18.0)
+    health.on_arrival(frame(), now=18.5)
+    assert not health.expecting(now=18.5)
+
+
+def test_stalled_counts_from_the_connection():
+    health = StreamHealth()
+    health.on_connected(now=10.0)
+    assert not health.stalled(now=15.0)
+    assert health.stalled(now=16.5)
+    health.on_arrival(frame(), now=16.5)
+    assert not health.stalled(now=17.0)
+
+
+def test_suspended_stream_neither_alerts_nor_stalls():
+    health = StreamHealth()
+    health.on_connected(now=10.0)
+    health.on_arrival(frame(), now=10.0)
+    health.set_suspended(True)
+    assert health.alerts(now=30.0) == []
+    assert not health.stalled(now=30.0)
+    # resuming restarts the clocks
+    health.set_suspended(False, now=30.0)
+    assert health.alerts(now=31.0) == []
+    assert not health.stalled(now=31.0)
+
+
+def test_lost_frames_from_seq_gaps():
+    health = StreamHealth()
+    for seq in (1, 2, 5, 6):
+        health.on_arrival(frame(seq), now=10.0)
+    assert health.frames_lost == 2
+    # a restarted stream is not a loss
+    health.on_arrival(frame(0), now=10.0)
+    assert health.frames_lost == 2
+
+
+def test_frozen_and_black_samples():
+    np = pytest.importorskip("numpy")
+    health = StreamHealth(HealthArgument(freeze_seconds=3.0, black_frames=3))
+    grey = np.full((36, 64), 120, dtype=np.uint8)
+    for i in range(8):
+        now = 10.0 + i
+        health.on_arrival(frame(), now=now)
+        health.on_sample(grey, now=now)
+    assert health.difference == 0.0
+    assert health.alerts(now=17.0) == ["frozen for 7 s"]
+    # a change ends it
+    health.on_arrival(frame(), now=17.5)
+    health.on_sample(grey + 10, now=17.5)
+    assert health.alerts(now=17.5) == []
+    black = np.zeros((36, 64), dtype=np.uint8)
+    for i in range(3):
+        health.on_arrival(frame(), now=18.0 + i)
+        health.on_sample(black, now=18.0 + i)
+    assert health.alerts(now=20.0) == ["3 black frames"]
+
+
+def test_frozen_is_not_raised_while_idle():
+    np = pytest.importorskip("numpy")
+    health = StreamHealth(active=Switch())
+    grey = np.full((36, 64), 120, dtype=np.uint8)
+    for i in range(8):
+        health.on_arrival(frame(), now=10.0 + i)
+        health.on_sample(grey, now=10.0 + i)
+    assert health.alerts(now=17.0) == []
@@ -0,0 +1,137 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PyQt6.QtGui")
+
+from gui.delta import TileEncoder  # noqa: E402
+from gui.history import FrameHistory, HistoryDecoder, rebuild_frame  # noqa: E402
+from gui.protocol import Frame, FrameEncoding  # noqa: E402
+from gui.utils import qimage_to_numpy  # noqa: E402
+
+
+def jpeg(size=10):
+    return Frame(b"j" * size, FrameEncoding.JPEG)
+
+
+def tiles(size=10):
+    return Frame(b"t" * size, FrameEncoding.TILES)
+
+
+def test_oldest_frames_are_evicted_over_the_byte_budget():
+    history = FrameHistory(max_bytes=25, max_age=None)
+    for i in range(5):
+        assert history.append(jpeg(), now=float(i)) == i
+    assert (history.first, history.last, len(history)) == (3, 4, 2)
+    assert history.bytes == 20
+    assert history.evicted == 3
+    assert history.time(3) == 3.0
+
+
+def test_frames_older_than_max_age_are_evicted():
+    history = FrameHistory(max_bytes=1 << 20, max_age=10.0)
+    for t in (0.0, 5.0, 12.0, 14.0):
+        history.append(jpeg(), now=t)
+    assert (history.first, history.last) == (1, 3)
+
+
+def test_the_newest_frame_is_kept_whatever_its_size():
+    history = FrameHistory(max_bytes=5, max_age=None)
+    history.append(jpeg(50), now=0.0)
+    assert len(history) == 1
+
+
+def test_tiles_go_with_their_evicted_keyframe():
+    history = FrameHistory(max_bytes=45, max_age=None)
+    for frame in (jpeg(), tiles(), tiles(), jpeg(), tiles()):
+        history.append(frame)
+    # the first keyframe went over budget, the tiles after it can't be rebuilt any more
+    assert history.first == 3
+    assert [f.encoding for f in history.frames_for(4)] == [FrameEncoding.JPEG, FrameEncoding.TILES]
+
+
+def test_frames_for_walks_back_to_the_keyframe():
+    history = FrameHistory()
+    for frame in (jpeg(), jpeg(), tiles(), tiles()):
+        history.append(frame)
+    assert len(history.frames_for(3)) == 3
+    assert history.frames_for(1) == [history.frame(1)]
+
+
+def test_clear_keeps_counting_indices():
+    history = FrameHistory()
+    history.append(jpeg())
+    history.append(jpeg())
+    history.clear()
+    assert len(history) == 0
+    assert history.append(jpeg()) == 2
+
+
+def raw(array, seq):
+    height, width = array.shape[:2]
+    return Frame(array.tobytes(), FrameEncoding.RAW_RGB, seq, None, width, height)
+
+
+def test_tiles_are_rebuilt_from_the_nearest_keyframe():
+    rng = np.random.default_rng(3)
+    keyframe = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    encoder = TileEncoder(tile_size=16, threshold=0)
+    encoder.set_keyframe(keyframe, seq=1)
+    first = keyframe.copy()
+    first[0:4, 0:4] = 0
+    second = first.copy()
+    second[20:30, 40:48] = 255
+    frames = [
+        raw(keyframe, 1),
+        Frame(encoder.encode(first), FrameEncoding.TILES, 2),
+        Frame(encoder.encode(second), FrameEncoding.TILES, 3),
+    ]
+    assert np.array_equal(qimage_to_numpy(rebuild_frame(frames)), second)
+    # a keyframe on its own is just decoded
+    assert np.array_equal(qimage_to_numpy(rebuild_frame(frames[:1])), keyframe)
+
+
+class RecordingPool:
+    def __init__(self):
+        self.tasks = []
+
+    def start(self, task):
+        self.tasks.append(task)
+
+
+def test_decoder_requests_the_cursor_first_then_outwards():
+    history = FrameHistory()
+    for _ in range(10):
+        history.append(jpeg())
+    pool = RecordingPool()
+    decoder = HistoryDecoder(history, radius=2, pool=pool)
+    decoder.request(1)
+    assert [task.index for task in pool.tasks] == [1, 2, 0, 3]
+    # already on their way, only the new neighbours are requested
+    decoder.request(2)
+    assert [task.index for task in pool.tasks[4:]] == [4]
+
+
+def test_stale_decodes_are_dropped_and_the_cache_is_bounded():
+    history = FrameHistory()
+    for _ in range(10):
+        history.append(jpeg())
+    pool = RecordingPool()
+    ready = []
+    decoder = HistoryDecoder(history, radius=0, cache_size=2, pool=pool)
+    decoder.frame_ready.connect(lambda index, image: ready.append(index))
+    image = rebuild_frame([raw(np.zeros((2, 2, 3), np.uint8), 0)])
+    decoder.request(5)
+    stale = pool.tasks[-1]
+    decoder.clear()
+    decoder._decoded(stale.index, image, stale.generation)
+    assert ready == []
+    for index in (5, 6, 7):
+        decoder.request(index)
+        task = pool.tasks[-1]
+        decoder._decoded(task.index, image, task.generation)
+    assert ready == [5, 6, 7]
+    assert list(decoder._cache) == [6, 7]
+    # a cached frame is emitted at once, and not decoded again
+    started = len(pool.tasks)
+    decoder.request(7)
+    assert ready[-1] == 7 and len(pool.tasks) == started
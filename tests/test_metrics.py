@@ -0,0 +1,36 @@
+import pytest
+
+from server.metrics import Metrics
+
+
+def test_quantile_interpolates_inside_the_bucket():
+    histogram = Metrics().histogram("latency", buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    # the median (rank 2) is halfway through the two observations in (1, 2]
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == pytest.approx(4.0)
+    assert histogram.mean == pytest.approx(1.625)
+
+
+def test_quantile_of_values_above_the_last_bound():
+    histogram = Metrics().histogram("latency", buckets=(1.0,))
+    histogram.observe(10.0)
+    assert histogram.quantile(0.99) == pytest.approx(1.0)
+
+
+def test_empty_histogram_has_no_quantile():
+    assert Metrics().histogram("latency").quantile(0.5) is None
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+    histogram = registry.histogram("latency")
+    histogram.observe(1.0)
+    assert histogram.count == 0
+
+
+def test_metrics_are_shared_by_name_and_labels():
+    registry = Metrics()
+    assert registry.counter("frames", {"server": "a"}) is registry.counter("frames", {"server": "a"})
+    assert registry.counter("frames", {"server": "a"}) is not registry.counter("frames", {"server": "b"})
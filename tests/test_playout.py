@@ -0,0 +1,55 @@
+import pytest
+
+from gui.playout import PlayoutBuffer
+
+
+def test_untimed_frames_are_due_at_once():
+    buffer = PlayoutBuffer()
+    buffer.push("a", now=5.0)
+    assert buffer.pop_due(now=5.0) == ("a", None)
+
+
+def test_frames_are_paced_by_server_time():
+    buffer = PlayoutBuffer(min_latency=0.02)
+    buffer.push("a", server_ts=0.0, now=10.0)
+    buffer.push("b", server_ts=0.1, now=10.1)
+    # steady arrivals, no jitter: due at server time + offset + min_latency
+    item, wait = buffer.pop_due(now=10.0)
+    assert item is None
+    assert wait == pytest.approx(0.02)
+    item, wait = buffer.pop_due(now=10.03)
+    assert item == "a"
+    assert wait == pytest.approx(0.09)
+
+
+def test_late_backlog_skips_to_the_newest_due_frame():
+    buffer = PlayoutBuffer(min_latency=0.02)
+    for i in range(3):
+        buffer.push(i, server_ts=i * 0.1, now=10.0 + i * 0.1)
+    item, wait = buffer.pop_due(now=10.2)
+    assert item == 1
+    assert buffer.skipped == 1
+    assert wait == pytest.approx(0.02)
+
+
+def test_a_frame_is_never_due_before_the_one_ahead_of_it():
+    buffer = PlayoutBuffer()
+    buffer.push("a", server_ts=1.0, now=10.0)
+    # no timestamp, would be due immediately, but has to wait its turn
+    buffer.push("b", now=10.0)
+    assert [due for due, _ in buffer.frames][1] == buffer.frames[0][0]
+
+
+def test_delay_is_capped_at_the_target_latency():
+    buffer = PlayoutBuffer(target_latency=0.1)
+    for i, arrival in enumerate((0.0, 0.5, 0.6, 1.5, 1.6)):
+        buffer.push(i, server_ts=i * 0.1, now=arrival)
+    assert buffer.delay == pytest.approx(0.1)
+
+
+def test_overflow_counts_as_skipped():
+    buffer = PlayoutBuffer(max_frames=2)
+    for i in range(3):
+        buffer.push(i, now=0.0)
+    assert len(buffer) == 2
+    assert buffer.skipped == 1
@@ -0,0 +1,59 @@
+import base64
+
+import pytest
+
+from gui.protocol import FrameEncoding, ProtocolError, frame_from_base64, pack_frame, parse_frame, payload_digest
+
+
+def test_frame_round_trip():
+    data = pack_frame(b"jpeg bytes", FrameEncoding.JPEG, 42, 1234.5, 640, 360)
+    frame = parse_frame(data)
+    assert bytes(frame.payload) == b"jpeg bytes"
+    assert frame.encoding == FrameEncoding.JPEG
+    assert (frame.seq, frame.timestamp, frame.width, frame.height) == (42, 1234.5, 640, 360)
+
+
+def test_seq_wraps_to_32_bits():
+    frame = parse_frame(pack_frame(b"", FrameEncoding.PNG, 2**32 + 5, 0.0))
+    assert frame.seq == 5
+
+
+def test_unknown_encoding_is_kept_as_unknown():
+    data = bytearray(pack_frame(b"x", FrameEncoding.JPEG, 1, 0.0))
+    data[3] = 200
+    assert parse_frame(data).encoding == FrameEncoding.UNKNOWN
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"OB",
+        b"XX" + pack_frame(b"abc", FrameEncoding.JPEG, 1, 0.0)[2:],
+        pack_frame(b"abcdef", FrameEncoding.JPEG, 1, 0.0)[:-2],
+    ],
+    ids=["short", "bad magic", "truncated"],
+)
+def test_malformed_frames_raise(data):
+    with pytest.raises(ProtocolError):
+        parse_frame(data)
+
+
+def test_base64_frames_decode_lazily():
+    frame = frame_from_base64(base64.b64encode(b"payload").decode())
+    assert frame.encoding == FrameEncoding.UNKNOWN
+    assert frame.data() == b"payload"
+
+
+def test_payload_digest_matches_for_equal_payloads():
+    assert payload_digest(b"abc") == payload_digest(memoryview(b"abc"))
+    assert payload_digest(b"abc") != payload_digest(b"abd")
+
+
+def test_repeated_frames_share_a_digest_whatever_their_header():
+    # the dedup compares payloads only, a repeat still gets a new seq and timestamp
+    first = parse_frame(pack_frame(b"same image", FrameEncoding.JPEG, 1, 10.0, 640, 360))
+    repeat = parse_frame(pack_frame(b"same image", FrameEncoding.JPEG, 2, 10.1, 640, 360))
+    assert payload_digest(first.payload) == payload_digest(repeat.payload)
+    text = base64.b64encode(b"same image").decode()
+    assert payload_digest(frame_from_base64(text).payload) == payload_digest(text)
+    assert len(payload_digest(b"")) == 16
@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from gui.protocol import Frame, FrameEncoding  # noqa: E402
+from gui.session import (  # noqa: E402
+    INDEX_MAGIC,
+    KIND_COMMAND,
+    KIND_EVENT,
+    KIND_RESPONSE,
+    TRAILER,
+    SessionReader,
+    SessionWriter,
+)
+
+
+def record_session(path) -> str:
+    # small chunks, so the session spans several of them
+    writer = SessionWriter(str(path), chunk_bytes=64)
+    for i in range(5):
+        writer.record_frame(Frame(bytes([i]) * 10, FrameEncoding.JPEG, i, None, 4, 2), timestamp=100.0 + i)
+    writer.record_command("go", "planning", timestamp=100.5)
+    writer.record_response("ok", "planning", timestamp=101.5, latency=0.2)
+    writer.record_event("pause", timestamp=102.5)
+    writer.close()
+    return str(path)
+
+
+def test_round_trip(tmp_path):
+    reader = SessionReader(record_session(tmp_path / "s.ogs"))
+    try:
+        assert len(reader) == 5
+        frame = reader.frame(2)
+        assert bytes(frame.payload) == b"\x02" * 10
+        assert (frame.encoding, frame.seq, frame.timestamp, frame.width, frame.height) == (FrameEncoding.JPEG, 2, 102.0, 4, 2)
+        assert reader.frame_at_time(102.7) == 2
+        assert reader.frame_at_time(50.0) == 0
+        records = reader.records()
+        assert [r["kind"] for r in records] == [KIND_COMMAND, KIND_RESPONSE, KIND_EVENT]
+        assert records[0]["text"] == "go"
+        assert records[1]["latency"] == 0.2
+        assert records[2]["event"] == "pause"
+    finally:
+        reader.close()
+
+
+def test_unclosed_recording_is_rebuilt_from_chunks(tmp_path):
+    path = record_session(tmp_path / "s.ogs")
+    full = SessionReader(path)
+    data = open(path, "rb").read()
+    index_offset, _, _ = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    without_index = data[: index_offset - len(INDEX_MAGIC)]
+
+    unclosed = tmp_path / "unclosed.ogs"
+    unclosed.write_bytes(without_index)
+    # a chunk cut short by a crash is ignored, everything before it is kept
+    truncated = tmp_path / "truncated.ogs"
+    truncated.write_bytes(without_index[:-5])
+    try:
+        reader = SessionReader(str(unclosed))
+        assert np.array_equal(reader.index, full.index)
+        reader.close()
+        reader = SessionReader(str(truncated))
+        assert 0 < len(reader.index) < len(full.index)
+        assert np.array_equal(reader.index, full.index[: len(reader.index)])
+        reader.close()
+    finally:
+        full.close()
+
+
+def test_live_recording_can_be_opened_before_the_first_chunk(tmp_path):
+    path = str(tmp_path / "live.ogs")
+    writer = SessionWriter(path)
+    try:
+        reader = SessionReader(path)
+        assert len(reader) == 0
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_zero_timestamps_are_kept_and_an_empty_session_has_no_frame_at_time(tmp_path):
+    writer = SessionWriter(str(tmp_path / "zero.ogs"))
+    writer.record_frame(Frame(b"x", FrameEncoding.JPEG, 0), timestamp=0.0)
+    writer.record_command("go", "action", timestamp=0.0)
+    writer.close()
+    reader = SessionReader(str(tmp_path / "zero.ogs"))
+    try:
+        assert float(reader.frame_times[0]) == 0.0
+        assert reader.records()[0]["timestamp"] == 0.0
+    finally:
+        reader.close()
+
+    writer = SessionWriter(str(tmp_path / "empty.ogs"))
+    writer.record_event("pause", timestamp=1.0)
+    writer.close()
+    reader = SessionReader(str(tmp_path / "empty.ogs"))
+    try:
+        assert reader.frame_at_time(5.0) == -1
+    finally:
+        reader.close()
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from server.stepper import ActionStepper, StepperArgument  # noqa: E402
+
+
+class FakeServer:
+    """send_text stand-in: counts calls and concurrency, optionally blocks or fails."""
+
+    def __init__(self, delay=0.0, fail=0, gate=None):
+        self.delay = delay
+        self.fail = fail
+        self.gate = gate
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def send_text(self, text, task):
+        with self.lock:
+            call = self.calls
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        if self.gate is not None:
+            self.gate.wait(2)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if call < self.fail:
+            return None
+        return {"response": call}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def run_for(stepper, seconds):
+    stepper.start()
+    time.sleep(seconds)
+    stepper.stop()
+    assert wait_for(lambda: not stepper.running)
+
+
+def test_in_flight_is_bounded_by_the_window():
+    server = FakeServer(delay=0.02)
+    stepper = ActionStepper(server, StepperArgument(max_in_flight=2))
+    run_for(stepper, 0.3)
+    assert server.max_active == 2
+    assert stepper.steps > 5
+    stepper.shutdown()
+
+
+def test_target_rate_paces_the_steps():
+    server = FakeServer()
+    stepper = ActionStepper(server, StepperArgument(target_rate=50))
+    run_for(stepper, 0.4)
+    # 20 at the exact rate, with room for a slow scheduler
+    assert 10 <= server.calls <= 25
+    stepper.shutdown()
+
+
+def test_results_of_a_stopped_run_are_ignored():
+    gate = threading.Event()
+    server = FakeServer(gate=gate)
+    responses = []
+    stepper = ActionStepper(server, StepperArgument(max_in_flight=2), on_step=lambda data, latency: responses.append(data))
+    stepper.start()
+    assert wait_for(lambda: server.calls == 2)
+    stepper.stop()
+    stepper.start()
+    # the new run gets its own window while the old requests are still out
+    assert wait_for(lambda: server.calls == 4)
+    gate.set()
+    assert wait_for(lambda: len(responses) >= 2)
+    stepper.stop()
+    assert wait_for(lambda: not stepper.running)
+    assert all(data["response"] >= 2 for data in responses)
+    stepper.shutdown()
+
+
+def test_start_while_stopping_restarts_without_on_stopped():
+    stopped = threading.Event()
+    stepper = ActionStepper(FakeServer(delay=0.01), on_stopped=stopped.set)
+    stepper.start()
+    stepper.stop()
+    started = time.monotonic()
+    stepper.start()
+    assert time.monotonic() - started < 0.05
+    assert stepper.running
+    time.sleep(0.2)
+    assert stepper.running and not stopped.is_set()
+    stepper.stop()
+    assert stopped.wait(1)
+    stepper.shutdown()
+
+
+def test_failures_back_off_and_a_success_resets():
+    server = FakeServer(fail=4)
+    stepper = ActionStepper(server, StepperArgument(max_in_flight=1, error_backoff=0.02, max_error_backoff=0.08))
+    stepper.start()
+    assert wait_for(lambda: stepper.steps > 0)
+    stepper.stop()
+    assert stepper.errors == 4
+    assert stepper._backoff() == 0.0
+    stepper.shutdown()
+
+
+def test_backoff_doubles_up_to_the_limit():
+    server = FakeServer(fail=10**6)
+    stepper = ActionStepper(server, StepperArgument(max_in_flight=1, error_backoff=0.05, max_error_backoff=0.1))
+    run_for(stepper, 0.5)
+    # 0.05 + 0.1 + 0.1 + ... instead of as fast as the failures come back
+    assert server.calls <= 7
+    assert stepper._backoff() == pytest.approx(0.1)
+    stepper.shutdown()
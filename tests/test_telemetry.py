@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+from server.telemetry import SampleRing, TelemetryArgument, TelemetryPoller  # noqa: E402
+
+
+def test_ring_is_oldest_first_after_wrapping():
+    ring = SampleRing(3, ("a", "b"))
+    for i in range(5):
+        ring.append({"a": i})
+    assert len(ring) == 3 and ring.count == 5
+    assert ring.series("a").tolist() == [2.0, 3.0, 4.0]
+    assert ring.latest()["a"] == 4.0
+
+
+def test_ring_before_wrapping_and_missing_values():
+    ring = SampleRing(4, ("a", "b"))
+    assert ring.latest() == {}
+    ring.append({"a": 1.0, "b": None, "unknown": 7.0})
+    ring.append({"b": 2.0})
+    assert ring.series("a")[0] == 1.0 and np.isnan(ring.series("a")[1])
+    assert np.isnan(ring.series("b")[0])
+    assert ring.latest()["b"] == 2.0
+
+
+class FakeServer:
+    base = "http://server:9500"
+
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.gate = None
+        self.checks = 0
+
+    def check(self, quiet=False):
+        self.checks += 1
+        if self.gate is not None:
+            self.gate.wait(2)
+        return self.ok
+
+    def check_gpu(self, quiet=False):
+        return {"utilization": 40, "memory_used": 1000, "memory_total": 8000}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+
+def test_poll_samples_status_gpu_and_extra():
+    poller = TelemetryPoller(FakeServer(), extra={"frames": lambda: 12})
+    assert poller.poll() is False
+    latest = poller.ring.latest()
+    assert (latest["status_ok"], latest["gpu_util"], latest["gpu_mem_total"], latest["frames"]) == (1.0, 40.0, 8000.0, 12.0)
+
+
+def test_interval_doubles_while_failing_and_recovers():
+    server = FakeServer(ok=False)
+    poller = TelemetryPoller(server, TelemetryArgument(interval=0.005, max_interval=0.02))
+    poller.start()
+    try:
+        assert wait_for(lambda: poller.polls >= 4)
+        assert poller.interval == pytest.approx(0.02)
+        server.ok = True
+        polls = poller.polls
+        assert wait_for(lambda: poller.polls >= polls + 3)
+        assert poller.interval == pytest.approx(0.005)
+    finally:
+        poller.stop()
+
+
+def test_poll_now_during_a_poll_is_folded_into_one():
+    server = FakeServer()
+    server.gate = threading.Event()
+    poller = TelemetryPoller(server, TelemetryArgument(interval=60.0))
+    poller.start()
+    try:
+        assert wait_for(lambda: poller._polling)
+        poller.poll_now()
+        poller.poll_now()
+        assert poller.coalesced == 2
+        server.gate.set()
+        # one follow-up at once instead of after the 60 s interval, and only one
+        assert wait_for(lambda: poller.polls == 2)
+        time.sleep(0.05)
+        assert poller.polls == 2 and server.checks == 2
+    finally:
+        poller.stop()
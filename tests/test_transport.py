@@ -0,0 +1,79 @@
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from requests.adapters import BaseAdapter  # noqa: E402
+
+from server.transport import Transport, TransportArgument  # noqa: E402
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Answers each request with the next status code, or raises it if it is an exception."""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        response = requests.Response()
+        response.status_code = step
+        response.request = request
+        response.url = request.url
+        response._content = b"{}"
+        return response
+
+    def close(self):
+        pass
+
+
+def transport(script, **kwargs):
+    t = Transport("http://server", TransportArgument(backoff_factor=0.0, **kwargs))
+    adapter = ScriptedAdapter(script)
+    t.session.mount("http://", adapter)
+    return t, adapter
+
+
+def test_get_is_retried_on_503():
+    t, adapter = transport([503, 503, 200])
+    assert t.get("/status").status_code == 200
+    assert len(adapter.requests) == 3
+    assert t.stats()["/status"]["retries"] == 2
+    assert t.stats()["/status"]["errors"] == 0
+
+
+def test_get_is_retried_on_a_connect_error():
+    t, adapter = transport([requests.exceptions.ConnectionError("refused"), 200])
+    assert t.get("/get_obs").status_code == 200
+    stats = t.stats()["/get_obs"]
+    assert (stats["count"], stats["errors"], stats["retries"]) == (1, 0, 1)
+
+
+def test_last_status_is_returned_when_retries_run_out():
+    t, adapter = transport([503] * 3, max_retries=2)
+    assert t.get("/status").status_code == 503
+    assert len(adapter.requests) == 3
+    assert t.stats()["/status"]["retries"] == 2
+
+
+def test_post_is_never_retried():
+    t, adapter = transport([503])
+    assert t.post("/send_text", json={"text": "hi"}).status_code == 503
+    t2, adapter2 = transport([requests.exceptions.ConnectionError("reset")])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        t2.post("/send_text", json={"text": "hi"})
+    assert len(adapter.requests) == len(adapter2.requests) == 1
+    assert t.stats()["/send_text"]["retries"] == 0
+    assert t2.stats()["/send_text"]["errors"] == 1
+
+
+def test_errors_after_the_last_retry_are_counted_once():
+    t, adapter = transport([requests.exceptions.Timeout("slow")] * 4)
+    with pytest.raises(requests.exceptions.Timeout):
+        t.get("/status")
+    stats = t.stats()["/status"]
+    assert (stats["count"], stats["errors"], stats["retries"]) == (1, 1, 3)